@@ -63,6 +63,9 @@ from app.mongodb.user_collection import user_collection
 from app.auth.security import hash_password, verify_password
 from app.auth.jwt_handler import create_access_token
 from app.auth.schemas import UserAuth
+from app.core.logger import get_logger
+
+logger = get_logger(__name__)
 
 router = APIRouter(prefix="/api/auth", tags=["Auth"])
 
@@ -75,9 +78,8 @@ def signup(user: UserAuth):
 
         raw_password = user.password.strip()
 
-        print(f"DEBUG: Hashing password for {user.email}")
+        logger.debug(f"Hashing password for {user.email}")
         hashed = hash_password(raw_password)
-        print(f"DEBUG: Password hashed: {hashed[:10]}...")
 
         user_doc = {
             "email": user.email,
@@ -85,16 +87,14 @@ def signup(user: UserAuth):
             "role": "user"
         }
 
-        print("DEBUG: Inserting user into MongoDB")
+        logger.debug("Inserting user into MongoDB")
         user_collection.insert_one(user_doc)
-        print("DEBUG: Signup successful")
+        logger.info(f"✅ Signup successful for {user.email}", user=user.email)
         return {"message": "User registered successfully"}
     except HTTPException:
         raise
     except Exception as e:
-        import traceback
-        traceback.print_exc()
-        print(f"CRITICAL ERROR IN SIGNUP: {e}")
+        logger.exception(f"❌ Critical error in signup: {e}", user=user.email)
         raise HTTPException(status_code=500, detail=str(e))
 
 
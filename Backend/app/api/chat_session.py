@@ -0,0 +1,151 @@
+"""
+Chat Session Context
+What /chat needs besides the message: the user's latest-scan context and
+the system prompt built from it. Kept per user in memory, so a chat message
+costs no Mongo lookup; /analyze invalidates a user's entry when it stores a
+new scan. The per-gender services fragment of the prompt is serialized once.
+"""
+
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from app.ml.services_db import PARLOR_SERVICES
+
+CHAT_CONTEXT_CACHE_SIZE = int(os.getenv("CHAT_CONTEXT_CACHE_SIZE", 2048))
+# Bounds staleness for scans stored by another process (other API workers, scripts), seconds
+CHAT_CONTEXT_TTL = float(os.getenv("CHAT_CONTEXT_TTL", 600))
+
+# AVAILABLE SERVICES fragment of the system prompt, per gender
+SERVICES_PROMPT = {gender: json.dumps(services) for gender, services in PARLOR_SERVICES.items()}
+
+
+def build_chat_context(last_scan):
+    """(user_context, system_prompt) for a user whose latest scan is `last_scan` (or None)."""
+    # Prepare context for chatbot
+    user_context = None
+    skin_context = "User has no recent scan."
+    gender = "Female"
+
+    if last_scan:
+        gender = last_scan.get("gender", "Female")
+        scores = last_scan.get('skin_scores', {})
+        shape = last_scan.get('face_shape', 'Unknown')
+        skin_tone = last_scan.get('skin_tone', 'Unknown')
+        eye_color = last_scan.get('eye_color', 'Unknown')
+        hair_color = last_scan.get('hair_color', 'Unknown')
+
+        skin_context = f"""User Profile:
+- Gender: {gender}
+- Face Shape: {shape}
+- Skin Tone: {skin_tone}
+- Eye Color: {eye_color}
+- Hair Color: {hair_color}
+- Acne: {scores.get('acne',0)*100:.0f}%
+- Oiliness: {scores.get('oiliness',0)*100:.0f}%
+- Texture: {scores.get('texture',0)*100:.0f}%"""
+
+        user_context = {
+            "gender": gender,
+            "face_shape": shape,
+            "skin_scores": scores,
+            "skin_tone": skin_tone,
+            "undertone": last_scan.get("undertone"),
+            "eye_color": eye_color,
+            "hair_color": hair_color,
+            "season": last_scan.get("season")
+        }
+
+    services_context = SERVICES_PROMPT.get(gender, SERVICES_PROMPT["Female"])
+
+    system_prompt = f"""You are an elite AI Beauty Consultant for a premium salon.
+
+**CLIENT PROFILE:**
+{skin_context}
+
+**AVAILABLE SERVICES:**
+{services_context}
+
+**INSTRUCTIONS:**
+1. Be professional, empathetic, and helpful
+2. Provide detailed, personalized advice based on the client's profile
+3. When recommending services, use exact names and prices from AVAILABLE SERVICES
+4. For skincare questions, give specific product recommendations and routines
+5. For makeup questions, suggest colors based on their skin tone and coloring
+6. Keep responses conversational but informative (2-4 sentences)
+7. If they ask to book, say "I can help you schedule! Please call us at (555) 123-4567"
+"""
+    return user_context, system_prompt
+
+
+class ChatContextCache:
+    def __init__(self, collection=None, max_entries=CHAT_CONTEXT_CACHE_SIZE, ttl=CHAT_CONTEXT_TTL):
+        self.collection = collection
+        self.max_entries = max_entries
+        self.ttl = ttl
+        # email -> (loaded_at, (user_context, system_prompt))
+        self._lru = OrderedDict()
+        # email -> [invalidations, loads in flight] while a load runs, so a load racing
+        # with a new scan is not stored; dropped when the last load finishes
+        self._loading = {}
+        self._lock = threading.Lock()
+        self.hits = self.misses = 0
+
+    def get(self, email):
+        """Cached (user_context, system_prompt) or None. Never blocks on Mongo."""
+        with self._lock:
+            entry = self._lru.get(email)
+            if entry is not None and time.monotonic() - entry[0] < self.ttl:
+                self._lru.move_to_end(email)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            return None
+
+    def load(self, email):
+        """Read the user's latest scan and cache its context (blocking Mongo read)."""
+        with self._lock:
+            loading = self._loading.setdefault(email, [0, 0])
+            loading[1] += 1
+            generation = loading[0]
+        loaded = False
+        try:
+            last_scan = self.collection.find_one({"user_email": email}, sort=[("created_at", -1)])
+            context = build_chat_context(last_scan)
+            loaded = True
+        finally:
+            with self._lock:
+                loading = self._loading[email]
+                if loaded and loading[0] == generation:
+                    self._lru[email] = (time.monotonic(), context)
+                    self._lru.move_to_end(email)
+                    while len(self._lru) > self.max_entries:
+                        self._lru.popitem(last=False)
+                loading[1] -= 1
+                if loading[1] == 0:
+                    del self._loading[email]
+        return context
+
+    def invalidate(self, email):
+        """The user has a new latest scan."""
+        with self._lock:
+            self._lru.pop(email, None)
+            if email in self._loading:
+                self._loading[email][0] += 1
+
+    def stats(self):
+        with self._lock:
+            return {"users": len(self._lru), "hits": self.hits, "misses": self.misses}
+
+
+# Singleton instance
+_contexts = None
+
+def get_chat_contexts():
+    global _contexts
+    if _contexts is None:
+        from app.mongodb.collections import analysis_collection
+        _contexts = ChatContextCache(analysis_collection)
+    return _contexts
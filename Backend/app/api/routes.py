@@ -1,18 +1,35 @@
 from fastapi import APIRouter, UploadFile, File, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
+from fastapi.concurrency import run_in_threadpool
 from app.utils.image_utils import read_image
-from app.pipeline.face_detection import detect_faces
+from app.utils.upload import read_upload, UploadRejected
+from app.pipeline.analysis import analyze_image, build_analysis_document, build_analysis_response, record_face_shape_path
+from app.pipeline.worker_pool import get_analysis_pool, PoolSaturatedError
+from app.pipeline.result_cache import get_result_cache, RESULT_CACHE_ENABLED
+from app.pipeline.near_duplicate import find_near_duplicate, NEAR_DUP_ENABLED
+from app.utils.image_hash import image_hashes
+from app.api.chat_session import get_chat_contexts
+from app.pipeline.tips_upgrade import llm_tips_enabled, tip_profile, pooled_tips, schedule_tips_upgrade, get_tips
+from app.pipeline.jobs import (
+    create_job, JobProgress, finish_job, fail_job, get_job,
+    ANALYSIS_JOB_POLL_INTERVAL, ANALYSIS_JOB_STREAM_TIMEOUT
+)
 from app.ml.predictor import predict_skin_conditions
 from app.auth.jwt_handler import verify_access_token
 from app.mongodb.collections import analysis_collection
-from app.ml.analysis_cv import calculate_face_shape, analyze_skin_cv, generate_annotated_image, detect_hair_properties
-from app.ml.consultant import generate_consultation
-import cv2
+from app.core.logger import get_logger
+from app.core.metrics import trace
+from fastapi.responses import StreamingResponse
+from bson import ObjectId
+import asyncio
+import json
 import os
+import time
 import uuid
 from datetime import datetime
 
 router = APIRouter()
+logger = get_logger(__name__)
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
 def get_current_user(token: str = Depends(oauth2_scheme)):
@@ -25,16 +42,73 @@ def get_current_user(token: str = Depends(oauth2_scheme)):
         )
     return payload
 
+NO_FACE_RESPONSE = {
+    "faceShape": "N/A",
+    "gender": "N/A",
+    "skinScores": {},
+    "recommendations": [],
+    "error": "No face detected. Please ensure the face is clearly visible."
+}
+
+# Keep references to running background jobs so they are not garbage collected
+_background_jobs = set()
+
 @router.post("/analyze")
-async def analyze_face(image: UploadFile = File(...), current_user: dict = Depends(get_current_user)):
+async def analyze_face(image: UploadFile = File(...), mode: str = "sync",
+                       current_user: dict = Depends(get_current_user)):
+    """
+    mode=sync (default): run the scan and return the full result.
+    mode=async: return a job id at once; follow it with GET /analyze/jobs/{id}
+    or the server-sent events at GET /analyze/jobs/{id}/events.
+    """
     try:
         user_email = current_user.get('sub')
-        print(f"🔍 STARTING ANALYSIS for user: {user_email}")
+        logger.info(f"🔍 STARTING ANALYSIS for user: {user_email} ({mode})", user=user_email, mode=mode)
+
+        async def respond(response):
+            # Answers that need no pipeline run are returned as already finished jobs in async mode
+            if mode != "async":
+                return response
+            job_id = await run_in_threadpool(create_job, user_email, response)
+            return _job_ticket(job_id, "done")
+        
+        # Streamed in chunks with byte/dimension limits; oversized uploads never get decoded
+        img_bytes = await read_upload(image)
+        img = await run_in_threadpool(read_image, img_bytes)
         
+        if img is None:
+             return {"error": "Failed to decode image. Please upload a valid image file."}
+
+        # Same photo already analysed with the current models? Reuse it (free, no usage charged)
+        cache = get_result_cache() if RESULT_CACHE_ENABLED else None
+        cache_key = None
+        if cache is not None:
+            cache_key = await run_in_threadpool(cache.key_for, img)
+            cached = await run_in_threadpool(cache.get, cache_key)
+            if cached is not None:
+                logger.info(f"♻️ Result cache hit for {user_email}", user=user_email)
+                result = await run_in_threadpool(_refresh_cached_tips, cached["result"])
+                if cached["user_email"] != user_email:
+                    result["analysis_id"] = await run_in_threadpool(_save_cached_analysis, cached, result, user_email)
+                return await respond(build_analysis_response(result, cached["image_url"], cached["annotated_image_url"]))
+
+        # Near-identical to one of this user's recent scans (webcam frames, re-encoded selfie)?
+        hashes = await run_in_threadpool(image_hashes, img)
+        if NEAR_DUP_ENABLED:
+            prior = await run_in_threadpool(find_near_duplicate, analysis_collection, user_email, hashes)
+            if prior is not None:
+                logger.info(f"♻️ Near-duplicate of scan {prior['_id']} for {user_email}, reusing it",
+                            user=user_email, reused_from=str(prior["_id"]))
+                prior["analysis_id"] = str(prior["_id"])
+                response = build_analysis_response(prior, prior["image_url"], prior["annotated_image_url"])
+                response["data"]["reused"] = True
+                response["data"]["reused_from"] = str(prior["_id"])
+                return await respond(response)
+
         # Check usage limits (RBAC)
         from app.auth.rbac import check_usage_limit, increment_usage, get_user_role
         
-        usage_check = check_usage_limit(user_email, "analysis_per_month")
+        usage_check = await run_in_threadpool(check_usage_limit, user_email, "analysis_per_month")
         if not usage_check["allowed"]:
             return {
                 "error": "Usage limit reached",
@@ -44,189 +118,216 @@ async def analyze_face(image: UploadFile = File(...), current_user: dict = Depen
                 "upgrade_required": True
             }
         
-        print(f"✅ Usage check passed: {usage_check['message']}")
-        
-        img_bytes = await image.read()
-        img = read_image(img_bytes)
-        
-        if img is None:
-             return {"error": "Failed to decode image. Please upload a valid image file."}
+        logger.info(f"✅ Usage check passed: {usage_check['message']}")
 
-        faces = detect_faces(img)
+        if mode == "async":
+            # Reject now rather than accepting a job that cannot be admitted
+            get_analysis_pool().check_capacity()
+            job_id = await run_in_threadpool(create_job, user_email)
+            task = asyncio.create_task(_run_analysis_job(
+                job_id, img, img_bytes, user_email, increment_usage, cache, cache_key, hashes))
+            _background_jobs.add(task)
+            task.add_done_callback(_background_jobs.discard)
+            return _job_ticket(job_id, "queued")
 
-        if len(faces) == 0:
-            return {
-                "faceShape": "N/A",
-                "gender": "N/A",
-                "skinScores": {},
-                "recommendations": [],
-                "error": "No face detected. Please ensure the face is clearly visible."
-            }
+        # Heavy CV/ML work runs on the analysis worker pool, not the event loop
+        result = await get_analysis_pool().run_image(analyze_image, img)
 
-        # Use the first detected face
-        face_data = faces[0]
-        bbox = face_data["bbox"]
-        landmarks = face_data["landmarks"]
-        
-        x, y, w, h = bbox
-        
-        # 1. Face Shape & Gender Analysis
-        from app.ml.analysis_cv import classify_gender_geometric
-        
-        # Unpack tuple (Shape, Confidence, Fallback)
-        shape_name, shape_conf, _ = calculate_face_shape(landmarks, img.shape[1], img.shape[0], img)
-        gender = classify_gender_geometric(landmarks, img.shape[1], img.shape[0], img, face_shape=shape_name)
-
-        # 2. Skin Analysis (OpenCV)
-        face_img = img[y:y+h, x:x+w]
-        skin_scores = analyze_skin_cv(face_img, landmarks) 
-
-        # 3. COLOR ANALYSIS (NEW) - Skin Tone, Eye Color, Hair Color
-        from app.ml.color_analysis import (
-            detect_skin_tone, 
-            detect_eye_color, 
-            detect_hair_color,
-            get_seasonal_color_palette
-        )
-        
-        skin_tone, undertone, skin_hex = detect_skin_tone(img, landmarks)
-        eye_color, eye_hex = detect_eye_color(img, landmarks)
-        hair_color, hair_hex = detect_hair_color(img, landmarks)
-        season, palette = get_seasonal_color_palette(skin_tone, undertone, eye_color, hair_color)
-        
-        # 3.5 ADVANCED DIAGNOSTICS (MATHEMATICAL)
-        from app.ml.analysis_cv import (
-            calculate_facial_symmetry, 
-            analyze_eyebrows, 
-            detect_undereye_concerns,
-            detect_hair_properties
-        )
-        
-        symmetry_data = calculate_facial_symmetry(landmarks, img.shape[1], img.shape[0])
-        eyebrow_data = analyze_eyebrows(landmarks, img.shape[1], img.shape[0], shape_name)
-        undereye_data = detect_undereye_concerns(img, landmarks)
-        hair_props = detect_hair_properties(img, landmarks)
-
-        # 4. Generate Consultant Recommendations (Pass all color data)
-        recommendations = generate_consultation(
-            shape_name, skin_scores, gender, img, landmarks,
-            skin_tone=skin_tone, undertone=undertone,
-            eye_color=eye_color, hair_color=hair_color,
-            season=season, hair_properties=hair_props
+        if result["status"] == "no_face":
+            return NO_FACE_RESPONSE
+
+        return await _finish_analysis(result, img_bytes, user_email, increment_usage, cache, cache_key, hashes)
+    except UploadRejected as e:
+        logger.warning(f"🚫 Upload rejected for {current_user.get('sub')}: {e.message}")
+        raise HTTPException(status_code=e.status_code, detail=e.message)
+    except PoolSaturatedError as e:
+        logger.warning(f"🚦 Analysis pool saturated, rejecting request for {current_user.get('sub')}")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Analysis service is busy. Please retry shortly.",
+            headers={"Retry-After": str(e.retry_after)},
         )
+    except Exception as e:
+        logger.exception(f"❌ Analysis failed for {current_user.get('sub')}: {e}", user=current_user.get('sub'))
+        return {"error": f"Internal Server Error: {str(e)}"}
 
-        # 5. Generate AI-Powered Personalized Tips (NEW)
-        from app.ml.personalized_tips import generate_personalized_tips
-        
-        personalized_tips = generate_personalized_tips(
-            face_shape=shape_name,
-            gender=gender,
-            skin_scores=skin_scores,
-            skin_tone=skin_tone,
-            undertone=undertone,
-            eye_color=eye_color,
-            hair_color=hair_color,
-            season=season,
-            hair_properties=hair_props
+async def _finish_analysis(result, img_bytes, user_email, increment_usage, cache, cache_key, hashes):
+    """Persist a finished pipeline result (disk, Mongo, usage, result cache) and build the response."""
+    record_face_shape_path(result)
+    result.update(hashes)
+    # The rule-based tips go out now; LLM tips replace them in the stored analysis later
+    result["tips_status"] = "pending" if llm_tips_enabled() else "fallback"
+    if result["tips_status"] == "pending":
+        # Common profile: pooled LLM tips are available right away
+        tips = await run_in_threadpool(pooled_tips, tip_profile(result))
+        if tips is not None:
+            result["personalized_tips"] = tips
+            result["tips_status"] = "ready"
+
+    # --- SAVE TO DB & DISK ---
+    try:
+        image_url, annotated_image_url, result["analysis_id"] = await run_in_threadpool(
+            _save_analysis, result, img_bytes, user_email, increment_usage
         )
-        print(f"✨ Generated {len(personalized_tips)} personalized tips for user")
+    except Exception as db_err:
+        logger.warning(f"⚠️ DB Save Failed: {db_err}")
+        image_url = None
+        annotated_image_url = None
+        result["tips_status"] = "fallback"
 
-        # --- GENERATE ANNOTATED IMAGE ---
-        annotated_img = generate_annotated_image(img, landmarks, gender)
-        
-        # --- SAVE TO DB & DISK ---
-        try:
-            # 1. Save Original Image
-            import uuid
-            filename = f"{uuid.uuid4().hex}.jpg"
-            file_path = os.path.join("static/uploads", filename)
-            
-            # Write original bytes
-            with open(file_path, "wb") as f:
-                f.write(img_bytes)
-
-            # 2. Save Annotated Image
-            annotated_filename = f"annotated_{filename}"
-            annotated_path = os.path.join("static/uploads", annotated_filename)
-            cv2.imwrite(annotated_path, annotated_img)
-
-            base_url = "http://localhost:8000"
-            image_url = f"{base_url}/static/uploads/{filename}"
-            annotated_image_url = f"{base_url}/static/uploads/{annotated_filename}"
-
-            # 3. Save Result to DB
-            analysis_doc = {
-                "user_email": current_user.get("sub"),
-                "image_url": image_url,
-                "annotated_image_url": annotated_image_url,
-                "face_shape": shape_name,
-                "face_shape_conf": shape_conf,
-                "gender": gender,
-                "skin_scores": skin_scores,
-                # Color Analysis Data
-                "skin_tone": skin_tone,
-                "undertone": undertone,
-                "eye_color": eye_color,
-                "hair_color": hair_color,
-                "season": season,
-                "hair_properties": hair_props,
-                # New Metrics
-                "symmetry": symmetry_data,
-                "eyebrows": eyebrow_data,
-                "undereye": undereye_data,
-                "recommendations": recommendations,
-                "personalized_tips": personalized_tips,
-                "created_at": datetime.utcnow()
-            }
-            analysis_collection.insert_one(analysis_doc)
-            print(f"✅ Saved analysis for user {current_user.get('sub')}")
-            
-            # Increment usage counter
-            increment_usage(user_email, "analysis")
-            print(f"📊 Usage incremented for {user_email}")
-
-        except Exception as db_err:
-            print(f"⚠️ DB Save Failed: {db_err}")
-            image_url = None
-            annotated_image_url = None
-
-        # --- RETURN RESPONSE ---
-        return {
-            "success": True,
-            "data": {
-                "face_shape": shape_name,
-                "confidence": float(shape_conf),
-                "gender": gender,
-                "skin_analysis": {
-                    "acne": float(skin_scores.get('acne', 0)),
-                    "oiliness": float(skin_scores.get('oiliness', 0)),
-                    "texture": float(skin_scores.get('texture', 0))
-                },
-                "color_analysis": {
-                    "skin_tone": skin_tone,
-                    "undertone": undertone,
-                    "skin_hex": skin_hex,
-                    "eye_color": eye_color,
-                    "eye_hex": eye_hex,
-                    "hair_color": hair_color,
-                    "hair_hex": hair_hex,
-                    "hair_properties": hair_props,
-                    "season": season
-                },
-                "recommendations": recommendations,
-                "personalized_tips": personalized_tips,
-                "image_url": image_url,
-                "annotated_image_url": annotated_image_url,
-                "hair_properties": hair_props,
-                "symmetry": symmetry_data,
-                "eyebrows": eyebrow_data,
-                "undereye": undereye_data,
-            }
-        }
+    if result["tips_status"] == "pending":
+        schedule_tips_upgrade(result["analysis_id"], tip_profile(result))
+
+    if cache is not None and image_url is not None:
+        await run_in_threadpool(cache.put, cache_key, result, image_url, annotated_image_url, user_email)
+
+    # --- RETURN RESPONSE ---
+    return build_analysis_response(result, image_url, annotated_image_url)
+
+def _job_ticket(job_id, job_status):
+    return {
+        "job_id": job_id,
+        "status": job_status,
+        "poll_url": f"/analyze/jobs/{job_id}",
+        "events_url": f"/analyze/jobs/{job_id}/events",
+    }
+
+async def _run_analysis_job(job_id, img, img_bytes, user_email, increment_usage, cache, cache_key, hashes):
+    """Background body of an async /analyze: stage results stream into the job document."""
+    try:
+        result = await get_analysis_pool().run_image(analyze_image, img, progress=JobProgress(job_id))
+        if result["status"] == "no_face":
+            await run_in_threadpool(fail_job, job_id, NO_FACE_RESPONSE["error"])
+            return
+        response = await _finish_analysis(result, img_bytes, user_email, increment_usage, cache, cache_key, hashes)
+        await run_in_threadpool(finish_job, job_id, response)
+        logger.info(f"✅ Analysis job {job_id} done", job_id=job_id)
+    except PoolSaturatedError:
+        await run_in_threadpool(fail_job, job_id, "Analysis service is busy. Please retry shortly.")
     except Exception as e:
-        import traceback
-        traceback.print_exc()
-        return {"error": f"Internal Server Error: {str(e)}"}
+        logger.exception(f"❌ Analysis job {job_id} failed: {e}", job_id=job_id, user=user_email)
+        await run_in_threadpool(fail_job, job_id, f"Internal Server Error: {str(e)}")
+
+@router.get("/analyze/jobs/{job_id}")
+async def get_analysis_job(job_id: str, current_user: dict = Depends(get_current_user)):
+    """Job status, the stage results produced so far and, once done, the full result."""
+    job = await run_in_threadpool(get_job, job_id, current_user.get("sub"))
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+def _sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@router.get("/analyze/jobs/{job_id}/events")
+async def stream_analysis_job(job_id: str, current_user: dict = Depends(get_current_user)):
+    """
+    Server-sent events: one event per stage result (face_shape, gender, skin,
+    color, symmetry, eyebrows, undereye, hair_properties, recommendations,
+    tips) as it finishes, then `done` with the full result or `error`.
+    """
+    user_email = current_user.get("sub")
+    if await run_in_threadpool(get_job, job_id, user_email) is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    async def events():
+        sent = 0
+        deadline = time.monotonic() + ANALYSIS_JOB_STREAM_TIMEOUT
+        last_write = time.monotonic()
+        while time.monotonic() < deadline:
+            job = await run_in_threadpool(get_job, job_id, user_email)
+            if job is None:
+                yield _sse("error", {"error": "Job expired"})
+                return
+            for item in job["events"][sent:]:
+                yield _sse(item["event"], {**item["data"], "elapsed_ms": item["elapsed_ms"]})
+                last_write = time.monotonic()
+            sent = len(job["events"])
+            if job["status"] == "done":
+                yield _sse("done", job["result"])
+                return
+            if job["status"] == "failed":
+                yield _sse("error", {"error": job["error"]})
+                return
+            if time.monotonic() - last_write > 15:
+                yield ": keep-alive\n\n"
+                last_write = time.monotonic()
+            await asyncio.sleep(ANALYSIS_JOB_POLL_INTERVAL)
+        yield _sse("error", {"error": "Timed out waiting for the job"})
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+def _save_analysis(result, img_bytes, user_email, increment_usage):
+    """Blocking disk + Mongo writes for a finished analysis (runs in the threadpool)."""
+    # 1. Save Original Image
+    filename = f"{uuid.uuid4().hex}.jpg"
+    file_path = os.path.join("static/uploads", filename)
+    
+    # Write original bytes
+    with trace("image_write"):
+        with open(file_path, "wb") as f:
+            f.write(img_bytes)
+
+    # 2. Save Annotated Image (already JPEG-encoded by the worker)
+    annotated_filename = f"annotated_{filename}"
+    annotated_path = os.path.join("static/uploads", annotated_filename)
+    with trace("image_write"):
+        with open(annotated_path, "wb") as f:
+            f.write(result["annotated_jpg"])
+
+    base_url = "http://localhost:8000"
+    image_url = f"{base_url}/static/uploads/{filename}"
+    annotated_image_url = f"{base_url}/static/uploads/{annotated_filename}"
+
+    # 3. Save Result to DB
+    analysis_doc = build_analysis_document(result, user_email, image_url, annotated_image_url, datetime.utcnow())
+    with trace("mongo_insert"):
+        analysis_id = str(analysis_collection.insert_one(analysis_doc).inserted_id)
+    get_chat_contexts().invalidate(user_email)
+    logger.info(f"✅ Saved analysis for user {user_email}", user=user_email, analysis_id=analysis_id)
+    
+    # Increment usage counter
+    increment_usage(user_email, "analysis")
+    logger.info(f"📊 Usage incremented for {user_email}")
+
+    return image_url, annotated_image_url, analysis_id
+
+def _refresh_cached_tips(result):
+    """Copy of a cached result carrying the current tips of the analysis it was stored with."""
+    result = dict(result)
+    current = get_tips(result.get("analysis_id")) if result.get("analysis_id") else None
+    if current is not None:
+        result["personalized_tips"] = current["personalized_tips"]
+        result["tips_status"] = current["tips_status"]
+    return result
+
+def _save_cached_analysis(cached, result, user_email):
+    """
+    History entry for a cache hit on another user's upload (reuses the stored images, no usage charged).
+    Returns the id of the user's analysis.
+    """
+    existing = analysis_collection.find_one({"user_email": user_email, "image_url": cached["image_url"]}, {"_id": 1})
+    if existing:
+        return str(existing["_id"])
+    analysis_doc = build_analysis_document(result, user_email, cached["image_url"],
+                                           cached["annotated_image_url"], datetime.utcnow())
+    if result.get("tips_status") == "pending":
+        # Patched together with the original when its LLM tips arrive
+        analysis_doc["tips_from"] = ObjectId(result["analysis_id"])
+    with trace("mongo_insert"):
+        analysis_id = str(analysis_collection.insert_one(analysis_doc).inserted_id)
+    get_chat_contexts().invalidate(user_email)
+    logger.info(f"✅ Saved cached analysis for user {user_email}", user=user_email, analysis_id=analysis_id)
+    return analysis_id
+
+@router.get("/analysis/{analysis_id}/tips")
+async def get_analysis_tips(analysis_id: str, current_user: dict = Depends(get_current_user)):
+    """Personalized tips of a stored analysis; poll while tips_status is "pending"."""
+    tips = await run_in_threadpool(get_tips, analysis_id, current_user.get("sub"))
+    if tips is None:
+        raise HTTPException(status_code=404, detail="Analysis not found")
+    return tips
 
 @router.get("/history")
 async def get_history(current_user: dict = Depends(get_current_user)):
@@ -247,47 +348,67 @@ async def get_history(current_user: dict = Depends(get_current_user)):
                 
         return history
     except Exception as e:
-        print(f"Error fetching history: {e}")
+        logger.error(f"Error fetching history: {e}")
         return []
 
 # --- AI CONSULTANT CHATBOT (LLM POWERED) ---
 from pydantic import BaseModel
-import requests
+from app.utils.llm_client import get_llm_client
+from app.core.config import openrouter_api_key
 import json
 import os
+import re
 
 class ChatRequest(BaseModel):
     message: str
 
-def load_api_key():
-    """Load OpenRouter API key from .env file"""
-    import os
-    
-    # Try multiple possible locations for .env file
-    possible_paths = [
-        os.path.join(os.path.dirname(__file__), "../../.env"),  # Backend/.env
-        os.path.join(os.path.dirname(__file__), "../../../.env"),  # Root .env
-        ".env",  # Current directory
-        "Backend/.env"  # From root
-    ]
-    
-    for env_path in possible_paths:
-        try:
-            abs_path = os.path.abspath(env_path)
-            if os.path.exists(abs_path):
-                print(f"📄 Found .env file at: {abs_path}")
-                with open(abs_path, "r") as f:
-                    for line in f:
-                        if line.startswith("OPENROUTER_API_KEY"):
-                            key = line.strip().split("=", 1)[1]
-                            print(f"✅ Loaded OpenRouter API key: {key[:20]}...")
-                            return key
-        except Exception as e:
-            continue
+# Try top reliable free models from OpenRouter (Fast & High Accuracy)
+CHAT_MODELS = [
+    "google/gemini-2.0-flash-exp:free",
+    "meta-llama/llama-3.1-8b-instruct:free",
+    "google/gemini-exp-1206:free",
+    "liquid/lfm-40b:free",
+    "mistralai/mistral-7b-instruct:free",
+    "microsoft/phi-3-mini-128k-instruct:free",
+]
+
+CHAT_FALLBACK_REPLY = "I'm here to help! Ask me about skincare, makeup, hairstyles, or our salon services. ✨"
+
+async def _chat_context(email):
+    """(user_context, system_prompt) for the user, from memory unless their latest scan changed."""
+    contexts = get_chat_contexts()
+    context = contexts.get(email)
+    if context is None:
+        context = await run_in_threadpool(contexts.load, email)
+    return context
+
+def _local_reply(msg, user_context):
+    """Reply of the local rule-based chatbot (always reliable)."""
+    from app.ml.chatbot import get_bot_response
     
-    print("⚠️ No OpenRouter API key found in .env file")
-    return None
+    try:
+        reply = get_bot_response(msg, user_context)
+        logger.info(f"💬 Local Chatbot Response: {reply[:100]}...")
+        return reply
+    except Exception as e:
+        logger.warning(f"⚠️ Chatbot Error: {e}")
+        return CHAT_FALLBACK_REPLY
 
+def _save_chat(email, message, reply, source):
+    """Store one exchange in the user's chat history (failures are logged, never raised)."""
+    from app.mongodb.chat_collection import chat_messages_collection
+    try:
+        result = chat_messages_collection.insert_one({
+            "user_email": email,
+            "message": message,
+            "reply": reply,
+            "source": source,
+            "created_at": datetime.utcnow(),
+        })
+        return str(result.inserted_id)
+    except Exception as e:
+        logger.warning(f"⚠️ Could not save chat message: {e}")
+        return None
 
 @router.post("/chat")
 async def chat_consultant(req: ChatRequest, current_user: dict = Depends(get_current_user)):
@@ -296,126 +417,81 @@ async def chat_consultant(req: ChatRequest, current_user: dict = Depends(get_cur
     1. Tries OpenRouter API for comprehensive responses
     2. Falls back to local rule-based AI if API fails
     Provides intelligent responses based on user context.
+    See /chat/stream for the token-streaming variant.
     """
     msg = req.message
     email = current_user.get("sub")
     
     # 1. RETRIEVE USER CONTEXT
-    last_scan = analysis_collection.find_one({"user_email": email}, sort=[("created_at", -1)])
-    
-    # Prepare context for chatbot
-    user_context = None
-    skin_context = "User has no recent scan."
-    gender = "Female"
-    
-    if last_scan:
-        gender = last_scan.get("gender", "Female")
-        scores = last_scan.get('skin_scores', {})
-        shape = last_scan.get('face_shape', 'Unknown')
-        skin_tone = last_scan.get('skin_tone', 'Unknown')
-        eye_color = last_scan.get('eye_color', 'Unknown')
-        hair_color = last_scan.get('hair_color', 'Unknown')
-        
-        skin_context = f"""User Profile:
-- Gender: {gender}
-- Face Shape: {shape}
-- Skin Tone: {skin_tone}
-- Eye Color: {eye_color}
-- Hair Color: {hair_color}
-- Acne: {scores.get('acne',0)*100:.0f}%
-- Oiliness: {scores.get('oiliness',0)*100:.0f}%
-- Texture: {scores.get('texture',0)*100:.0f}%"""
-        
-        user_context = {
-            "gender": gender,
-            "face_shape": shape,
-            "skin_scores": scores,
-            "skin_tone": skin_tone,
-            "undertone": last_scan.get("undertone"),
-            "eye_color": eye_color,
-            "hair_color": hair_color,
-            "season": last_scan.get("season")
-        }
+    user_context, system_prompt = await _chat_context(email)
     
     # 2. TRY OPENROUTER API FIRST (for comprehensive responses)
-    api_key = load_api_key()
-    
+    api_key = openrouter_api_key()
+    reply = None
     if api_key:
-        from app.ml.services_db import PARLOR_SERVICES
-        services_context = json.dumps(PARLOR_SERVICES.get(gender, PARLOR_SERVICES["Female"]))
-        
-        system_prompt = f"""You are an elite AI Beauty Consultant for a premium salon.
-
-**CLIENT PROFILE:**
-{skin_context}
-
-**AVAILABLE SERVICES:**
-{services_context}
-
-**INSTRUCTIONS:**
-1. Be professional, empathetic, and helpful
-2. Provide detailed, personalized advice based on the client's profile
-3. When recommending services, use exact names and prices from AVAILABLE SERVICES
-4. For skincare questions, give specific product recommendations and routines
-5. For makeup questions, suggest colors based on their skin tone and coloring
-6. Keep responses conversational but informative (2-4 sentences)
-7. If they ask to book, say "I can help you schedule! Please call us at (555) 123-4567"
-"""
-        
-        # Try top reliable free models from OpenRouter (Fast & High Accuracy)
-        models_to_try = [
-            "google/gemini-2.0-flash-exp:free",
-            "meta-llama/llama-3.1-8b-instruct:free",
-            "google/gemini-exp-1206:free",
-            "liquid/lfm-40b:free",
-            "mistralai/mistral-7b-instruct:free",
-            "microsoft/phi-3-mini-128k-instruct:free",
-        ]
-        
-        import time
-        for model in models_to_try:
-            try:
-                print(f"🤖 Trying OpenRouter Model: {model}...")
-                response = requests.post(
-                    url="https://openrouter.ai/api/v1/chat/completions",
-                    headers={
-                        "Authorization": f"Bearer {api_key}",
-                        "Content-Type": "application/json",
-                        "HTTP-Referer": "http://localhost:3000",
-                    },
-                    data=json.dumps({
-                        "model": model,
-                        "messages": [
-                            {"role": "system", "content": system_prompt},
-                            {"role": "user", "content": msg}
-                        ]
-                    }),
-                    timeout=15
-                )
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    if 'choices' in data and len(data['choices']) > 0:
-                        ai_reply = data['choices'][0]['message']['content']
-                        print(f"✅ OpenRouter Success: {ai_reply[:100]}...")
-                        return {"reply": ai_reply}
-                
-                print(f"⚠️ Model {model} failed: {response.status_code}")
-                
-            except Exception as e:
-                print(f"⚠️ Model {model} error: {str(e)}")
-                continue
-        
-        print("⚠️ All OpenRouter models failed, using local fallback...")
+        # Pooled client: skips models with an open circuit breaker, hedges slow ones
+        reply = await get_llm_client().complete(
+            CHAT_MODELS,
+            [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": msg}
+            ],
+            api_key
+        )
+        if reply is not None:
+            logger.info(f"✅ OpenRouter Success ({reply.model}): {reply.content[:100]}...", model=reply.model)
+        else:
+            logger.warning("⚠️ All OpenRouter models failed, using local fallback...")
     
     # 3. FALLBACK TO LOCAL CHATBOT (always reliable)
-    from app.ml.chatbot import get_bot_response
-    
-    try:
-        reply = get_bot_response(msg, user_context)
-        print(f"💬 Local Chatbot Response: {reply[:100]}...")
-        return {"reply": reply}
-    except Exception as e:
-        print(f"⚠️ Chatbot Error: {e}")
-        return {"reply": "I'm here to help! Ask me about skincare, makeup, hairstyles, or our salon services. ✨"}
+    if reply is not None:
+        text, source = reply.content, reply.model
+    else:
+        text, source = _local_reply(msg, user_context), "local"
+    await run_in_threadpool(_save_chat, email, msg, text, source)
+    return {"reply": text}
+
+@router.post("/chat/stream")
+async def chat_consultant_stream(req: ChatRequest, current_user: dict = Depends(get_current_user)):
+    """
+    Streaming variant of /chat, as server-sent events:
+    `token` {"text"} for each piece of the reply as the model generates it,
+    then `done` {"reply", "source", "message_id"} with the assembled reply.
+    Falls back to streaming the local chatbot's reply if no model answers.
+    """
+    msg = req.message
+    email = current_user.get("sub")
+    user_context, system_prompt = await _chat_context(email)
+    api_key = openrouter_api_key()
+
+    async def events():
+        parts, source = [], "local"
+        if api_key:
+            stream = get_llm_client().stream(
+                CHAT_MODELS,
+                [
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": msg}
+                ],
+                api_key
+            )
+            async for model, text in stream:
+                source = model
+                parts.append(text)
+                yield _sse("token", {"text": text})
+            if not parts:
+                logger.warning("⚠️ No OpenRouter model answered, streaming local fallback...")
+
+        if not parts:
+            reply = await run_in_threadpool(_local_reply, msg, user_context)
+            # Word by word, so clients render both sources the same way
+            for text in re.findall(r"\S+\s*|\s+", reply):
+                parts.append(text)
+                yield _sse("token", {"text": text})
+
+        reply = "".join(parts)
+        message_id = await run_in_threadpool(_save_chat, email, msg, reply, source)
+        yield _sse("done", {"reply": reply, "source": source, "message_id": message_id})
 
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
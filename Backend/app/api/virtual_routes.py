@@ -1,14 +1,20 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Request
 from pydantic import BaseModel
 from typing import List, Optional
 import cv2
 import numpy as np
 import base64
+import json
 from app.ml.virtual_tryon import (
     apply_lipstick, apply_blush, apply_hair_dye, 
     apply_eyeshadow, apply_skin_smoothing, apply_pro_studio_lighting,
     apply_virtual_background, apply_foundation, detect_intelligent_skin_tone
 )
+from app.core.logger import get_logger
+from app.pipeline.worker_pool import get_analysis_pool, PoolSaturatedError
+from app.utils.upload import read_upload, read_request_body, decode_base64_image, UploadRejected
+
+logger = get_logger(__name__)
 
 router = APIRouter()
 
@@ -18,13 +24,15 @@ class EffectItem(BaseModel):
     intensity: float = 0.5
     finish: Optional[str] = "Satin"
 
-class TryOnRequest(BaseModel):
-    image: str  # Base64 string
-    effects: List[EffectItem]
+class TryOnOptions(BaseModel):
+    effects: List[EffectItem] = []
     smoothing: float = 0.0 # 0 to 1
     lighting: float = 0.0   # 0 to 1
     background_type: Optional[str] = "None" # 'Midnight', 'Atelier', 'Cyber'
 
+class TryOnRequest(TryOnOptions):
+    image: str  # Base64 string
+
 def hex_to_bgr(hex_color):
     hex_color = hex_color.lstrip('#')
     if not hex_color: return (0,0,0)
@@ -32,81 +40,154 @@ def hex_to_bgr(hex_color):
     rgb = tuple(int(hex_color[i:i + lv // 3], 16) for i in range(0, lv, lv // 3))
     return (rgb[2], rgb[1], rgb[0]) # BGR for OpenCV
 
+def _decode_image(image_bytes):
+    nparr = np.frombuffer(image_bytes, np.uint8)
+    return cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+
+async def _read_image_request(request: Request):
+    """
+    (image bytes, other fields) from either a multipart/form-data upload (an
+    `image` file part; `effects` as a JSON string) or the JSON body with a
+    base64 `image`. Size and dimension limits are enforced while reading.
+    """
+    # Capped while streaming: chunked requests carry no Content-Length for the middleware to check
+    body = await read_request_body(request)
+
+    if request.headers.get("content-type", "").startswith("multipart/form-data"):
+        async def replay():
+            return {"type": "http.request", "body": body, "more_body": False}
+
+        form = await Request(request.scope, replay).form()
+        upload = form.get("image")
+        if upload is None or isinstance(upload, str):
+            raise UploadRejected(400, "Missing image file")
+        image_bytes = await read_upload(upload)
+        fields = {key: value for key, value in form.items() if key != "image"}
+        if "effects" in fields:
+            fields["effects"] = json.loads(fields["effects"])
+        return image_bytes, fields
+
+    try:
+        fields = json.loads(body)
+    except ValueError:
+        raise UploadRejected(400, "Invalid JSON body")
+    if not isinstance(fields, dict):
+        raise UploadRejected(400, "Expected a JSON object with an `image` field")
+    return decode_base64_image(fields.pop("image", None)), fields
+
+def render_tryon(image_bytes, effects, smoothing=0.0, lighting=0.0, background_type="None"):
+    """
+    Synchronous try-on render (runs on the analysis worker pool).
+    `effects` is a list of plain EffectItem dicts so the call stays picklable.
+    Returns the JPEG-encoded result; raises ValueError for unusable input.
+    """
+    # 1. Decode Image
+    img = _decode_image(image_bytes)
+    
+    if img is None:
+        raise ValueError("Invalid image data")
+
+    # 2. Detect Landmarks
+    from app.pipeline.face_detection import detect_faces
+    faces = detect_faces(img)
+    if not faces:
+        raise ValueError("No face detected for Try-On")
+    
+    landmarks = faces[0]["points"]
+    processed_img = img.copy()
+
+    # 3. Apply Multi-Layered Effects
+    # We process foundation first for a layered approach
+    sorted_effects = sorted(effects, key=lambda x: 0 if x["type"] == 'foundation' else 1)
+
+    for effect in sorted_effects:
+        color_bgr = hex_to_bgr(effect["color"])
+        intensity = effect["intensity"]
+        if effect["type"] == 'lipstick':
+            processed_img = apply_lipstick(processed_img, landmarks, color_bgr, intensity, effect["finish"])
+        elif effect["type"] == 'blush':
+            processed_img = apply_blush(processed_img, landmarks, color_bgr, intensity)
+        elif effect["type"] == 'eyeshadow':
+            processed_img = apply_eyeshadow(processed_img, landmarks, color_bgr, intensity)
+        elif effect["type"] == 'hair':
+            processed_img = apply_hair_dye(processed_img, landmarks, color_bgr, intensity)
+        elif effect["type"] == 'foundation':
+            processed_img = apply_foundation(processed_img, landmarks, color_bgr, intensity)
+
+    # 4. Apply Global Professional Enhancements
+    if background_type and background_type != "None":
+        processed_img = apply_virtual_background(processed_img, landmarks, background_type)
+    if smoothing > 0:
+        processed_img = apply_skin_smoothing(processed_img, smoothing)
+    if lighting > 0:
+        processed_img = apply_pro_studio_lighting(processed_img, lighting)
+
+    # 5. Encode Result
+    _, buffer = cv2.imencode('.jpg', processed_img)
+    return buffer.tobytes()
+
+def match_foundation(image_bytes):
+    """Synchronous foundation match (runs on the analysis worker pool). Returns None if no face."""
+    img = _decode_image(image_bytes)
+    if img is None: return None
+    
+    from app.pipeline.face_detection import detect_faces
+    faces = detect_faces(img)
+    if not faces: return None
+    
+    return detect_intelligent_skin_tone(img, faces[0]["points"])
+
+def _busy(e):
+    return HTTPException(
+        status_code=503,
+        detail="Try-on service is busy. Please retry shortly.",
+        headers={"Retry-After": str(e.retry_after)},
+    )
+
 @router.post("/tryon")
-async def virtual_tryon(request: TryOnRequest):
+async def virtual_tryon(request: Request):
+    """
+    Accepts a TryOnRequest JSON body (base64 image) or multipart/form-data with
+    an `image` file plus `effects` (JSON string), `smoothing`, `lighting`, `background_type`.
+    """
     try:
-        # 1. Decode Image
-        header, encoded = request.image.split(",", 1) if "," in request.image else ("", request.image)
-        image_data = base64.b64decode(encoded)
-        nparr = np.frombuffer(image_data, np.uint8)
-        img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-        
-        if img is None:
-            raise HTTPException(status_code=400, detail="Invalid image data")
-
-        # 2. Detect Landmarks
-        from app.pipeline.face_detection import detect_faces
-        faces = detect_faces(img)
-        if not faces:
-            raise HTTPException(status_code=400, detail="No face detected for Try-On")
-        
-        landmarks = faces[0]["landmarks"]
-        processed_img = img.copy()
-
-        # 3. Apply Multi-Layered Effects
-        # We process foundation first for a layered approach
-        sorted_effects = sorted(request.effects, key=lambda x: 0 if x.type == 'foundation' else 1)
-
-        for effect in sorted_effects:
-            color_bgr = hex_to_bgr(effect.color)
-            if effect.type == 'lipstick':
-                processed_img = apply_lipstick(processed_img, landmarks, color_bgr, effect.intensity, effect.finish)
-            elif effect.type == 'blush':
-                processed_img = apply_blush(processed_img, landmarks, color_bgr, effect.intensity)
-            elif effect.type == 'eyeshadow':
-                processed_img = apply_eyeshadow(processed_img, landmarks, color_bgr, effect.intensity)
-            elif effect.type == 'hair':
-                processed_img = apply_hair_dye(processed_img, landmarks, color_bgr, effect.intensity)
-            elif effect.type == 'foundation':
-                processed_img = apply_foundation(processed_img, landmarks, color_bgr, effect.intensity)
-
-        # 4. Apply Global Professional Enhancements
-        if request.background_type and request.background_type != "None":
-            processed_img = apply_virtual_background(processed_img, landmarks, request.background_type)
-        if request.smoothing > 0:
-            processed_img = apply_skin_smoothing(processed_img, request.smoothing)
-        if request.lighting > 0:
-            processed_img = apply_pro_studio_lighting(processed_img, request.lighting)
-
-        # 5. Encode Result
-        _, buffer = cv2.imencode('.jpg', processed_img)
+        image_bytes, fields = await _read_image_request(request)
+        options = TryOnOptions(**fields)
+        effects = [effect.dict() for effect in options.effects]
+        buffer = await get_analysis_pool().run(
+            render_tryon, image_bytes, effects,
+            options.smoothing, options.lighting, options.background_type
+        )
         result_base64 = base64.b64encode(buffer).decode('utf-8')
         
         return {
             "image": f"data:image/jpeg;base64,{result_base64}",
             "status": "success"
         }
+    except UploadRejected as e:
+        raise HTTPException(status_code=e.status_code, detail=e.message)
+    except PoolSaturatedError as e:
+        raise _busy(e)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
-        print(f"❌ Try-On API Error: {str(e)}")
+        logger.exception(f"❌ Try-On API Error: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/tryon/foundation-match")
-async def foundation_match(request: dict):
+async def foundation_match(request: Request):
     """
     Analyzes skin to suggest the perfect foundation match.
+    Accepts JSON {"image": base64} or multipart/form-data with an `image` file.
     """
     try:
-        image_b64 = request.get("image")
-        header, encoded = image_b64.split(",", 1) if "," in image_b64 else ("", image_b64)
-        image_data = base64.b64decode(encoded)
-        nparr = np.frombuffer(image_data, np.uint8)
-        img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-        
-        from app.pipeline.face_detection import detect_faces
-        faces = detect_faces(img)
-        if not faces: return {"status": "error", "message": "No face detected"}
-        
-        match_data = detect_intelligent_skin_tone(img, faces[0]["landmarks"])
+        image_bytes, _ = await _read_image_request(request)
+        match_data = await get_analysis_pool().run(match_foundation, image_bytes)
+        if match_data is None: return {"status": "error", "message": "No face detected"}
         return {"status": "success", "data": match_data}
+    except UploadRejected as e:
+        raise HTTPException(status_code=e.status_code, detail=e.message)
+    except PoolSaturatedError as e:
+        raise _busy(e)
     except Exception as e:
         return {"status": "error", "message": str(e)}
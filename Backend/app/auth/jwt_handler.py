@@ -21,6 +21,10 @@ from datetime import datetime, timedelta
 from jose import jwt
 import os
 
+from app.core.logger import get_logger
+
+logger = get_logger(__name__)
+
 SECRET_KEY = os.getenv("JWT_SECRET", "super_secret_key")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60
@@ -36,5 +40,5 @@ def verify_access_token(token: str):
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         return payload
     except jwt.JWTError as e:
-        print(f"❌ JWT Error: {e}")
+        logger.warning(f"❌ JWT Error: {e}")
         return None
@@ -0,0 +1,64 @@
+"""
+App Configuration
+Settings read once per process (at startup, see main.py) instead of on
+every request.
+"""
+
+import os
+import threading
+
+from app.core.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Where the .env with OPENROUTER_API_KEY may live
+_ENV_PATHS = [
+    os.path.join(os.path.dirname(__file__), "../../.env"),  # Backend/.env
+    os.path.join(os.path.dirname(__file__), "../../../.env"),  # Root .env
+    ".env",  # Current directory
+    "Backend/.env"  # From root
+]
+
+_lock = threading.Lock()
+_loaded = False
+_openrouter_api_key = None
+
+
+def _read_openrouter_key():
+    """OPENROUTER_API_KEY from the environment, else from the first .env that has it."""
+    key = os.getenv("OPENROUTER_API_KEY")
+    if key:
+        logger.info("✅ Loaded OpenRouter API key from the environment")
+        return key
+
+    for env_path in _ENV_PATHS:
+        try:
+            abs_path = os.path.abspath(env_path)
+            if os.path.exists(abs_path):
+                with open(abs_path, "r") as f:
+                    for line in f:
+                        if line.startswith("OPENROUTER_API_KEY"):
+                            key = line.strip().split("=", 1)[1]
+                            logger.info(f"✅ Loaded OpenRouter API key from {abs_path}", path=abs_path)
+                            return key
+        except Exception:
+            continue
+
+    logger.warning("⚠️ No OpenRouter API key found in .env file")
+    return None
+
+
+def openrouter_api_key():
+    """The OpenRouter API key (None if not configured), read on first use only."""
+    global _loaded, _openrouter_api_key
+    if not _loaded:
+        with _lock:
+            if not _loaded:
+                _openrouter_api_key = _read_openrouter_key()
+                _loaded = True
+    return _openrouter_api_key
+
+
+def load_config():
+    """Read every setting now, so no request pays for it."""
+    openrouter_api_key()
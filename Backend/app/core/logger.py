@@ -1,8 +1,122 @@
+"""
+Structured Logger
+One JSON object per line on stdout, written by a background thread:
+logger.info() only puts the record on a queue, so request handlers and
+analysis stages never block on console I/O.
+
+Usage:
+    from app.core.logger import get_logger
+    logger = get_logger(__name__)
+    logger.info("✅ Saved analysis", user=user_email, analysis_id=analysis_id)
+    # {"ts": "...", "level": "INFO", "logger": "AI-Beauty.app.api.routes",
+    #  "msg": "✅ Saved analysis", "user": "...", "analysis_id": "..."}
+
+Keyword arguments other than the logging ones (exc_info, stack_info, ...)
+become fields of the JSON line.
+
+Configuration (environment):
+    LOG_LEVEL    minimum level (default: INFO)
+    LOG_FORMAT   "json" (default) or "text" for a human-readable console
+"""
+
+import atexit
+import copy
+import json
 import logging
+import logging.handlers
+import os
+import queue
+import sys
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json").lower()
+
+ROOT_LOGGER = "AI-Beauty"
+
+# Keyword arguments that belong to logging itself, not to the structured fields
+_LOGGING_KWARGS = {"exc_info", "stack_info", "stacklevel", "extra"}
+
+
+class JsonFormatter(logging.Formatter):
+    """Log record -> one JSON line (message, level, logger, process/thread, fields)."""
+
+    def format(self, record):
+        entry = {
+            "ts": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+            "pid": record.process,
+            "thread": record.threadName,
+        }
+        entry.update(getattr(record, "fields", None) or {})
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """The former console format, with the fields appended as key=value."""
+
+    def __init__(self):
+        super().__init__("%(asctime)s - %(levelname)s - %(message)s")
+
+    def format(self, record):
+        line = super().format(record)
+        fields = getattr(record, "fields", None)
+        if fields:
+            line += " " + " ".join(f"{k}={v}" for k, v in fields.items())
+        return line
+
+
+class StructuredLogger(logging.LoggerAdapter):
+    """logger.info("message", key=value, ...): extra keyword arguments become fields."""
+
+    def process(self, msg, kwargs):
+        fields = {k: kwargs.pop(k) for k in list(kwargs) if k not in _LOGGING_KWARGS}
+        if fields:
+            kwargs["extra"] = {**kwargs.get("extra", {}), "fields": fields}
+        return msg, kwargs
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """Hands records to the listener unformatted, with the message and traceback resolved."""
+
+    def prepare(self, record):
+        # The args and traceback may point at objects the caller changes next; the rest is formatted later
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def _install():
+    """Queue handler on the app logger, drained to stdout by a listener thread."""
+    root = logging.getLogger(ROOT_LOGGER)
+    root.setLevel(LOG_LEVEL)
+    root.propagate = False
+
+    log_queue = queue.SimpleQueue()
+    stream = logging.StreamHandler(sys.stdout)
+    stream.setFormatter(TextFormatter() if LOG_FORMAT == "text" else JsonFormatter())
+    listener = logging.handlers.QueueListener(log_queue, stream, respect_handler_level=True)
+    root.handlers = [_QueueHandler(log_queue)]
+    listener.start()
+    # Flush what is still queued when the process exits
+    atexit.register(listener.stop)
+    return listener
+
+
+_listener = _install()
+
+
+def get_logger(name=None):
+    """Structured logger under the app logger ("AI-Beauty.<name>")."""
+    base = logging.getLogger(ROOT_LOGGER)
+    return StructuredLogger(base.getChild(name) if name else base, {})
 
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(message)s"
-)
 
-logger = logging.getLogger("AI-Beauty")
+logger = get_logger()
@@ -0,0 +1,172 @@
+"""
+Stage Latency Metrics
+Histograms of how long each traced stage takes (decode, detect_faces, the
+CNNs, every /analyze DAG stage, LLM tips, disk and Mongo writes), exposed
+in the Prometheus text format on GET /metrics.
+
+Usage:
+    from app.core.metrics import trace
+
+    @trace("detect_faces")
+    def detect_faces(image): ...
+
+    with trace("mongo_insert"):
+        collection.insert_one(doc)
+
+Spans recorded inside an analysis worker process would be lost with the
+process, so pool tasks run under collect_spans(): their spans travel back
+with the result and are observed in the API process (see worker_pool.py).
+
+Configuration (environment):
+    METRICS_ENABLED    "0" turns tracing into a no-op (default: 1)
+    METRICS_BUCKETS    comma-separated histogram bounds in seconds
+"""
+
+import contextvars
+import functools
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") != "0"
+METRICS_BUCKETS = tuple(float(b) for b in os.getenv(
+    "METRICS_BUCKETS", "0.005,0.01,0.025,0.05,0.1,0.25,0.5,1,2.5,5,10,30").split(","))
+
+METRIC_NAME = "ai_beauty_stage_duration_seconds"
+
+# Span list of the pool task running in this context, if any (shared by the threads it fans out to)
+_spans = contextvars.ContextVar("metrics_spans", default=None)
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram (seconds)."""
+
+    def __init__(self, buckets=METRICS_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot: above every bound (+Inf)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, seconds):
+        self.counts[bisect_left(self.buckets, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+
+    def cumulative(self):
+        """[(upper bound, observations <= bound)], ending with (inf, count)."""
+        total, out = 0, []
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            total += count
+            out.append((bound, total))
+        return out
+
+
+class MetricsRegistry:
+    """Per-stage histograms, safe to update from any thread."""
+
+    def __init__(self, buckets=METRICS_BUCKETS):
+        self.buckets = buckets
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def observe(self, stage, seconds):
+        with self._lock:
+            histogram = self._histograms.get(stage)
+            if histogram is None:
+                histogram = self._histograms[stage] = Histogram(self.buckets)
+            histogram.observe(seconds)
+
+    def stats(self):
+        """{stage: {"count", "avg_ms"}} for health endpoints."""
+        with self._lock:
+            return {stage: {"count": h.count, "avg_ms": round(h.sum / h.count * 1000, 1)}
+                    for stage, h in sorted(self._histograms.items())}
+
+    def render(self):
+        """Prometheus text exposition of every stage histogram."""
+        lines = [
+            f"# HELP {METRIC_NAME} Latency of traced request and analysis stages.",
+            f"# TYPE {METRIC_NAME} histogram",
+        ]
+        with self._lock:
+            for stage, histogram in sorted(self._histograms.items()):
+                label = f'stage="{stage}"'
+                for bound, count in histogram.cumulative():
+                    le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                    lines.append(f'{METRIC_NAME}_bucket{{{label},le="{le}"}} {count}')
+                lines.append(f"{METRIC_NAME}_sum{{{label}}} {histogram.sum:.6f}")
+                lines.append(f"{METRIC_NAME}_count{{{label}}} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+
+# Singleton instance
+_registry = MetricsRegistry()
+
+
+def get_metrics_registry():
+    return _registry
+
+
+def observe(stage, seconds):
+    """Record one stage duration: into the current pool task's spans, or straight into the registry."""
+    if not METRICS_ENABLED:
+        return
+    spans = _spans.get()
+    if spans is not None:
+        spans.append((stage, seconds))
+    else:
+        _registry.observe(stage, seconds)
+
+
+def format_metric(name, kind, help_text, samples):
+    """Prometheus lines for a gauge/counter family; samples are ({label: value}, number) pairs."""
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+    for labels, value in samples:
+        label = ",".join(f'{k}="{v}"' for k, v in labels.items())
+        lines.append(f"{name}{{{label}}} {value}" if label else f"{name} {value}")
+    return "\n".join(lines) + "\n"
+
+
+def record_spans(spans):
+    """Observe spans collected by collect_spans() (in another thread or process)."""
+    for stage, seconds in spans:
+        _registry.observe(stage, seconds)
+
+
+@contextmanager
+def collect_spans():
+    """Gather the spans traced in this context (and threads started with its copy) into a list."""
+    spans = []
+    token = _spans.set(spans)
+    try:
+        yield spans
+    finally:
+        _spans.reset(token)
+
+
+class trace:
+    """Time a block (`with trace("skin"):`) or every call of a function (`@trace("skin")`)."""
+
+    def __init__(self, stage):
+        self.stage = stage
+        self._start = None
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        observe(self.stage, time.perf_counter() - self._start)
+        return False
+
+    def __call__(self, fn):
+        stage = self.stage
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            # A fresh span per call: the decorator instance is shared by every thread
+            with trace(stage):
+                return fn(*args, **kwargs)
+        return wrapper
@@ -27,6 +27,18 @@ app = FastAPI(
 )
 
 # 2️⃣ ADD MIDDLEWARE AFTER app IS DEFINED
+from fastapi.responses import JSONResponse
+from app.utils.upload import UPLOAD_MAX_REQUEST_BYTES
+
+# Reject oversized bodies from Content-Length before they are read or parsed
+# (registered before CORS so the 413 still carries CORS headers)
+@app.middleware("http")
+async def reject_oversized_requests(request, call_next):
+    length = request.headers.get("content-length")
+    if length and length.isdigit() and int(length) > UPLOAD_MAX_REQUEST_BYTES:
+        return JSONResponse(status_code=413, content={"detail": "Request body too large"})
+    return await call_next(request)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=[
@@ -66,3 +78,57 @@ import os
 os.makedirs("static/uploads", exist_ok=True)
 
 app.mount("/static", StaticFiles(directory="static"), name="static")
+
+# 6️⃣ ANALYSIS WORKER POOL (start with the app, expose health/metrics)
+from app.pipeline.worker_pool import get_analysis_pool, shutdown_analysis_pool
+from app.pipeline.analysis import face_shape_path_counts
+from app.pipeline.result_cache import get_result_cache, RESULT_CACHE_ENABLED
+from app.utils.llm_client import close_llm_client, llm_stats
+from app.pipeline.tips_cache import get_tips_cache, TIPS_CACHE_ENABLED
+from app.api.chat_session import get_chat_contexts
+from app.core.config import load_config
+from app.core.metrics import get_metrics_registry, format_metric
+from fastapi.responses import PlainTextResponse
+
+@app.on_event("startup")
+async def start_analysis_pool():
+    load_config()
+    get_analysis_pool().start()
+    if RESULT_CACHE_ENABLED:
+        # Model files may have changed since the last run: drop results cached by older versions
+        get_result_cache().purge_stale()
+
+@app.on_event("shutdown")
+def stop_analysis_pool():
+    shutdown_analysis_pool()
+
+@app.on_event("shutdown")
+async def stop_llm_client():
+    await close_llm_client()
+
+@app.get("/health/analysis")
+async def analysis_pool_health():
+    pool = get_analysis_pool()
+    await pool.health_check()
+    stats = {**pool.stats(), "face_shape_paths": face_shape_path_counts()}
+    if RESULT_CACHE_ENABLED:
+        stats["result_cache"] = get_result_cache().stats()
+    if TIPS_CACHE_ENABLED:
+        stats["tips_cache"] = get_tips_cache().stats()
+    stats["llm_models"] = llm_stats()
+    stats["chat_contexts"] = get_chat_contexts().stats()
+    stats["stages"] = get_metrics_registry().stats()
+    return stats
+
+# Prometheus scrape target: stage latency histograms (see app/core/metrics.py) + pool counters
+@app.get("/metrics")
+def metrics():
+    pool = get_analysis_pool().stats()
+    body = get_metrics_registry().render()
+    body += format_metric("ai_beauty_analysis_in_flight", "gauge", "Analysis pool jobs running or queued.",
+                          [({}, pool["in_flight"])])
+    body += format_metric("ai_beauty_analysis_jobs_total", "counter", "Analysis pool jobs by outcome.",
+                          [({"outcome": k}, pool[k]) for k in ("completed", "failed", "rejected")])
+    body += format_metric("ai_beauty_face_shape_path_total", "counter", "Analyses by face-shape cascade path.",
+                          [({"path": path}, n) for path, n in sorted(face_shape_path_counts().items())])
+    return PlainTextResponse(body, media_type="text/plain; version=0.0.4")
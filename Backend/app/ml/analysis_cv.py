@@ -2,25 +2,39 @@ import cv2
 import numpy as np
 import math
 import os
+import json
+import threading
 from app.ml.face_shape_predictor import get_face_shape_predictor
+from app.ml.batching import MicroBatcher, INFERENCE_MAX_BATCH
+from app.pipeline.face_context import FaceContext
+from app.pipeline.resolution import face_resolution, WORKING_FACE_WIDTH, DETAIL_FACE_WIDTH
+from app.pipeline.landmarks import FOREHEAD_IDX
+from app.core.logger import get_logger
+from app.core.metrics import trace
+
+logger = get_logger(__name__)
 
 # Try to load DenseNet-201 for Skin Analysis (97% accuracy target)
 # MIGRATION UPDATE: Switched to PyTorch. TensorFlow models disabled.
 skin_model = None
 MODEL_TYPE = None
-print("ℹ️ Analysis: Running in PyTorch Migration Mode (TF models disabled)")
+logger.info("ℹ️ Analysis: Running in PyTorch Migration Mode (TF models disabled)")
 
 # --- ADVANCED PREPROCESSING (Industry Standard) ---
 
+# Multi-Scale Retinex Gaussian sigmas (px)
+RETINEX_SCALES = [15, 80, 250]
+
 def apply_retinex(image):
     """
     Multi-Scale Retinex (MSR) for lighting correction.
     Improves accuracy by +3-5% in varied lighting conditions.
+    Full-resolution reference; analyze_skin_cv uses the fused preprocess_skin.
     """
     img_float = image.astype(np.float32) + 1.0  # Avoid log(0)
     
     # Multi-scale Gaussian blur
-    scales = [15, 80, 250]
+    scales = RETINEX_SCALES
     msr = np.zeros_like(img_float)
     
     for scale in scales:
@@ -40,6 +54,60 @@ def apply_bilateral_filter(image):
     """
     return cv2.bilateralFilter(image, d=9, sigmaColor=75, sigmaSpace=75)
 
+# preprocess_skin blurs each scale on a copy downscaled until the sigma is about this many px
+RETINEX_PYRAMID_SIGMA = 12.0
+
+def preprocess_skin(image, mask_cheeks):
+    """
+    Fused skin preprocessing: bilateral filter + Multi-Scale Retinex, then
+    only the planes analyze_skin_cv reads.
+      - the large Gaussian blurs run on downscaled copies (pyramid) and are
+        upsampled once their log is taken;
+      - one float buffer holds the image, its log and the Retinex output
+        (the log base and the 1/len(scales) factor cancel in the min-max
+        normalization, so they are skipped);
+      - LAB and gray are converted for the cheek pixels only; the V plane
+        is kept whole because CLAHE equalizes it by tiles.
+    The bilateral filter and normalization still see the whole crop: the
+    normalization range depends on every pixel. Matches apply_bilateral_filter
+    + apply_retinex within about 1 gray level on average in the cheeks and
+    gives the same stabilized scores (see test_skin_preprocessing.py).
+    Returns: dict with image (BGR uint8), v, cheek_lab (N x 3), cheek_gray (N)
+    """
+    h, w = image.shape[:2]
+    img_float = apply_bilateral_filter(image).astype(np.float32)
+    img_float += 1.0  # Avoid log(0)
+
+    log_blurs = np.zeros_like(img_float)
+    upsampled = np.empty_like(img_float)
+    for scale in RETINEX_SCALES:
+        factor = max(1.0, scale / RETINEX_PYRAMID_SIGMA)
+        small = cv2.resize(img_float, (max(1, round(w / factor)), max(1, round(h / factor))),
+                           interpolation=cv2.INTER_AREA)
+        small = cv2.GaussianBlur(small, (0, 0), scale * small.shape[1] / w)
+        cv2.log(small, small)
+        cv2.resize(small, (w, h), dst=upsampled, interpolation=cv2.INTER_LINEAR)
+        log_blurs += upsampled
+
+    # MSR = sum over scales of log(I) - log(blur(I))
+    cv2.log(img_float, img_float)
+    img_float *= len(RETINEX_SCALES)
+    img_float -= log_blurs
+    retinex = cv2.normalize(img_float, None, 0, 255, cv2.NORM_MINMAX).astype(np.uint8)
+
+    cheek_pixels = retinex[mask_cheeks > 0].reshape(-1, 1, 3)
+    if len(cheek_pixels) == 0:
+        cheek_lab, cheek_gray = np.zeros((0, 3), np.uint8), np.zeros(0, np.uint8)
+    else:
+        cheek_lab = cv2.cvtColor(cheek_pixels, cv2.COLOR_BGR2LAB).reshape(-1, 3)
+        cheek_gray = cv2.cvtColor(cheek_pixels, cv2.COLOR_BGR2GRAY).reshape(-1)
+    return {
+        "image": retinex,
+        "v": retinex.max(axis=2),  # HSV value = max(B, G, R)
+        "cheek_lab": cheek_lab,
+        "cheek_gray": cheek_gray,
+    }
+
 def extract_skin_mask_hsv(image):
     """
     HSV-based skin segmentation for background removal.
@@ -62,55 +130,43 @@ def extract_skin_mask_hsv(image):
 
 # --- 1. FACE SHAPE ANALYSIS (VECTOR SIMILARITY + ANGLE) ---
 
-def calculate_face_shape(landmarks, width, height, image=None):
-    """
-    Hybrid face shape classification:
-    1. Uses EfficientNetV2S CNN if image is provided.
-    2. Falls back to Geometric fallback if CNN is uncertain or image is missing.
-    """
-    # Initialize predictor
-    predictor = get_face_shape_predictor()
-    
-    cnn_shape = None
-    cnn_conf = 0.0
+SHAPE_CENTROIDS = {
+    "Oval":      np.array([1.50, 0.78, 0.88, 0.93, 0.65]),
+    "Round":     np.array([1.10, 0.95, 0.92, 1.05, 0.70]),
+    "Square":    np.array([1.20, 0.98, 0.95, 0.75, 0.68]),
+    "Heart":     np.array([1.35, 0.68, 1.00, 0.90, 0.62]),
+    "Long":      np.array([1.70, 0.82, 0.85, 0.92, 0.63]),
+    "Diamond":   np.array([1.45, 0.65, 0.75, 0.88, 0.60]),
+    "Pear":      np.array([1.25, 1.05, 0.80, 1.10, 0.72]),
+    "Rectangle": np.array([1.65, 0.98, 0.95, 0.75, 0.68]),
+    "Triangle":  np.array([1.30, 1.10, 0.75, 1.15, 0.75])
+}
+SHAPE_FEATURE_WEIGHTS = np.array([1.5, 2.0, 1.5, 2.5, 1.0])
+
+# Cost-aware cascade: when the geometric classifier's top-2 centroid margin is at least
+# `margin_threshold`, the CNN is skipped. Fitted by scripts/calibrate_face_shape_cascade.py;
+# FACE_SHAPE_MARGIN_THRESHOLD overrides it. Without either, the CNN always runs.
+FACE_SHAPE_CASCADE_PATH = os.path.join(os.path.dirname(__file__), '../models/face_shape_cascade.json')
+
+def _load_face_shape_cascade():
+    config = {"margin_threshold": None, "precision": None}
+    try:
+        if os.path.exists(FACE_SHAPE_CASCADE_PATH):
+            with open(FACE_SHAPE_CASCADE_PATH) as f:
+                config.update(json.load(f))
+            logger.info(f"✅ Analysis: Face shape cascade loaded (margin >= {config['margin_threshold']})")
+    except Exception as e:
+        logger.warning(f"⚠️ Analysis: Face shape cascade error {e}")
+    if os.getenv("FACE_SHAPE_MARGIN_THRESHOLD"):
+        config["margin_threshold"] = float(os.getenv("FACE_SHAPE_MARGIN_THRESHOLD"))
+    return config
 
-    # 1. TRY CNN PREDICTION
-    if image is not None and predictor.model is not None:
-        try:
-            # Crop face for CNN
-            xs = [lm.x for lm in landmarks]
-            ys = [lm.y for lm in landmarks]
-            
-            x1 = int(min(xs) * width)
-            y1 = int(min(ys) * height)
-            x2 = int(max(xs) * width)
-            y2 = int(max(ys) * height)
-            
-            # Add padding for context
-            pad_x = int((x2 - x1) * 0.2)
-            pad_y = int((y2 - y1) * 0.2)
-            
-            img_h, img_w = image.shape[:2]
-            x1 = max(0, x1 - pad_x)
-            y1 = max(0, y1 - pad_y)
-            x2 = min(img_w, x2 + pad_x)
-            y2 = min(img_h, y2 + pad_y)
-            
-            face_crop = image[y1:y2, x1:x2]
-            
-            if face_crop.size > 0:
-                cnn_shape, cnn_conf = predictor.predict(face_crop)
-                print(f"🧬 CNN FACE SHAPE: {cnn_shape} ({cnn_conf*100:.1f}%)")
-                
-                # If CNN is highly confident, return immediately
-                if cnn_conf > 0.85:
-                    return cnn_shape, cnn_conf, cnn_shape
-        except Exception as e:
-            print(f"⚠️ CNN Prediction Failed: {e}")
+FACE_SHAPE_CASCADE = _load_face_shape_cascade()
 
-    # 2. GEOMETRIC FALLBACK / SUPPLEMENT
+def face_shape_features(ctx):
+    """5-feature geometric vector: length/width, jaw/cheek, forehead/cheek, jaw angle, mid-face/cheek."""
     def get_coords(idx):
-        return (landmarks[idx].x * width, landmarks[idx].y * height)
+        return ctx.xy[idx]
 
     def dist(p1, p2):
         return math.sqrt((p1[0] - p2[0])**2 + (p1[1] - p2[1])**2)
@@ -138,27 +194,72 @@ def calculate_face_shape(landmarks, width, height, image=None):
     angle_norm = jaw_angle / 140.0
     mid_to_cheek = mid_face_width / cheek_width
 
-    user_vector = np.array([length_to_width, jaw_to_cheek, forehead_to_cheek, angle_norm, mid_to_cheek])
-
-    shapes_centroids = {
-        "Oval":      np.array([1.50, 0.78, 0.88, 0.93, 0.65]),
-        "Round":     np.array([1.10, 0.95, 0.92, 1.05, 0.70]),
-        "Square":    np.array([1.20, 0.98, 0.95, 0.75, 0.68]),
-        "Heart":     np.array([1.35, 0.68, 1.00, 0.90, 0.62]),
-        "Long":      np.array([1.70, 0.82, 0.85, 0.92, 0.63]),
-        "Diamond":   np.array([1.45, 0.65, 0.75, 0.88, 0.60]),
-        "Pear":      np.array([1.25, 1.05, 0.80, 1.10, 0.72]),
-        "Rectangle": np.array([1.65, 0.98, 0.95, 0.75, 0.68]),
-        "Triangle":  np.array([1.30, 1.10, 0.75, 1.15, 0.75])
-    }
+    return np.array([length_to_width, jaw_to_cheek, forehead_to_cheek, angle_norm, mid_to_cheek])
 
-    weights = np.array([1.5, 2.0, 1.5, 2.5, 1.0])
-    dists = {shape: np.sqrt(np.sum(weights * (user_vector - centroid)**2)) for shape, centroid in shapes_centroids.items()}
+def classify_face_shape_geometric(user_vector):
+    """
+    Weighted nearest-centroid classification.
+    Returns: (shape, confidence, margin) where margin = 2nd-best minus best distance.
+    """
+    dists = {shape: np.sqrt(np.sum(SHAPE_FEATURE_WEIGHTS * (user_vector - centroid)**2)) for shape, centroid in SHAPE_CENTROIDS.items()}
     
+    best, second = sorted(dists.values())[:2]
     geo_shape = min(dists, key=dists.get)
     geo_conf = max(0.0, min(1.0, 1.0 - (dists[geo_shape] / 1.5)))
+    return geo_shape, geo_conf, float(second - best)
+
+@face_resolution(WORKING_FACE_WIDTH)
+def calculate_face_shape(landmarks, width, height, image=None, ctx=None, return_path=False):
+    """
+    Cost-aware face shape cascade:
+    1. Cheap geometric classifier first; if its centroid margin is decisive, stop there.
+    2. Otherwise the EfficientNetV2S CNN runs (if image is provided); a confident CNN wins.
+    3. Ambiguous cases fuse CNN and geometry.
+    With return_path=True also returns which path decided:
+    "geometric", "cnn", "hybrid" or "geometric_only" (no CNN available).
+    """
+    ctx = FaceContext.ensure(ctx, image, landmarks, width, height)
+
+    def done(shape, conf, fallback, path):
+        return (shape, conf, fallback, path) if return_path else (shape, conf, fallback)
+
+    # 1. GEOMETRIC FAST PATH
+    user_vector = face_shape_features(ctx)
+    geo_shape, geo_conf, margin = classify_face_shape_geometric(user_vector)
+
+    threshold = FACE_SHAPE_CASCADE["margin_threshold"]
+    if threshold is not None and margin >= threshold:
+        # Report the calibrated precision of decisive geometric calls when we have it
+        conf = FACE_SHAPE_CASCADE["precision"] or geo_conf
+        logger.info(f"⚡ GEOMETRIC FAST PATH: {geo_shape} (margin {margin:.3f} >= {threshold:.3f})",
+                    face_shape=geo_shape, margin=round(float(margin), 3))
+        return done(geo_shape, conf, geo_shape, "geometric")
+
+    # Initialize predictor
+    predictor = get_face_shape_predictor()
+    
+    cnn_shape = None
+    cnn_conf = 0.0
+
+    # 2. CNN PREDICTION (ambiguous faces only)
+    if image is not None and predictor.model is not None:
+        try:
+            # Crop face for CNN (20% padding for context)
+            face_crop = ctx.padded_crop(0.2)
+            
+            if face_crop.size > 0:
+                with trace("face_shape_cnn"):
+                    cnn_shape, cnn_conf = predictor.predict(face_crop)
+                logger.info(f"🧬 CNN FACE SHAPE: {cnn_shape} ({cnn_conf*100:.1f}%)",
+                            face_shape=cnn_shape, confidence=round(float(cnn_conf), 3))
+                
+                # If CNN is highly confident, return immediately
+                if cnn_conf > 0.85:
+                    return done(cnn_shape, cnn_conf, cnn_shape, "cnn")
+        except Exception as e:
+            logger.warning(f"⚠️ CNN Prediction Failed: {e}")
 
-    # HYBRID DECISION
+    # 3. HYBRID DECISION
     if cnn_shape:
         # If CNN and Geometry agree, boost confidence
         if cnn_shape == geo_shape:
@@ -172,12 +273,15 @@ def calculate_face_shape(landmarks, width, height, image=None):
             # Low CNN confidence and disagreement, trust Geometry more
             final_shape = geo_shape
             final_conf = max(geo_conf, cnn_conf)
+        path = "hybrid"
     else:
         final_shape = geo_shape
         final_conf = geo_conf
+        path = "geometric_only"
 
-    print(f"✅ FINAL RESULT: {final_shape} (Confidence: {final_conf*100:.1f}%)")
-    return final_shape, final_conf, geo_shape
+    logger.info(f"✅ FINAL RESULT: {final_shape} (Confidence: {final_conf*100:.1f}%)",
+                face_shape=final_shape, confidence=round(float(final_conf), 3), path=path)
+    return done(final_shape, final_conf, geo_shape, path)
 
 # --- 2. GENDER ANALYSIS (HYBRID AI FUSION) ---
 
@@ -188,19 +292,41 @@ try:
     
     if os.path.exists(GENDER_PROTO) and os.path.exists(GENDER_MODEL):
         gender_net = cv2.dnn.readNetFromCaffe(GENDER_PROTO, GENDER_MODEL)
-        print("✅ Analysis: Gender CNN Loaded")
+        logger.info("✅ Analysis: Gender CNN Loaded")
     else:
         gender_net = None
-        print("⚠️ Analysis: Gender CNN files not found")
+        logger.warning("⚠️ Analysis: Gender CNN files not found")
 except Exception as e:
-    print(f"⚠️ Analysis: Gender CNN Error {e}")
+    logger.warning(f"⚠️ Analysis: Gender CNN Error {e}")
     gender_net = None
 
-def classify_gender_geometric(landmarks, width, height, image=None, face_shape=None):
+# cv2.dnn.Net keeps its input blob as state, so setInput/forward must not interleave across threads
+_gender_net_lock = threading.Lock()
+
+def _gender_forward(face_crops):
+    """Run gender_net on a list of face crops -> (N, 2) [male, female] probabilities."""
+    blob = cv2.dnn.blobFromImages(
+        [cv2.resize(crop, (227, 227)) for crop in face_crops],
+        1.0, (227, 227),
+        (78.4, 87.7, 114.8),
+        swapRB=False
+    )
+    with _gender_net_lock:
+        gender_net.setInput(blob)
+        return gender_net.forward()
+
+# Concurrent requests share one forward pass
+_gender_batcher = None
+if gender_net is not None and INFERENCE_MAX_BATCH > 1:
+    _gender_batcher = MicroBatcher(_gender_forward, name="gender-batcher")
+
+@face_resolution(WORKING_FACE_WIDTH)
+def classify_gender_geometric(landmarks, width, height, image=None, face_shape=None, ctx=None):
     """
     Industry-Standard Gender Classification.
     Fuses standard CNN probabilities with shape-aware biometric signals.
     """
+    ctx = FaceContext.ensure(ctx, image, landmarks, width, height)
     male_prob = 0.5
     female_prob = 0.5
     
@@ -208,40 +334,30 @@ def classify_gender_geometric(landmarks, width, height, image=None, face_shape=N
     if gender_net is not None and image is not None:
         try:
             # Optimized crop for gender detection
-            xs = [lm.x for lm in landmarks]; ys = [lm.y for lm in landmarks]
-            x1 = int(min(xs) * width); y1 = int(min(ys) * height)
-            x2 = int(max(xs) * width); y2 = int(max(ys) * height)
-            
             # Use 40% padding for context (hair/ears)
-            pad_x = int((x2 - x1) * 0.4)
-            pad_y = int((y2 - y1) * 0.4)
-            
-            face_crop = image[max(0, y1-pad_y):y2+pad_y, max(0, x1-pad_x):x2+pad_x]
+            face_crop = ctx.padded_crop(0.4)
             
             if face_crop.size > 0:
-                # Preprocessing
-                blob = cv2.dnn.blobFromImage(
-                    cv2.resize(face_crop, (227, 227)), 
-                    1.0, (227, 227), 
-                    (78.4, 87.7, 114.8), 
-                    swapRB=False
-                )
-                gender_net.setInput(blob)
-                preds = gender_net.forward()
+                with trace("gender_cnn"):
+                    if _gender_batcher is not None:
+                        preds = _gender_batcher(face_crop)
+                    else:
+                        preds = _gender_forward([face_crop])[0]
                 
-                male_prob = float(preds[0][0])
-                female_prob = float(preds[0][1])
+                male_prob = float(preds[0])
+                female_prob = float(preds[1])
                 
                 # If CNN is extremely confident (>98%), return early
                 if max(male_prob, female_prob) > 0.98:
                     res = "Male" if male_prob > female_prob else "Female"
-                    print(f"🧬 GENDER CNN (Ultra Confidence): {res} ({max(male_prob, female_prob)*100:.1f}%)")
+                    logger.info(f"🧬 GENDER CNN (Ultra Confidence): {res} ({max(male_prob, female_prob)*100:.1f}%)",
+                                gender=res, confidence=round(max(male_prob, female_prob), 3))
                     return res
         except Exception as e:
-            print(f"⚠️ Gender CNN Error: {e}")
+            logger.warning(f"⚠️ Gender CNN Error: {e}")
 
     # 2. BIOMETRIC VOTING (Shape-Aware)
-    bio_res, bio_scores = _gender_fallback_analysis(landmarks, width, height, image, face_shape=face_shape, return_scores=True)
+    bio_res, bio_scores = _gender_fallback_analysis(landmarks, width, height, image, face_shape=face_shape, return_scores=True, ctx=ctx)
     
     # --- INTELLIGENT FUSION (G2 CALIBRATION) ---
     # We increase CNN influence to 3.5 to balance the raw biometric point system
@@ -255,24 +371,26 @@ def classify_gender_geometric(landmarks, width, height, image=None, face_shape=N
             m_total += 1.0
             
     result = "Male" if m_total > f_total else "Female"
-    print(f"🔮 HYBRID GENDER [% {result.upper()} %] CNN_F:{female_prob:.2f} BIO_F:{bio_scores['female']} | CNN_M:{male_prob:.2f} BIO_M:{bio_scores['male']}")
+    logger.info(f"🔮 HYBRID GENDER [% {result.upper()} %] CNN_F:{female_prob:.2f} BIO_F:{bio_scores['female']} | CNN_M:{male_prob:.2f} BIO_M:{bio_scores['male']}",
+                gender=result, cnn_female=round(female_prob, 3), bio_female=bio_scores['female'],
+                cnn_male=round(male_prob, 3), bio_male=bio_scores['male'])
     return result
 
-def _gender_fallback_analysis(landmarks, width, height, image=None, face_shape=None, return_scores=False):
+def _gender_fallback_analysis(landmarks, width, height, image=None, face_shape=None, return_scores=False, ctx=None):
     """
     Advanced Biometric Fallback Analysis.
     """
     try:
+        ctx = FaceContext.ensure(ctx, image, landmarks, width, height)
+        lm = ctx.lm
+
         male_voter = 0
         female_voter = 0
         
         # 1. fWHR (Face Width to Height Ratio)
         # Higher in Males (>1.9). However, Round faces naturally have high fWHR.
-        l_cheek = landmarks[234]; r_cheek = landmarks[454]
-        upper_lip = landmarks[0]; brow_mid = landmarks[8]
-        
-        fw = math.sqrt((r_cheek.x - l_cheek.x)**2 + (r_cheek.y - l_cheek.y)**2) * width
-        fh = math.sqrt((brow_mid.x - upper_lip.x)**2 + (brow_mid.y - upper_lip.y)**2) * height
+        fw = math.dist(lm[454, :2], lm[234, :2]) * width
+        fh = math.dist(lm[8, :2], lm[0, :2]) * height
         fwhr = fw / fh if fh > 0 else 0
         
         # Weight fWHR less for Round/Square faces to avoid misclassifying females
@@ -285,8 +403,8 @@ def _gender_fallback_analysis(landmarks, width, height, image=None, face_shape=N
             
         # 2. Brow Position (Vertical Distance)
         # Females have significantly higher eyebrows relative to the eyes
-        l_eye = landmarks[159]; l_brow = landmarks[70]
-        brow_dist = abs(l_brow.y - l_eye.y) * height
+        # In px on a reference-width face
+        brow_dist = abs(lm[70, 1] - lm[159, 1]) * height / ctx.face_scale
         
         if brow_dist > 16.5: # Calibrated higher
             female_voter += 3.0 
@@ -295,11 +413,8 @@ def _gender_fallback_analysis(landmarks, width, height, image=None, face_shape=N
             
         # 2.5 Jawline Angularity (Male Signal)
         # Ratio of jaw width to cheek width. Males > 0.88, Females usually < 0.85
-        jaw_l = landmarks[172]; jaw_r = landmarks[397]
-        cheek_l = landmarks[234]; cheek_r = landmarks[454]
-        
-        jw = math.sqrt((jaw_r.x - jaw_l.x)**2 + (jaw_r.y - jaw_l.y)**2)
-        cw = math.sqrt((cheek_r.x - cheek_l.x)**2 + (cheek_r.y - cheek_l.y)**2)
+        jw = math.dist(lm[397, :2], lm[172, :2])
+        cw = math.dist(lm[454, :2], lm[234, :2])
         
         if cw > 0:
             jaw_ratio = jw / cw
@@ -307,10 +422,8 @@ def _gender_fallback_analysis(landmarks, width, height, image=None, face_shape=N
             elif jaw_ratio < 0.82: female_voter += 0.8
 
         # 2.8 Mouth Area Signal (Male signal: Wider Mouth)
-        m_l = landmarks[61]; m_r = landmarks[291]
-        n_l = landmarks[102]; n_r = landmarks[331]
-        mw = math.sqrt((m_r.x - m_l.x)**2 + (m_r.y - m_l.y)**2)
-        nw = math.sqrt((n_r.x - n_l.x)**2 + (n_r.y - n_l.y)**2)
+        mw = math.dist(lm[291, :2], lm[61, :2])
+        nw = math.dist(lm[331, :2], lm[102, :2])
         if nw > 0:
             m_ratio = mw / nw
             if m_ratio > 1.85: male_voter += 0.7
@@ -319,18 +432,18 @@ def _gender_fallback_analysis(landmarks, width, height, image=None, face_shape=N
         # 3. Shadow/Texture Analysis (Stubble detection)
         shadow_score = 0
         if image is not None:
-            cx = int(landmarks[152].x * width); cy = int(landmarks[152].y * height)
-            fx = int(landmarks[10].x * width); fy = int(landmarks[10].y * height)
+            cx, cy = ctx.px(152)
+            fx, fy = ctx.px(10)
             
             img_h, img_w = image.shape[:2]
-            if 40 < cy < img_h-40:
-                chin = image[cy-35:cy, cx-30:cx+30]
-                forehead = image[fy:fy+30, fx-15:fx+15]
+            if ctx.face_px(40) < cy < img_h - ctx.face_px(40):
+                c_gray = ctx.gray[cy-ctx.face_px(35):cy, cx-ctx.face_px(30):cx+ctx.face_px(30)]
+                f_gray = ctx.gray[fy:fy+ctx.face_px(30), fx-ctx.face_px(15):fx+ctx.face_px(15)]
                 
-                if chin.size > 0 and forehead.size > 0:
-                    c_gray = cv2.cvtColor(chin, cv2.COLOR_BGR2GRAY)
-                    f_gray = cv2.cvtColor(forehead, cv2.COLOR_BGR2GRAY)
-                    
+                if c_gray.size > 0 and f_gray.size > 0:
+                    # Texture compared at the scale the ratios were tuned at
+                    c_gray = ctx.at_reference_scale(c_gray)
+                    f_gray = ctx.at_reference_scale(f_gray)
                     c_var = cv2.Laplacian(c_gray, cv2.CV_64F).var()
                     f_var = cv2.Laplacian(f_gray, cv2.CV_64F).var()
                     
@@ -344,8 +457,8 @@ def _gender_fallback_analysis(landmarks, width, height, image=None, face_shape=N
         
         # 4. Hair Volume signal
         if image is not None:
-            top_y = int(landmarks[10].y * height)
-            if top_y > 40:
+            top_y = ctx.px(10)[1]
+            if top_y > ctx.face_px(40):
                 top_patch = image[0:top_y, :]
                 if top_patch.size > 0:
                     if np.std(top_patch) > 48:
@@ -363,37 +476,26 @@ def _gender_fallback_analysis(landmarks, width, height, image=None, face_shape=N
 
 # --- 3. SKIN ANALYSIS (HYBRID: CNN + K-MEANS) ---
 
-def analyze_skin_cv(image, landmarks):
+@face_resolution(DETAIL_FACE_WIDTH)
+def analyze_skin_cv(image, landmarks, ctx=None):
     """
     Analyzes skin using Hybrid ML (CNN + K-Means) with advanced preprocessing.
+    When a FaceContext is given, `image` may be None and the context's face crop is used.
     """
-    # --- PREPROCESSING PIPELINE (Industry Standard) ---
-    # Step 1: Bilateral filter for noise removal
-    image = apply_bilateral_filter(image)
-    
-    # Step 2: Retinex for lighting correction
-    image = apply_retinex(image)
-    
-    h, w, _ = image.shape
-    
-    def get_pt(idx):
-        return (int(landmarks[idx].x * w), int(landmarks[idx].y * h))
+    if ctx is not None and image is None:
+        image = ctx.face_crop
 
-    # Mask Helper
-    def get_mask(indices):
-        mask = np.zeros((h, w), dtype=np.uint8)
-        points = np.array([get_pt(i) for i in indices], dtype=np.int32)
-        cv2.fillPoly(mask, [points], 255)
-        return mask
+    # Landmarks are mapped onto the (preprocessed) image; only its geometry is used
+    skin_ctx = ctx.rescaled(image) if ctx is not None else FaceContext(image, landmarks)
 
     # ROIs
-    cheek_indices_left = [123, 50, 205, 117, 118, 101, 214, 212]
-    cheek_indices_right = [352, 280, 425, 346, 347, 330, 434, 432]
-    forehead_indices = [103, 104, 105, 9, 334, 333, 332, 297, 338, 10, 109, 67]
-    nose_indices = [197, 195, 5, 4, 1, 2, 94, 168]
+    mask_cheeks = skin_ctx.mask("cheeks")
+    mask_tzone = skin_ctx.mask("tzone")
 
-    mask_cheeks = cv2.bitwise_or(get_mask(cheek_indices_left), get_mask(cheek_indices_right))
-    mask_tzone = cv2.bitwise_or(get_mask(forehead_indices), get_mask(nose_indices))
+    # --- PREPROCESSING PIPELINE (Industry Standard) ---
+    # Bilateral filter for noise removal + Retinex for lighting correction, fused
+    planes = preprocess_skin(image, mask_cheeks)
+    image = planes["image"]
 
     # --- A. CNN PREDICTION (Global Analysis) ---
     cnn_acne = 0.0
@@ -410,14 +512,13 @@ def analyze_skin_cv(image, landmarks):
             cnn_acne = float(preds[0])
             cnn_oil = float(preds[2])
         except Exception as e:
-            print(f"⚠️ CNN Error: {e}")
+            logger.warning(f"⚠️ CNN Error: {e}")
 
     # --- B. K-MEANS CLUSTERING (Local Analysis) ---
     kmeans_acne = 0.0
     
     try:
-        lab = cv2.cvtColor(image, cv2.COLOR_BGR2LAB)
-        cheek_pixels = lab[mask_cheeks > 0]
+        cheek_pixels = planes["cheek_lab"]
         
         if cheek_pixels.size > 0:
             cheek_pixels = cheek_pixels.astype(np.float32)
@@ -441,7 +542,7 @@ def analyze_skin_cv(image, landmarks):
         final_acne = (0.3 * cnn_acne) + (0.7 * kmeans_acne)
     
     # --- OILINESS (CV + CNN) ---
-    v = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)[:,:,2]
+    v = planes["v"]
     clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8,8))
     v_eq = clahe.apply(v)
     
@@ -452,8 +553,7 @@ def analyze_skin_cv(image, landmarks):
     final_oil = max(cv_oil, cnn_oil) 
 
     # --- TEXTURE (Entropy) ---
-    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-    cheek_roi = gray[mask_cheeks > 0]
+    cheek_roi = planes["cheek_gray"]
     if cheek_roi.size > 0:
         hist, _ = np.histogram(cheek_roi, bins=256, range=(0, 256), density=True)
         hist = hist[hist > 0]
@@ -471,11 +571,13 @@ def analyze_skin_cv(image, landmarks):
         "texture": float(stabilize(texture_score))
     }
 
-def generate_annotated_image(image, landmarks, gender=None):
+@face_resolution(DETAIL_FACE_WIDTH)
+def generate_annotated_image(image, landmarks, gender=None, ctx=None):
     """
     Generates a professional, clinical-grade diagnostic overlay.
     Uses ultra-fine geometry mapping and subtle chromatic indicators.
     """
+    ctx = FaceContext.ensure(ctx, image, landmarks)
     annotated = image.copy()
     overlay = annotated.copy()
     h, w, _ = annotated.shape
@@ -485,8 +587,7 @@ def generate_annotated_image(image, landmarks, gender=None):
     PRIMARY_COLOR = (240, 180, 60) if gender == "Male" else (220, 100, 255) # Soft Blue vs Soft Pink
     ACCENT_COLOR = (50, 230, 255) # Cyan Glow
     
-    def get_pt(idx): 
-        return (int(landmarks[idx].x * w), int(landmarks[idx].y * h))
+    get_pt = ctx.px
     
     # 1. DRAW ARCHITECTURAL JAWLINE (Subtle Flow)
     jaw_pts = [172, 58, 132, 152, 282, 331, 397] # More points for smoothness
@@ -497,8 +598,7 @@ def generate_annotated_image(image, landmarks, gender=None):
         cv2.circle(overlay, p1, 2, PRIMARY_COLOR, -1, cv2.LINE_AA)
     
     # 2. DRAW T-ZONE SCANNER (Architecture)
-    tzone_indices = [103, 104, 105, 9, 334, 333, 332, 297, 338, 10, 109, 67]
-    pts = np.array([get_pt(i) for i in tzone_indices], dtype=np.int32).reshape((-1, 1, 2))
+    pts = ctx.polygon(FOREHEAD_IDX).reshape((-1, 1, 2))
     cv2.polylines(overlay, [pts], True, ACCENT_COLOR, 1, cv2.LINE_AA)
     
     # 3. DRAW EYE FRAME (Precision Points)
@@ -512,24 +612,24 @@ def generate_annotated_image(image, landmarks, gender=None):
     
     return annotated
 
-def calculate_facial_symmetry(landmarks, width, height):
+@face_resolution(WORKING_FACE_WIDTH)
+def calculate_facial_symmetry(landmarks, width, height, ctx=None):
     """
     Mathematical symmetry mapping using horizontal distance variance.
     Compares left vs right Euclidean distances to the central facial axis.
     """
     try:
+        ctx = FaceContext.ensure(ctx, None, landmarks, width, height)
+
         # Central axis landmarks (Nose bridge)
-        axis_top = landmarks[168]
-        axis_bottom = landmarks[1]
+        x1, y1 = ctx.xy[168].tolist()
+        x2, y2 = ctx.xy[1].tolist()
+        denominator = math.sqrt((x2-x1)**2 + (y2-y1)**2)
         
-        def get_dist_to_axis(lm):
+        def get_dist_to_axis(idx):
             # Distance from point to line (central axis)
-            x0, y0 = lm.x * width, lm.y * height
-            x1, y1 = axis_top.x * width, axis_top.y * height
-            x2, y2 = axis_bottom.x * width, axis_bottom.y * height
-            
+            x0, y0 = ctx.xy[idx].tolist()
             numerator = abs((x2-x1)*(y1-y0) - (x1-x0)*(y2-y1))
-            denominator = math.sqrt((x2-x1)**2 + (y2-y1)**2)
             return numerator / (denominator + 1e-6)
 
         # Pairs to compare
@@ -543,8 +643,8 @@ def calculate_facial_symmetry(landmarks, width, height):
         
         diffs = []
         for p1_idx, p2_idx in pairs:
-            d1 = get_dist_to_axis(landmarks[p1_idx])
-            d2 = get_dist_to_axis(landmarks[p2_idx])
+            d1 = get_dist_to_axis(p1_idx)
+            d2 = get_dist_to_axis(p2_idx)
             # Percentage difference
             diff = abs(d1 - d2) / ((d1 + d2) / 2 + 1e-6)
             diffs.append(diff)
@@ -564,21 +664,25 @@ def calculate_facial_symmetry(landmarks, width, height):
     except:
         return {"score": 90.0, "status": "Stable", "deviation": 0.0}
 
-def analyze_eyebrows(landmarks, width, height, face_shape):
+@face_resolution(WORKING_FACE_WIDTH)
+def analyze_eyebrows(landmarks, width, height, face_shape, ctx=None):
     """
     Calculates eyebrow architecture: Arch height and thickness relative to morphology.
     """
     try:
+        ctx = FaceContext.ensure(ctx, None, landmarks, width, height)
+
         # Left Brow: Inner(70), Peak(105), Outer(107)
         # Left Eye: Top(159)
-        l_eye_top = landmarks[159].y * height
-        l_brow_inner = landmarks[70].y * height
-        l_brow_peak = landmarks[105].y * height
+        l_eye_top = float(ctx.xy[159, 1])
+        l_brow_inner = float(ctx.xy[70, 1])
+        l_brow_peak = float(ctx.xy[105, 1])
         
         # Calculate arch height (vertical distance from inner to peak)
-        arch_height = abs(l_brow_peak - l_brow_inner)
+        # Both heights in px on a reference-width face, so the thresholds hold at any resolution
+        arch_height = abs(l_brow_peak - l_brow_inner) / ctx.face_scale
         # Position height (distance from eye)
-        pos_height = abs(l_eye_top - l_brow_peak)
+        pos_height = abs(l_eye_top - l_brow_peak) / ctx.face_scale
         
         # Arch Level categorization
         arch_level = "High Arch" if arch_height > 12 else \
@@ -604,18 +708,20 @@ def analyze_eyebrows(landmarks, width, height, face_shape):
     except:
         return {"arch_level": "Medium", "position": "Normal", "suggestion": "Maintain natural shape."}
 
-def detect_undereye_concerns(image, landmarks):
+@face_resolution(DETAIL_FACE_WIDTH)
+def detect_undereye_concerns(image, landmarks, ctx=None):
     """
     Analyzes the 'Tear Trough' area for dark circles and puffiness using Chromatic L* and b* variance.
     """
     try:
-        h, w, _ = image.shape
+        ctx = FaceContext.ensure(ctx, image, landmarks)
         # ROI for under eyes (Left: 230, Right: 450 approx)
-        l_pt = landmarks[230]; r_pt = landmarks[450]
+        l_pt = 230; r_pt = 450
         
-        def analyze_patch(pt):
-            px, py = int(pt.x * w), int(pt.y * h)
-            patch = image[py:py+15, px-10:px+10]
+        # Patch sizes are tuned for a reference-width face
+        def analyze_patch(idx):
+            px, py = ctx.px(idx)
+            patch = image[py:py+ctx.face_px(15), px-ctx.face_px(10):px+ctx.face_px(10)]
             if patch.size == 0: return 0, 0
             
             lab = cv2.cvtColor(patch, cv2.COLOR_BGR2LAB)
@@ -628,15 +734,14 @@ def detect_undereye_concerns(image, landmarks):
         
         avg_light = (l_light + r_light) / 2
         # Dark circle score based on lightness compared to forehead (reference)
-        f_pt = landmarks[10]
-        f_light, _ = analyze_patch(f_pt)
+        f_light, _ = analyze_patch(10)
         
         dark_circle_score = max(0, min(100, (f_light - avg_light) * 1.5))
         
         # Puffiness detection using Laplacian variance (shadow depth)
-        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-        l_p = int(l_pt.x * w); l_py = int(l_pt.y * h)
-        eye_patch = gray[l_py:l_py+20, l_p-15:l_p+15]
+        l_p, l_py = ctx.px(l_pt)
+        eye_patch = ctx.gray[l_py:l_py+ctx.face_px(20), l_p-ctx.face_px(15):l_p+ctx.face_px(15)]
+        eye_patch = ctx.at_reference_scale(eye_patch)
         puff_val = cv2.Laplacian(eye_patch, cv2.CV_64F).var()
         
         return {
@@ -647,7 +752,8 @@ def detect_undereye_concerns(image, landmarks):
     except:
         return {"dark_circles": 0.0, "puffiness": "Minimal", "concerns": "Clear"}
 
-def detect_hair_properties(image, landmarks):
+@face_resolution(WORKING_FACE_WIDTH)
+def detect_hair_properties(image, landmarks, ctx=None):
     """
     Advanced Hair Morphology Analysis:
     1. Hairline Recession Index (Geometric Proportions)
@@ -655,17 +761,19 @@ def detect_hair_properties(image, landmarks):
     3. Hair Density & Thickness (Pixel-Ratio Mapping)
     """
     try:
-        h, w, _ = image.shape
+        ctx = FaceContext.ensure(ctx, image, landmarks)
+        h, w = ctx.height, ctx.width
+        lm = ctx.lm
         # Reference points: Top of forehead (10), Nose bridge (168), Chin (152)
-        top_head = landmarks[10]
-        eye_mid = landmarks[168]
-        chin = landmarks[152]
+        top_head_y = lm[10, 1]
+        eye_mid_y = lm[168, 1]
+        chin_y = lm[152, 1]
         
         # --- 1. HAIRLINE RECESSION INDEX ---
         # Using Rule of Thirds calibration. 
         # Forehead height (10 to 168) vs Total Face Height (10 to 152)
-        face_height = abs(chin.y - top_head.y) * h
-        forehead_height = abs(top_head.y - eye_mid.y) * h
+        face_height = abs(chin_y - top_head_y) * h
+        forehead_height = abs(top_head_y - eye_mid_y) * h
         
         recession_ratio = forehead_height / (face_height + 1e-6)
         
@@ -680,10 +788,11 @@ def detect_hair_properties(image, landmarks):
                  "Early Recession" if recession_score < 75 else "Significant Recession"
 
         # --- 2. DENSITY & CURL PATTERN (SAMPLING) ---
-        top_y = int(top_head.y * h)
+        top_y = ctx.px(10)[1]
         
         # If the face is too high in the frame, we fallback to safer estimates
-        if top_y < 40:
+        # (band sizes are tuned for a reference-width face, see FaceContext.face_px)
+        if top_y < ctx.face_px(40):
              return {
                 "density": "Medium",
                 "texture": "Straight",
@@ -693,13 +802,15 @@ def detect_hair_properties(image, landmarks):
             }
 
         # Sample crown area (above forehead)
-        crown_y1 = max(0, top_y - 120)
-        crown_patch = image[crown_y1:top_y, int(w*0.3):int(w*0.7)]
+        crown_y1 = max(0, top_y - ctx.face_px(120))
+        gray = ctx.gray[crown_y1:top_y, int(w*0.3):int(w*0.7)]
         
-        if crown_patch.size == 0:
+        if gray.size == 0:
              return {"density": "Medium", "texture": "Straight", "recession_index": 0.0}
 
-        gray = cv2.cvtColor(crown_patch, cv2.COLOR_BGR2GRAY)
+        # Edge and frequency thresholds below are tuned for a reference-width face
+        gray = ctx.at_reference_scale(gray)
+
         
         # Density Calculation (Edge Density Ratio)
         edges = cv2.Canny(gray, 50, 150)
@@ -710,15 +821,16 @@ def detect_hair_properties(image, landmarks):
 
         # Curl Pattern (2D FFT frequency distribution)
         # Curly hair has a higher distribution of high-frequency components
-        f = np.fft.fft2(gray)
-        fshift = np.fft.fftshift(f)
-        magnitude_spectrum = 20 * np.log(np.abs(fshift) + 1)
-        
-        rows, cols = gray.shape
-        crow, ccol = rows//2 , cols//2
-        # Mask central DC component
-        magnitude_spectrum[crow-5:crow+5, ccol-5:ccol+5] = 0
-        hf_energy = np.mean(magnitude_spectrum)
+        with trace("hair_fft"):
+            f = np.fft.fft2(gray)
+            fshift = np.fft.fftshift(f)
+            magnitude_spectrum = 20 * np.log(np.abs(fshift) + 1)
+
+            rows, cols = gray.shape
+            crow, ccol = rows//2 , cols//2
+            # Mask central DC component
+            magnitude_spectrum[crow-5:crow+5, ccol-5:ccol+5] = 0
+            hf_energy = np.mean(magnitude_spectrum)
         
         # Pattern Calibration (Type 1-4)
         if hf_energy > 52:
@@ -743,7 +855,7 @@ def detect_hair_properties(image, landmarks):
             "health_score": round(100 - (recession_score * 0.4), 1)
         }
     except Exception as e:
-        print(f"⚠️ Hair Analysis Error: {e}")
+        logger.warning(f"⚠️ Hair Analysis Error: {e}")
         return {
             "density": "Medium", 
             "texture": "Straight", 
@@ -0,0 +1,108 @@
+"""
+Dynamic Micro-Batching
+Queues single-item inference calls coming from concurrent requests and runs
+them through the model as one batch, flushing when the batch is full or the
+oldest call has waited `max_delay_ms`.
+
+Batches only form from calls in the same process, so they never exceed the
+number of analysis threads running there: ANALYSIS_POOL_WORKERS in thread
+mode (batches of 1-2 with the default of 2), always 1 in process mode where
+each worker process runs one job at a time. Waiting for companions only pays
+off with several threads, so the delay defaults to 0 otherwise; calls that
+are already queued are still batched together.
+
+Configuration (environment):
+    INFERENCE_MAX_BATCH     largest batch sent to a model (default: 8, 1 disables batching)
+    INFERENCE_MAX_DELAY_MS  longest a call waits for companions (default: 5 with
+                            2+ thread-mode pool workers, else 0)
+"""
+
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from app.pipeline.worker_pool import ANALYSIS_POOL_MODE, ANALYSIS_POOL_WORKERS
+
+# Only concurrent analysis threads in one process can share a batch
+_CAN_BATCH_ACROSS_REQUESTS = ANALYSIS_POOL_MODE == "thread" and ANALYSIS_POOL_WORKERS >= 2
+
+INFERENCE_MAX_BATCH = int(os.getenv("INFERENCE_MAX_BATCH", 8))
+INFERENCE_MAX_DELAY_MS = float(os.getenv("INFERENCE_MAX_DELAY_MS", 5 if _CAN_BATCH_ACROSS_REQUESTS else 0))
+
+
+class MicroBatcher:
+    """
+    Usage:
+        batcher = MicroBatcher(predict_batch, max_batch_size=8, max_delay_ms=5)
+        future = batcher.submit(face_crop)   # concurrent.futures.Future
+        label, conf = future.result()        # or simply batcher(face_crop)
+
+    `batch_fn(items)` receives a list and must return one result per item, in
+    order. If it raises, every future of that batch gets the exception.
+    """
+
+    def __init__(self, batch_fn, max_batch_size=INFERENCE_MAX_BATCH,
+                 max_delay_ms=INFERENCE_MAX_DELAY_MS, name="micro-batcher"):
+        self.batch_fn = batch_fn
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_delay = max_delay_ms / 1000.0
+        self.name = name
+        self.batches = 0
+        self.items = 0
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def submit(self, item):
+        future = Future()
+        self._ensure_thread()
+        self._queue.put((item, future))
+        return future
+
+    def __call__(self, item):
+        return self.submit(item).result()
+
+    @property
+    def mean_batch_size(self):
+        return self.items / self.batches if self.batches else 0.0
+
+    def _ensure_thread(self):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._loop, name=self.name, daemon=True)
+                    self._thread.start()
+
+    def _loop(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.max_delay
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    # Past the deadline (or with no delay) only take calls already waiting
+                    batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            self._run(batch)
+
+    def _run(self, batch):
+        batch = [(item, future) for item, future in batch if future.set_running_or_notify_cancel()]
+        if not batch:
+            return
+
+        self.batches += 1
+        self.items += len(batch)
+        try:
+            results = list(self.batch_fn([item for item, _ in batch]))
+            if len(results) != len(batch):
+                raise RuntimeError(f"{self.name}: batch_fn returned {len(results)} results for {len(batch)} items")
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+
+        for (_, future), result in zip(batch, results):
+            future.set_result(result)
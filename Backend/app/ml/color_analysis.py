@@ -5,29 +5,25 @@ Detects skin tone, eye color, and hair color from facial images
 
 import cv2
 import numpy as np
-from sklearn.cluster import KMeans
+from app.ml.dominant_color import dominant_color
+from app.pipeline.face_context import FaceContext
+from app.pipeline.resolution import face_resolution, WORKING_FACE_WIDTH
+from app.core.logger import get_logger
 
+logger = get_logger(__name__)
 
-def detect_skin_tone(image, landmarks):
+
+@face_resolution(WORKING_FACE_WIDTH)
+def detect_skin_tone(image, landmarks, ctx=None):
     """
     Analyzes skin tone and returns undertone classification.
     Returns: (tone_name, undertone, hex_color)
     """
     try:
-        # Get face region excluding eyes, eyebrows, and mouth
-        height, width = image.shape[:2]
-        
-        # Sample from cheek areas (safe zones for skin tone)
-        left_cheek = landmarks[234]  # Left cheek
-        right_cheek = landmarks[454]  # Right cheek
-        
-        # Create mask for sampling
-        mask = np.zeros((height, width), dtype=np.uint8)
+        ctx = FaceContext.ensure(ctx, image, landmarks)
         
-        # Sample circular regions on cheeks
-        cheek_radius = int(width * 0.05)
-        cv2.circle(mask, (int(left_cheek.x * width), int(left_cheek.y * height)), cheek_radius, 255, -1)
-        cv2.circle(mask, (int(right_cheek.x * width), int(right_cheek.y * height)), cheek_radius, 255, -1)
+        # Sample circular regions on cheeks (safe zones for skin tone)
+        mask = ctx.mask("cheek_patches")
         
         # Extract skin pixels
         skin_pixels = image[mask == 255]
@@ -68,33 +64,26 @@ def detect_skin_tone(image, landmarks):
         else:
             tone_name = "Fair"
         
-        print(f"🎨 SKIN TONE: {tone_name} ({undertone}) - {hex_color}")
+        logger.info(f"🎨 SKIN TONE: {tone_name} ({undertone}) - {hex_color}",
+                    skin_tone=tone_name, undertone=undertone, hex=hex_color)
         return tone_name, undertone, hex_color
         
     except Exception as e:
-        print(f"⚠️ Skin tone detection failed: {e}")
+        logger.warning(f"⚠️ Skin tone detection failed: {e}")
         return "Medium", "Neutral", "#C68642"
 
 
-def detect_eye_color(image, landmarks):
+@face_resolution(WORKING_FACE_WIDTH)
+def detect_eye_color(image, landmarks, ctx=None):
     """
     Detects eye color from iris region.
     Returns: (color_name, hex_color)
     """
     try:
-        height, width = image.shape[:2]
+        ctx = FaceContext.ensure(ctx, image, landmarks)
         
-        # Get left eye landmarks (iris center approximately)
-        left_eye_center = landmarks[468]  # Left iris landmark
-        right_eye_center = landmarks[473]  # Right iris landmark
-        
-        # Sample small region around iris
-        iris_radius = int(width * 0.015)  # Small radius for iris
-        
-        # Create mask
-        mask = np.zeros((height, width), dtype=np.uint8)
-        cv2.circle(mask, (int(left_eye_center.x * width), int(left_eye_center.y * height)), iris_radius, 255, -1)
-        cv2.circle(mask, (int(right_eye_center.x * width), int(right_eye_center.y * height)), iris_radius, 255, -1)
+        # Sample small region around both iris landmarks (468, 473)
+        mask = ctx.mask("iris")
         
         # Extract iris pixels
         iris_pixels = image[mask == 255]
@@ -102,7 +91,7 @@ def detect_eye_color(image, landmarks):
         if len(iris_pixels) < 5:
             return "Brown", "#8B4513"
         
-        # Use K-means to find dominant color (excluding very dark/light pixels)
+        # Median iris colour, excluding very dark/light pixels
         # Filter out eyelashes and reflections
         filtered_pixels = iris_pixels[
             (iris_pixels[:, 0] > 20) & (iris_pixels[:, 0] < 240) &
@@ -113,7 +102,6 @@ def detect_eye_color(image, landmarks):
         if len(filtered_pixels) < 5:
             filtered_pixels = iris_pixels
         
-        # Get dominant color
         avg_color = np.median(filtered_pixels, axis=0).astype(int)
         b, g, r = avg_color
         
@@ -136,38 +124,30 @@ def detect_eye_color(image, landmarks):
         else:
             color_name = "Brown"
         
-        print(f"👁️ EYE COLOR: {color_name} - {hex_color}")
+        logger.info(f"👁️ EYE COLOR: {color_name} - {hex_color}", eye_color=color_name, hex=hex_color)
         return color_name, hex_color
         
     except Exception as e:
-        print(f"⚠️ Eye color detection failed: {e}")
+        logger.warning(f"⚠️ Eye color detection failed: {e}")
         return "Brown", "#8B4513"
 
 
-def detect_hair_color(image, landmarks):
+@face_resolution(WORKING_FACE_WIDTH)
+def detect_hair_color(image, landmarks, ctx=None):
     """
     Detects hair color from region above forehead.
     Returns: (color_name, hex_color)
     """
     try:
-        height, width = image.shape[:2]
-        
-        # Get forehead landmark
-        forehead = landmarks[10]
+        ctx = FaceContext.ensure(ctx, image, landmarks)
         
-        # Sample region above forehead (hair region)
-        forehead_y = int(forehead.y * height)
+        # Sample hair region (band above forehead)
+        hair_region = ctx.hair_band
         
-        if forehead_y < 30:
+        if hair_region is None or hair_region.size == 0:
             return "Brown", "#654321"
         
-        # Sample hair region (above forehead)
-        hair_region = image[max(0, forehead_y - 60):forehead_y - 10, :]
-        
-        if hair_region.size == 0:
-            return "Brown", "#654321"
-        
-        # Reshape for K-means
+        # Reshape to a pixel list
         pixels = hair_region.reshape(-1, 3)
         
         # Filter out very bright pixels (likely background/lighting)
@@ -178,17 +158,8 @@ def detect_hair_color(image, landmarks):
         if len(filtered_pixels) < 10:
             filtered_pixels = pixels
         
-        # Use K-means to find dominant color
-        kmeans = KMeans(n_clusters=3, random_state=42, n_init=10)
-        kmeans.fit(filtered_pixels)
-        
-        # Get the most common cluster
-        labels = kmeans.labels_
-        counts = np.bincount(labels)
-        dominant_cluster = np.argmax(counts)
-        dominant_color = kmeans.cluster_centers_[dominant_cluster].astype(int)
-        
-        b, g, r = dominant_color
+        # Center of the most common of 3 colour clusters (bounded pixel budget)
+        b, g, r = dominant_color(filtered_pixels, k=3).astype(int)
         hex_color = f"#{r:02x}{g:02x}{b:02x}"
         
         # Classify hair color
@@ -221,11 +192,11 @@ def detect_hair_color(image, landmarks):
             else:
                 color_name = "Blonde"
         
-        print(f"💇 HAIR COLOR: {color_name} - {hex_color}")
+        logger.info(f"💇 HAIR COLOR: {color_name} - {hex_color}", hair_color=color_name, hex=hex_color)
         return color_name, hex_color
         
     except Exception as e:
-        print(f"⚠️ Hair color detection failed: {e}")
+        logger.warning(f"⚠️ Hair color detection failed: {e}")
         return "Brown", "#654321"
 
 
@@ -1,6 +1,8 @@
 import numpy as np
 import cv2
-from sklearn.cluster import KMeans
+
+from app.ml.dominant_color import dominant_color
+from app.pipeline.face_context import FaceContext
 
 def rgb_to_lab(rgb):
     """
@@ -129,31 +131,79 @@ def ciede2000(lab1, lab2):
     
     return delta_E
 
-def extract_dominant_skin_color(image, landmarks):
+def ciede2000_batch(lab, lab_matrix):
+    """
+    CIEDE2000 between one LAB colour and every row of `lab_matrix` (N x 3).
+    Same formula as ciede2000(), vectorized over the rows.
+    Returns: float64 array of N distances
+    """
+    L1, a1, b1 = (float(v) for v in lab)
+    lab_matrix = np.asarray(lab_matrix, dtype=np.float64).reshape(-1, 3)
+    L2, a2, b2 = lab_matrix[:, 0], lab_matrix[:, 1], lab_matrix[:, 2]
+
+    # C and G factor
+    C1 = np.hypot(a1, b1)
+    C2 = np.hypot(a2, b2)
+    C_bar7 = ((C1 + C2) / 2) ** 7
+    G = 0.5 * (1 - np.sqrt(C_bar7 / (C_bar7 + 25**7)))
+
+    # a', C' and h'
+    a1_prime = a1 * (1 + G)
+    a2_prime = a2 * (1 + G)
+    C1_prime = np.hypot(a1_prime, b1)
+    C2_prime = np.hypot(a2_prime, b2)
+    h1_prime = np.degrees(np.arctan2(b1, a1_prime)) % 360
+    h2_prime = np.degrees(np.arctan2(b2, a2_prime)) % 360
+
+    # Delta values
+    delta_L_prime = L2 - L1
+    delta_C_prime = C2_prime - C1_prime
+
+    chroma_product = C1_prime * C2_prime
+    diff = h2_prime - h1_prime
+    delta_h_prime = np.where(np.abs(diff) <= 180, diff, np.where(diff > 180, diff - 360, diff + 360))
+    delta_h_prime = np.where(chroma_product == 0, 0.0, delta_h_prime)
+    delta_H_prime = 2 * np.sqrt(chroma_product) * np.sin(np.radians(delta_h_prime / 2))
+
+    # Mean values
+    L_bar_prime = (L1 + L2) / 2
+    C_bar_prime = (C1_prime + C2_prime) / 2
+    sum_h = h1_prime + h2_prime
+    h_bar_prime = np.where(np.abs(h1_prime - h2_prime) <= 180, sum_h / 2,
+                           np.where(sum_h < 360, (sum_h + 360) / 2, (sum_h - 360) / 2))
+    h_bar_prime = np.where(chroma_product == 0, sum_h, h_bar_prime)
+
+    # T factor
+    T = (1 - 0.17 * np.cos(np.radians(h_bar_prime - 30)) +
+         0.24 * np.cos(np.radians(2 * h_bar_prime)) +
+         0.32 * np.cos(np.radians(3 * h_bar_prime + 6)) -
+         0.20 * np.cos(np.radians(4 * h_bar_prime - 63)))
+
+    # S factors
+    S_L = 1 + (0.015 * (L_bar_prime - 50)**2) / np.sqrt(20 + (L_bar_prime - 50)**2)
+    S_C = 1 + 0.045 * C_bar_prime
+    S_H = 1 + 0.015 * C_bar_prime * T
+
+    # R_T factor
+    delta_theta = 30 * np.exp(-((h_bar_prime - 275) / 25)**2)
+    C_bar_prime7 = C_bar_prime**7
+    R_C = 2 * np.sqrt(C_bar_prime7 / (C_bar_prime7 + 25**7))
+    R_T = -R_C * np.sin(np.radians(2 * delta_theta))
+
+    dL = delta_L_prime / S_L
+    dC = delta_C_prime / S_C
+    dH = delta_H_prime / S_H
+    return np.sqrt(dL**2 + dC**2 + dH**2 + R_T * dC * dH)
+
+def extract_dominant_skin_color(image, landmarks, ctx=None):
     """
-    Extract dominant skin color using K-Means clustering.
+    Extract dominant skin color (largest of 3 colour clusters, see dominant_color.py).
     Returns RGB color value.
     """
-    h, w, _ = image.shape
-    
-    # Create face mask from landmarks
-    face_pts = []
-    # Forehead, cheeks, nose region
-    indices = [10, 338, 297, 332, 284, 251, 389, 356, 454, 323, 361, 288,
-               397, 365, 379, 378, 400, 377, 152, 148, 176, 149, 150, 136,
-               172, 58, 132, 93, 234, 127, 162, 21, 54, 103, 67, 109]
-    
-    for idx in indices:
-        if idx < len(landmarks):
-            x = int(landmarks[idx].x * w)
-            y = int(landmarks[idx].y * h)
-            face_pts.append([x, y])
-    
-    # Create mask
-    mask = np.zeros((h, w), dtype=np.uint8)
-    if len(face_pts) > 0:
-        pts = np.array(face_pts, dtype=np.int32)
-        cv2.fillPoly(mask, [pts], 255)
+    ctx = FaceContext.ensure(ctx, image, landmarks)
+    
+    # Face oval mask (forehead, cheeks, nose region)
+    mask = ctx.mask("face_oval")
     
     # Extract pixels
     pixels = image[mask > 0]
@@ -161,18 +211,8 @@ def extract_dominant_skin_color(image, landmarks):
     if pixels.size == 0:
         return np.array([200, 180, 160])  # Default fair skin
     
-    # K-Means to find dominant color
-    pixels_reshaped = pixels.reshape(-1, 3).astype(np.float32)
-    kmeans = KMeans(n_clusters=3, random_state=42, n_init=10)
-    kmeans.fit(pixels_reshaped)
-    
-    # Get largest cluster (dominant color)
-    labels = kmeans.labels_
-    counts = np.bincount(labels)
-    dominant_idx = np.argmax(counts)
-    dominant_color = kmeans.cluster_centers_[dominant_idx]
-    
-    return dominant_color.astype(np.uint8)
+    # Largest cluster (dominant color)
+    return dominant_color(pixels, k=3).astype(np.uint8)
 
 def get_undertone(rgb_color):
     """
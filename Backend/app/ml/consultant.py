@@ -1,6 +1,13 @@
+from app.pipeline.resolution import face_resolution, WORKING_FACE_WIDTH
+from app.core.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+@face_resolution(WORKING_FACE_WIDTH)
 def generate_consultation(face_shape, skin_scores, gender="Female", image=None, landmarks=None,
                          skin_tone=None, undertone=None, eye_color=None, hair_color=None, 
-                         season=None, hair_properties=None):
+                         season=None, hair_properties=None, ctx=None):
     """
     Acts as a Beauty Consultant to generate personalized advice.
     Now includes comprehensive color analysis.
@@ -174,33 +181,27 @@ def generate_consultation(face_shape, skin_scores, gender="Female", image=None,
     # 6. FOUNDATION SHADE MATCHING (CIEDE2000)
     if image is not None and landmarks is not None:
         try:
-            from app.ml.color_matching import extract_dominant_skin_color, rgb_to_lab, ciede2000, get_undertone
-            from app.ml.foundation_db import FOUNDATION_SHADES, get_shade_category
+            from app.ml.color_matching import extract_dominant_skin_color, rgb_to_lab, get_undertone
+            from app.ml.foundation_db import get_shade_category
+            from app.ml.shade_index import get_shade_index
             
             # Extract dominant skin color
-            dominant_rgb = extract_dominant_skin_color(image, landmarks)
+            dominant_rgb = extract_dominant_skin_color(image, landmarks, ctx=ctx)
             dominant_lab = rgb_to_lab(dominant_rgb)
             undertone = get_undertone(dominant_rgb)
             
             # Get shade category
             category = get_shade_category(dominant_lab[0])
             
-            # Find best match using CIEDE2000
-            best_match = None
-            min_distance = float('inf')
-            
-            for shade_cat, shades in FOUNDATION_SHADES.items():
-                for shade in shades:
-                    distance = ciede2000(dominant_lab, np.array(shade['lab']))
-                    if distance < min_distance:
-                        min_distance = distance
-                        best_match = shade
-            
+            # Find best match using CIEDE2000 over the precomputed shade matrix
+            matches = get_shade_index().nearest(dominant_lab, n=1)
+            best_match = matches[0][0] if matches else None
+
             if best_match:
                 final_recs.append(f"💄 **Foundation Match**: {best_match['name']} ({category} range, {undertone} undertone)")
                 
         except Exception as e:
-            print(f"⚠️ Foundation matching error: {e}")
+            logger.warning(f"⚠️ Foundation matching error: {e}")
             pass
 
     return final_recs
@@ -0,0 +1,72 @@
+"""
+Dominant Color Engine
+Most common colour of a pixel set (hair band, face oval...), replacing a
+per-request sklearn KMeans(n_init=10) fit on every pixel.
+
+Bounded and deterministic:
+    - at most DOMINANT_COLOR_PIXEL_BUDGET pixels are used, picked at evenly
+      spaced positions (no RNG), whatever the region size
+    - the clusters start from a median-cut split of the colour box and are
+      refined with a few Lloyd iterations (single init)
+so a call costs about budget x k x iterations distance evaluations and the
+same pixels always give the same colour.
+"""
+
+import os
+
+import numpy as np
+
+DOMINANT_COLOR_PIXEL_BUDGET = int(os.getenv("DOMINANT_COLOR_PIXEL_BUDGET", 8192))
+DOMINANT_COLOR_MAX_ITER = int(os.getenv("DOMINANT_COLOR_MAX_ITER", 20))
+
+
+def subsample(pixels, budget=DOMINANT_COLOR_PIXEL_BUDGET):
+    """At most `budget` rows of `pixels`, at evenly spaced positions."""
+    pixels = pixels.reshape(-1, pixels.shape[-1])
+    if len(pixels) <= budget:
+        return pixels
+    return pixels[np.linspace(0, len(pixels) - 1, budget).astype(np.int64)]
+
+
+def median_cut(pixels, k):
+    """Initial centers: split the colour box with the widest channel range at its median, k-1 times."""
+    boxes = [pixels]
+    while len(boxes) < k:
+        ranges = [np.ptp(box, axis=0) if len(box) > 1 else np.zeros(pixels.shape[1]) for box in boxes]
+        widest = int(np.argmax([r.max() for r in ranges]))
+        if ranges[widest].max() == 0:
+            break  # fewer distinct colours than k
+        box = boxes.pop(widest)
+        channel = int(np.argmax(ranges[widest]))
+        order = np.argsort(box[:, channel], kind="stable")
+        half = len(box) // 2
+        boxes[widest:widest] = [box[order[:half]], box[order[half:]]]
+    return np.array([box.mean(axis=0) for box in boxes], dtype=np.float32)
+
+
+def quantize(pixels, k=3, budget=DOMINANT_COLOR_PIXEL_BUDGET, max_iter=DOMINANT_COLOR_MAX_ITER):
+    """(centers float32 [k', 3], counts [k']) of the colour clusters of `pixels` (k' <= k)."""
+    sample = subsample(pixels, budget).astype(np.float32)
+    centers = median_cut(sample, k)
+    sq_norms = (sample ** 2).sum(axis=1, keepdims=True)
+
+    labels = None
+    for _ in range(max_iter):
+        distances = sq_norms - 2 * sample @ centers.T + (centers ** 2).sum(axis=1)
+        new_labels = np.argmin(distances, axis=1)
+        if labels is not None and np.array_equal(new_labels, labels):
+            break
+        labels = new_labels
+        for j in range(len(centers)):
+            members = sample[labels == j]
+            if len(members):
+                centers[j] = members.mean(axis=0)
+
+    counts = np.bincount(labels, minlength=len(centers))
+    return centers, counts
+
+
+def dominant_color(pixels, k=3, budget=DOMINANT_COLOR_PIXEL_BUDGET):
+    """Center (float32, same channel order as `pixels`) of the largest of k colour clusters."""
+    centers, counts = quantize(pixels, k=k, budget=budget)
+    return centers[int(np.argmax(counts))]
@@ -1,12 +1,53 @@
 import torch
 import torch.nn as nn
-from torchvision import models, transforms
-from PIL import Image
+from torchvision import models
+import cv2
 import os
+import time
 import numpy as np
+from app.ml.batching import MicroBatcher, INFERENCE_MAX_BATCH
+from app.core.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Inference backend: "auto" (fastest available), "eager", "torchscript", "onnxruntime" or "int8".
+# Export the TorchScript/ONNX artifacts with scripts/export_face_shape_model.py;
+# "int8" (never picked by auto) needs scripts/quantize_face_shape_model.py
+FACE_SHAPE_BACKEND = os.getenv("FACE_SHAPE_BACKEND", "auto").lower()
+
+IMG_SIZE = 224
+# ImageNet normalisation folded into one multiply-add: (x / 255 - mean) / std
+_MEAN = np.array([0.485, 0.456, 0.406], dtype=np.float32)
+_STD = np.array([0.229, 0.224, 0.225], dtype=np.float32)
+_SCALE = 1.0 / (255.0 * _STD)
+_SHIFT = -_MEAN / _STD
+
+
+def artifact_paths(model_path):
+    """TorchScript / ONNX / INT8 ONNX artifact locations that sit next to a .pth checkpoint."""
+    base = os.path.splitext(model_path)[0]
+    return {
+        "torchscript": base + "_torchscript.pt",
+        "onnxruntime": base + ".onnx",
+        "int8": base + "_int8.onnx",
+    }
+
+
+def preprocess_face(face_img):
+    """
+    BGR uint8 crop -> (3, 224, 224) float32 normalised CHW array.
+    Pure OpenCV/NumPy equivalent of Resize -> ToTensor -> Normalize on an RGB PIL image.
+    """
+    h, w = face_img.shape[:2]
+    # INTER_AREA approximates PIL's antialiased bilinear when shrinking
+    interp = cv2.INTER_AREA if (h > IMG_SIZE or w > IMG_SIZE) else cv2.INTER_LINEAR
+    resized = cv2.resize(face_img, (IMG_SIZE, IMG_SIZE), interpolation=interp)
+    rgb = resized[:, :, ::-1].astype(np.float32)
+    return (rgb * _SCALE + _SHIFT).transpose(2, 0, 1)
+
 
 class FaceShapePredictor:
-    def __init__(self, model_path=None):
+    def __init__(self, model_path=None, backend=FACE_SHAPE_BACKEND):
         self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
         self.classes = ["Diamond", "Heart", "Long", "Oval", "Pear", "Round", "Square", "Triangle"]
         
@@ -14,13 +55,13 @@ class FaceShapePredictor:
             model_path = os.path.join(os.path.dirname(__file__), "../../models/face_shape_efficientnetv2s.pth")
         
         self.model_path = model_path
-        self.model = self._load_model()
-        
-        self.transform = transforms.Compose([
-            transforms.Resize((224, 224)),
-            transforms.ToTensor(),
-            transforms.Normalize([0.485, 0.456, 0.406], [0.229, 0.224, 0.225])
-        ])
+        self.backend = None
+        self.model = self._load_backend(backend)
+
+        # Concurrent predict() calls are coalesced into one forward pass
+        self._batcher = None
+        if self.model is not None and INFERENCE_MAX_BATCH > 1:
+            self._batcher = MicroBatcher(self.predict_batch, name="face-shape-batcher")
 
     def _load_model(self):
         try:
@@ -35,20 +76,114 @@ class FaceShapePredictor:
                 
                 # Check if architecture matches (number of classes)
                 if state_dict['classifier.1.weight'].shape[0] != len(self.classes):
-                    print(f"⚠️ FaceShapeModel: Weight mismatch! Model has {state_dict['classifier.1.weight'].shape[0]} classes, but code expects {len(self.classes)}.")
-                    print("Please retrain your model with the new classes.")
+                    logger.warning(f"⚠️ FaceShapeModel: Weight mismatch! Model has {state_dict['classifier.1.weight'].shape[0]} classes, "
+                                   f"but code expects {len(self.classes)}. Please retrain your model with the new classes.")
                     return None
                     
                 model.load_state_dict(state_dict)
                 model.to(self.device).eval()
-                print(f"✅ FaceShapeModel: Loaded weights from {os.path.basename(self.model_path)}")
+                logger.info(f"✅ FaceShapeModel: Loaded weights from {os.path.basename(self.model_path)}")
                 return model
             else:
-                print(f"⚠️ FaceShapeModel: Model file not found at {self.model_path}")
+                logger.warning(f"⚠️ FaceShapeModel: Model file not found at {self.model_path}")
                 return None
         except Exception as e:
-            print(f"❌ FaceShapeModel: Error loading model: {e}")
+            logger.error(f"❌ FaceShapeModel: Error loading model: {e}")
+            return None
+
+    # --- BACKENDS ---
+
+    def _load_torchscript(self):
+        path = artifact_paths(self.model_path)["torchscript"]
+        if not os.path.exists(path):
+            return None
+        model = torch.jit.load(path, map_location=self.device).eval()
+        logger.info(f"✅ FaceShapeModel: Loaded TorchScript from {os.path.basename(path)}")
+        return model
+
+    def _load_onnxruntime(self, artifact="onnxruntime"):
+        path = artifact_paths(self.model_path)[artifact]
+        if not os.path.exists(path):
+            return None
+        try:
+            import onnxruntime as ort
+        except ImportError:
+            logger.warning("⚠️ FaceShapeModel: onnxruntime not installed, skipping ONNX backend")
+            return None
+        session = ort.InferenceSession(path, providers=["CPUExecutionProvider"])
+        logger.info(f"✅ FaceShapeModel: Loaded ONNX from {os.path.basename(path)}")
+        return session
+
+    def _load(self, backend):
+        try:
+            if backend == "eager":
+                return self._load_model()
+            if backend == "torchscript":
+                return self._load_torchscript()
+            if backend == "onnxruntime":
+                return self._load_onnxruntime()
+            if backend == "int8":
+                return self._load_onnxruntime("int8")
+        except Exception as e:
+            logger.error(f"❌ FaceShapeModel: Error loading {backend} backend: {e}")
             return None
+        raise ValueError(f"Unknown FACE_SHAPE_BACKEND: {backend}")
+
+    def _load_backend(self, backend):
+        """Load the requested backend, or time every available one and keep the fastest."""
+        if backend != "auto":
+            model = self._load(backend)
+            if model is not None:
+                self.backend = backend
+            return model
+
+        dummy = np.zeros((1, 3, IMG_SIZE, IMG_SIZE), dtype=np.float32)
+        best = None
+        for name in ("onnxruntime", "torchscript", "eager"):
+            model = self._load(name)
+            if model is None:
+                continue
+            timing = self._time_backend(name, model, dummy)
+            logger.info(f"⏱️ FaceShapeModel: {name} backend {timing:.1f} ms/image")
+            if best is None or timing < best[1]:
+                best = (name, timing, model)
+
+        if best is None:
+            return None
+        self.backend = best[0]
+        logger.info(f"🚀 FaceShapeModel: Using {self.backend} backend")
+        return best[2]
+
+    def _time_backend(self, name, model, batch, runs=3):
+        self._forward(name, model, batch)  # warm-up
+        start = time.perf_counter()
+        for _ in range(runs):
+            self._forward(name, model, batch)
+        return (time.perf_counter() - start) * 1000 / runs
+
+    def _forward(self, backend, model, batch):
+        """(N, 3, 224, 224) float32 array -> (N, classes) logits array."""
+        if backend in ("onnxruntime", "int8"):
+            return model.run(None, {model.get_inputs()[0].name: batch})[0]
+        with torch.no_grad():
+            return model(torch.from_numpy(batch).to(self.device)).cpu().numpy()
+
+    # --- INFERENCE ---
+
+    def predict_batch(self, face_imgs):
+        """
+        Predicts face shapes for a list of BGR images in one forward pass.
+        Returns: [(label, confidence), ...]
+        """
+        batch = np.stack([preprocess_face(img) for img in face_imgs])
+        logits = self._forward(self.backend, self.model, batch)
+
+        # Softmax
+        exp = np.exp(logits - logits.max(axis=1, keepdims=True))
+        probabilities = exp / exp.sum(axis=1, keepdims=True)
+        indices = probabilities.argmax(axis=1)
+
+        return [(self.classes[i], float(probabilities[row, i])) for row, i in enumerate(indices)]
 
     def predict(self, face_img):
         """
@@ -59,24 +194,11 @@ class FaceShapePredictor:
             return None, 0.0
             
         try:
-            # Convert OpenCV (BGR) to PIL (RGB)
-            import cv2
-            rgb_img = cv2.cvtColor(face_img, cv2.COLOR_BGR2RGB)
-            pil_img = Image.fromarray(rgb_img)
-            
-            # Preprocess
-            input_tensor = self.transform(pil_img).unsqueeze(0).to(self.device)
-            
-            # Inferences
-            with torch.no_grad():
-                outputs = self.model(input_tensor)
-                probabilities = torch.nn.functional.softmax(outputs[0], dim=0)
-                conf, index = torch.max(probabilities, 0)
-                
-            label = self.classes[index.item()]
-            return label, conf.item()
+            if self._batcher is not None:
+                return self._batcher(face_img)
+            return self.predict_batch([face_img])[0]
         except Exception as e:
-            print(f"⚠️ FaceShapeModel: Prediction error: {e}")
+            logger.warning(f"⚠️ FaceShapeModel: Prediction error: {e}")
             return None, 0.0
 
 # Singleton instance
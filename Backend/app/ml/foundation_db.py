@@ -1,5 +1,6 @@
 # Foundation Shade Database (Industry Standard Shades)
 # LAB values for accurate CIEDE2000 matching
+# Built-in catalog; full brand catalogs are loaded from SHADE_CATALOG_PATH (see shade_catalog.py)
 
 FOUNDATION_SHADES = {
     "Fair": [
@@ -37,17 +38,8 @@ FOUNDATION_SHADES = {
 
 def get_shade_category(lightness):
     """
-    Determine shade category from LAB lightness value.
+    Determine shade category from LAB lightness value,
+    using the thresholds of the current shade catalog.
     """
-    if lightness >= 85:
-        return "Fair"
-    elif lightness >= 75:
-        return "Light"
-    elif lightness >= 62:
-        return "Medium"
-    elif lightness >= 50:
-        return "Tan"
-    elif lightness >= 35:
-        return "Deep"
-    else:
-        return "Very Deep"
+    from app.ml.shade_catalog import get_shade_catalog
+    return get_shade_catalog().category(lightness)
@@ -2,25 +2,63 @@
 AI-Powered Personalized Beauty Tips Generator
 Generates unique, contextual tips for each user based on their complete analysis.
 """
-import requests
+import asyncio
 import json
 import os
+import re
+
+from app.core.config import openrouter_api_key
+from app.utils.llm_client import get_llm_client, close_llm_client
+from app.core.logger import get_logger
+
+logger = get_logger(__name__)
+
+# The tips are generated in the background, so they may take longer than a chat reply (seconds)
+TIPS_LLM_DEADLINE = float(os.getenv("TIPS_LLM_DEADLINE", 45))
+# The prompt shows skin scores in buckets of this size, so similar profiles share tips (see tips_cache.py)
+TIPS_SCORE_STEP = 0.1
+HAIR_PROMPT_FIELDS = ("density", "texture", "recession_status", "curl_pattern")
 
 def load_api_key():
-    """Load OpenRouter API key from .env file"""
-    try:
-        with open(".env", "r") as f:
-            for line in f:
-                if line.startswith("OPENROUTER_API_KEY"):
-                    return line.strip().split("=")[1]
-    except:
-        return None
-    return None
+    """OpenRouter API key (read once per process, see app/core/config.py)"""
+    return openrouter_api_key()
+
+def skin_type_from_scores(skin_scores):
+    """(skin_type, acne, oiliness, texture) from the skin analysis scores."""
+    acne = skin_scores.get('acne', 0)
+    oiliness = skin_scores.get('oiliness', 0)
+    texture = skin_scores.get('texture', 0)
+
+    if oiliness > 0.6 and texture < 0.4:
+        skin_type = "Oily"
+    elif oiliness < 0.4 and texture > 0.5:
+        skin_type = "Dry"
+    elif oiliness > 0.5 and texture > 0.4:
+        skin_type = "Combination"
+    else:
+        skin_type = "Balanced"
+    return skin_type, acne, oiliness, texture
+
+
+def quantize_profile(face_shape, gender, skin_scores, skin_tone=None, undertone=None,
+                     eye_color=None, hair_color=None, season=None, hair_properties=None):
+    """The profile exactly as the LLM prompt uses it: bucketed skin scores, only the prompted hair fields."""
+    scores = {k: round(round(float(skin_scores.get(k, 0)) / TIPS_SCORE_STEP) * TIPS_SCORE_STEP, 2)
+              for k in ("acne", "oiliness", "texture")}
+    hair = {k: hair_properties.get(k) for k in HAIR_PROMPT_FIELDS} if hair_properties else None
+    return dict(face_shape=face_shape, gender=gender, skin_scores=scores, skin_tone=skin_tone,
+                undertone=undertone, eye_color=eye_color, hair_color=hair_color, season=season,
+                hair_properties=hair)
 
-def generate_personalized_tips(face_shape, gender, skin_scores, skin_tone=None, undertone=None, 
+
+def generate_personalized_tips(face_shape, gender, skin_scores, skin_tone=None, undertone=None,
                                eye_color=None, hair_color=None, season=None, hair_properties=None):
     """
-    Generate unique, personalized beauty tips using AI based on complete facial analysis.
+    Generate unique, personalized beauty tips using AI based on complete facial analysis,
+    falling back to the rule-based tips if no model answers.
+    /analyze does not call this: it returns generate_quick_tips() and upgrades them
+    in the background (see app/pipeline/tips_upgrade.py). Blocking: not for use
+    inside an event loop (await generate_llm_tips there).
     
     Args:
         face_shape: Detected face shape (Oval, Round, Square, etc.)
@@ -35,22 +73,37 @@ def generate_personalized_tips(face_shape, gender, skin_scores, skin_tone=None,
     Returns:
         List of personalized tip strings
     """
-    
-    # Extract skin metrics
-    acne = skin_scores.get('acne', 0)
-    oiliness = skin_scores.get('oiliness', 0)
-    texture = skin_scores.get('texture', 0)
-    
-    # Determine skin type
-    skin_type = "Normal"
-    if oiliness > 0.6 and texture < 0.4:
-        skin_type = "Oily"
-    elif oiliness < 0.4 and texture > 0.5:
-        skin_type = "Dry"
-    elif oiliness > 0.5 and texture > 0.4:
-        skin_type = "Combination"
-    else:
-        skin_type = "Balanced"
+    async def llm_tips():
+        try:
+            return await generate_llm_tips(face_shape, gender, skin_scores, skin_tone, undertone,
+                                           eye_color, hair_color, season, hair_properties)
+        finally:
+            await close_llm_client()
+
+    tips = asyncio.run(llm_tips())
+    if tips is None:
+        return generate_quick_tips(face_shape, gender, skin_scores, season=season, hair_properties=hair_properties)
+    return tips
+
+
+def generate_quick_tips(face_shape, gender, skin_scores, skin_tone=None, undertone=None,
+                        eye_color=None, hair_color=None, season=None, hair_properties=None):
+    """Rule-based tips for the same profile, without any network call."""
+    skin_type, acne, oiliness, texture = skin_type_from_scores(skin_scores)
+    return generate_fallback_tips(face_shape, gender, skin_type, acne, oiliness, texture, season, hair_properties)
+
+
+async def generate_llm_tips(face_shape, gender, skin_scores, skin_tone=None, undertone=None,
+                            eye_color=None, hair_color=None, season=None, hair_properties=None):
+    """
+    AI-generated tips for the profile (same arguments as generate_personalized_tips).
+    The prompt is built from quantize_profile(), so the tips fit every profile with the same key.
+    Returns: list of tip strings, or None if no API key is set or every model failed
+    """
+    quantized = quantize_profile(face_shape, gender, skin_scores, skin_tone, undertone,
+                                 eye_color, hair_color, season, hair_properties)
+    skin_scores, hair_properties = quantized["skin_scores"], quantized["hair_properties"]
+    skin_type, acne, oiliness, texture = skin_type_from_scores(skin_scores)
     
     # Build comprehensive context for AI
     context = f"""
@@ -114,8 +167,8 @@ def generate_personalized_tips(face_shape, gender, skin_scores, skin_tone=None,
     # Try to get AI-generated tips
     api_key = load_api_key()
     if not api_key:
-        print("⚠️ No API key found, using fallback tips")
-        return generate_fallback_tips(face_shape, gender, skin_type, acne, oiliness, texture, season)
+        logger.warning("⚠️ No API key found, no AI tips")
+        return None
     
     # Models to try (prioritize faster, reliable ones)
     models_to_try = [
@@ -125,56 +178,39 @@ def generate_personalized_tips(face_shape, gender, skin_scores, skin_tone=None,
         "mistralai/mistral-7b-instruct:free",
     ]
     
-    for model in models_to_try:
-        try:
-            print(f"🤖 Generating personalized tips with {model}...")
-            response = requests.post(
-                url="https://openrouter.ai/api/v1/chat/completions",
-                headers={
-                    "Authorization": f"Bearer {api_key}",
-                    "Content-Type": "application/json",
-                    "HTTP-Referer": "http://localhost:3000",
-                },
-                json={
-                    "model": model,
-                    "messages": [
-                        {"role": "system", "content": system_prompt},
-                        {"role": "user", "content": user_prompt}
-                    ],
-                    "temperature": 0.8,  # Slightly creative but consistent
-                    "max_tokens": 800
-                },
-                timeout=15
-            )
-            
-            if response.status_code == 200:
-                data = response.json()
-                if 'choices' in data and len(data['choices']) > 0:
-                    ai_reply = data['choices'][0]['message']['content']
-                    
-                    # Parse JSON response
-                    try:
-                        # Try to extract JSON array from response
-                        import re
-                        json_match = re.search(r'\[.*\]', ai_reply, re.DOTALL)
-                        if json_match:
-                            tips = json.loads(json_match.group())
-                            if isinstance(tips, list) and len(tips) > 0:
-                                print(f"✅ Generated {len(tips)} personalized tips")
-                                return tips
-                    except json.JSONDecodeError:
-                        print(f"⚠️ Failed to parse AI response as JSON")
-                        continue
-            
-            print(f"⚠️ Model {model} failed ({response.status_code})")
-            
-        except Exception as e:
-            print(f"⚠️ Error with {model}: {str(e)}")
-            continue
-    
-    # If all AI attempts fail, use intelligent fallback
-    print("⚠️ All AI models failed, using enhanced fallback")
-    return generate_fallback_tips(face_shape, gender, skin_type, acne, oiliness, texture, season, hair_properties)
+    logger.info("🤖 Generating personalized tips...")
+    reply = await get_llm_client().complete(
+        models_to_try,
+        [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt}
+        ],
+        api_key,
+        parse=parse_tips,
+        deadline=TIPS_LLM_DEADLINE,
+        temperature=0.8,  # Slightly creative but consistent
+        max_tokens=800
+    )
+    if reply is None:
+        logger.warning("⚠️ All AI models failed")
+        return None
+    logger.info(f"✅ Generated {len(reply.value)} personalized tips with {reply.model}")
+    return reply.value
+
+
+def parse_tips(ai_reply):
+    """JSON array of tips from a model reply, or None if there is none."""
+    json_match = re.search(r'\[.*\]', ai_reply, re.DOTALL)
+    if not json_match:
+        return None
+    try:
+        tips = json.loads(json_match.group())
+    except json.JSONDecodeError:
+        logger.warning("⚠️ Failed to parse AI response as JSON")
+        return None
+    if isinstance(tips, list) and len(tips) > 0:
+        return tips
+    return None
 
 
 def generate_fallback_tips(face_shape, gender, skin_type, acne, oiliness, texture, season=None, hair_properties=None):
@@ -0,0 +1,268 @@
+"""
+Foundation Shade Catalog
+Brand shade catalogs (name, brand, LAB, undertone, hex, price) loaded from
+a file instead of the built-in FOUNDATION_SHADES dict.
+
+A source CSV/JSON is compiled into a compact binary file:
+    header     magic, version, shade count, metadata and string-table sizes
+    metadata   JSON: lightness thresholds of the shade categories
+    lab        float32 [n, 3]
+    price      float32 [n]            (NaN when unknown)
+    offsets    uint32  [n * 5 + 1]    into the string table, per shade:
+               name, brand, undertone, hex, category
+    strings    UTF-8
+Workers open it with np.memmap, so the matrix is read lazily and its pages
+are shared between processes. get_shade_catalog() reopens the file when it
+changes on disk (hot reload) and recompiles a stale source. Replace the file
+rather than rewriting it in place (write_catalog renames a new file over
+it): truncating a mapped file crashes the workers reading it.
+
+Set SHADE_CATALOG_PATH to a .shades, .csv or .json file; without it the
+built-in shades are used.
+"""
+
+import csv
+import json
+import os
+import struct
+import threading
+import time
+
+import numpy as np
+
+from app.core.logger import get_logger
+
+logger = get_logger(__name__)
+
+SHADE_CATALOG_PATH = os.getenv("SHADE_CATALOG_PATH", "")
+# How often the catalog file is checked for changes, seconds
+SHADE_CATALOG_CHECK_INTERVAL = float(os.getenv("SHADE_CATALOG_CHECK_INTERVAL", 5))
+
+CATALOG_MAGIC = b"SHADECAT"
+CATALOG_VERSION = 1
+CATALOG_EXTENSION = ".shades"
+_HEADER = struct.Struct("<8sIIII")  # magic, version, n, metadata bytes, string bytes
+STRING_FIELDS = ("name", "brand", "undertone", "hex", "category")
+
+# (category, minimum LAB lightness), lightest first; the last one catches the rest
+DEFAULT_CATEGORIES = [
+    ("Fair", 85),
+    ("Light", 75),
+    ("Medium", 62),
+    ("Tan", 50),
+    ("Deep", 35),
+    ("Very Deep", 0),
+]
+
+
+def category_for(lightness, categories=DEFAULT_CATEGORIES):
+    """Shade category of a LAB lightness value."""
+    for name, min_lightness in categories:
+        if lightness >= min_lightness:
+            return name
+    return categories[-1][0]
+
+
+def _pad4(data):
+    return data + b"\0" * (-len(data) % 4)
+
+
+def build_catalog(shades, categories=DEFAULT_CATEGORIES):
+    """Binary catalog (bytes) of shade dicts with a "lab" entry; a missing category is derived from L."""
+    categories = [[name, float(min_lightness)] for name, min_lightness in categories]
+    n = len(shades)
+    lab = np.zeros((n, 3), dtype=np.float32)
+    price = np.full(n, np.nan, dtype=np.float32)
+    offsets = np.zeros(n * len(STRING_FIELDS) + 1, dtype=np.uint32)
+    strings = bytearray()
+
+    for i, shade in enumerate(shades):
+        lab[i] = [float(v) for v in shade["lab"]]
+        if shade.get("price") not in (None, ""):
+            price[i] = float(shade["price"])
+        values = dict(shade)
+        if not values.get("category"):
+            values["category"] = category_for(lab[i, 0], categories)
+        for j, field in enumerate(STRING_FIELDS):
+            offsets[i * len(STRING_FIELDS) + j] = len(strings)
+            strings += str(values.get(field) or "").encode("utf-8")
+    offsets[-1] = len(strings)
+
+    metadata = _pad4(json.dumps({"categories": categories}).encode("utf-8"))
+    header = _HEADER.pack(CATALOG_MAGIC, CATALOG_VERSION, n, len(metadata), len(strings))
+    return b"".join([header, metadata, lab.tobytes(), price.tobytes(), offsets.tobytes(), bytes(strings)])
+
+
+def read_source(path):
+    """(shades, categories) from a catalog source.
+
+    CSV: one row per shade with name, brand, L, a, b, undertone, hex, price
+    and optionally category. JSON: a list of shades with a "lab" [L, a, b],
+    a {category: [shade, ...]} dict like FOUNDATION_SHADES, or
+    {"shades": [...], "categories": [[name, min_lightness], ...]}.
+    """
+    categories = DEFAULT_CATEGORIES
+    if path.lower().endswith(".csv"):
+        with open(path, newline="", encoding="utf-8") as f:
+            shades = [dict(row, lab=[row["L"], row["a"], row["b"]]) for row in csv.DictReader(f)]
+        return shades, categories
+
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    if isinstance(data, dict) and "shades" in data:
+        categories = data.get("categories", categories)
+        data = data["shades"]
+    if isinstance(data, dict):
+        data = [dict(shade, category=category) for category, group in data.items() for shade in group]
+    return data, categories
+
+
+def write_catalog(data, output_path):
+    """
+    Write compiled catalog bytes next to the target and rename them over it, so
+    readers never see a partial file and workers mapping the old one keep it.
+    """
+    tmp_path = f"{output_path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, output_path)
+    return output_path
+
+
+def compile_catalog(source_path, output_path=None):
+    """Compile a CSV/JSON catalog to the binary format; returns the output path."""
+    if output_path is None:
+        output_path = os.path.splitext(source_path)[0] + CATALOG_EXTENSION
+    shades, categories = read_source(source_path)
+    write_catalog(build_catalog(shades, categories), output_path)
+    logger.info(f"✅ Compiled {len(shades)} shades from {source_path} to {output_path}")
+    return output_path
+
+
+class ShadeCatalog:
+    def __init__(self, buffer, path=None):
+        """`buffer`: the binary catalog (np.memmap of the file, or bytes)."""
+        self.path = path
+        self._buffer = buffer
+        magic, version, n, metadata_size, strings_size = _HEADER.unpack_from(buffer, 0)
+        if magic != CATALOG_MAGIC or version != CATALOG_VERSION:
+            raise ValueError(f"Not a version {CATALOG_VERSION} shade catalog: {path}")
+
+        offset = _HEADER.size
+        metadata = json.loads(bytes(buffer[offset:offset + metadata_size]).rstrip(b"\0"))
+        self.categories = [(name, min_lightness) for name, min_lightness in metadata["categories"]]
+        offset += metadata_size
+
+        self.lab = np.frombuffer(buffer, dtype=np.float32, count=n * 3, offset=offset).reshape(n, 3)
+        offset += self.lab.nbytes
+        self.price = np.frombuffer(buffer, dtype=np.float32, count=n, offset=offset)
+        offset += self.price.nbytes
+        self._offsets = np.frombuffer(buffer, dtype=np.uint32, count=n * len(STRING_FIELDS) + 1, offset=offset)
+        offset += self._offsets.nbytes
+        self._strings = memoryview(buffer)[offset:offset + strings_size]
+
+    @classmethod
+    def open(cls, path):
+        """Memory-map a compiled catalog file (read-only, shared between processes)."""
+        return cls(np.memmap(path, dtype=np.uint8, mode="r"), path=path)
+
+    @classmethod
+    def from_shades(cls, shades, categories=DEFAULT_CATEGORIES):
+        """In-memory catalog, e.g. of the built-in FOUNDATION_SHADES."""
+        return cls(build_catalog(shades, categories))
+
+    def __len__(self):
+        return len(self.lab)
+
+    def __getitem__(self, i):
+        """Shade i as a dict (decoded on access)."""
+        if not 0 <= i < len(self.lab):
+            raise IndexError(i)
+        base = i * len(STRING_FIELDS)
+        shade = {field: bytes(self._strings[self._offsets[base + j]:self._offsets[base + j + 1]]).decode("utf-8")
+                 for j, field in enumerate(STRING_FIELDS)}
+        shade["lab"] = [float(v) for v in self.lab[i]]
+        price = self.price[i]
+        shade["price"] = None if np.isnan(price) else float(price)
+        return shade
+
+    def category(self, lightness):
+        return category_for(lightness, self.categories)
+
+
+def builtin_shades():
+    """FOUNDATION_SHADES as a flat list of shades with their category."""
+    from app.ml.foundation_db import FOUNDATION_SHADES
+    return [dict(shade, category=category) for category, group in FOUNDATION_SHADES.items() for shade in group]
+
+
+def builtin_catalog():
+    return ShadeCatalog.from_shades(builtin_shades())
+
+
+def _file_signature(path):
+    stat = os.stat(path)
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+class CatalogLoader:
+    """Current catalog of a path, reopened when the file changes (a new ShadeCatalog object)."""
+
+    def __init__(self, path=SHADE_CATALOG_PATH, check_interval=SHADE_CATALOG_CHECK_INTERVAL):
+        self.path = path
+        self.check_interval = check_interval
+        self.catalog = None
+        self._signature = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def _compiled_path(self):
+        """The .shades file to map, compiling a CSV/JSON source if it is newer."""
+        if self.path.endswith(CATALOG_EXTENSION):
+            return self.path
+        compiled = os.path.splitext(self.path)[0] + CATALOG_EXTENSION
+        if not os.path.exists(compiled) or os.path.getmtime(compiled) < os.path.getmtime(self.path):
+            compile_catalog(self.path, compiled)
+        return compiled
+
+    def _load(self):
+        if not self.path:
+            return self.catalog or builtin_catalog(), None
+        try:
+            compiled = self._compiled_path()
+            signature = _file_signature(compiled), _file_signature(self.path)
+            if signature == self._signature and self.catalog is not None:
+                return self.catalog, signature
+            catalog = ShadeCatalog.open(compiled)
+            logger.info(f"✅ Shade catalog: {len(catalog)} shades from {compiled}")
+            return catalog, signature
+        except Exception as e:
+            if self.catalog is not None:
+                logger.warning(f"⚠️ Shade catalog reload failed, keeping the current one: {e}")
+                return self.catalog, self._signature
+            logger.warning(f"⚠️ Shade catalog {self.path} unusable ({e}), using the built-in shades")
+            return builtin_catalog(), None
+
+    def get(self):
+        now = time.monotonic()
+        if self.catalog is not None and now - self._checked_at < self.check_interval:
+            return self.catalog
+        with self._lock:
+            if self.catalog is None or now - self._checked_at >= self.check_interval:
+                self.catalog, self._signature = self._load()
+                self._checked_at = time.monotonic()
+        return self.catalog
+
+
+# Singleton instance
+_loader = None
+
+def get_catalog_loader():
+    global _loader
+    if _loader is None:
+        _loader = CatalogLoader()
+    return _loader
+
+
+def get_shade_catalog():
+    return get_catalog_loader().get()
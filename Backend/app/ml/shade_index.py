@@ -0,0 +1,73 @@
+"""
+Foundation Shade Index
+Finds the foundation shades closest to a skin colour under CIEDE2000, over
+the current shade catalog (app/ml/shade_catalog.py) and its LAB matrix. Small catalogs are scored
+exhaustively with ciede2000_batch; large ones go through a KD-tree in LAB
+whose nearest candidates are re-ranked with CIEDE2000.
+"""
+
+import os
+
+import numpy as np
+from scipy.spatial import cKDTree
+
+from app.ml.color_matching import ciede2000_batch
+from app.ml.shade_catalog import get_shade_catalog
+
+# Catalogs up to this many shades are scored exhaustively (exact)
+SHADE_INDEX_BRUTE_FORCE = int(os.getenv("SHADE_INDEX_BRUTE_FORCE", 256))
+# Euclidean-nearest candidates re-ranked with CIEDE2000 on larger catalogs
+SHADE_INDEX_CANDIDATES = int(os.getenv("SHADE_INDEX_CANDIDATES", 64))
+
+
+class ShadeIndex:
+    def __init__(self, shades, lab=None, brute_force=SHADE_INDEX_BRUTE_FORCE, candidates=SHADE_INDEX_CANDIDATES):
+        """
+        `shades`: sequence of shade dicts (a list, or a ShadeCatalog).
+        `lab`: their N x 3 LAB matrix; taken from the shades' "lab" entries if omitted.
+        """
+        self.shades = shades
+        if lab is None:
+            lab = np.array([s["lab"] for s in shades], dtype=np.float64)
+        self.lab = np.asarray(lab).reshape(-1, 3)
+        self.candidates = candidates
+        self.tree = cKDTree(self.lab) if len(self.shades) > brute_force else None
+
+    def __len__(self):
+        return len(self.shades)
+
+    def nearest(self, lab, n=1):
+        """The `n` closest shades to `lab` as [(shade, distance)], closest first."""
+        if len(self.shades) == 0:
+            return []
+        n = min(n, len(self.shades))
+
+        if self.tree is None:
+            idx = np.arange(len(self.shades))
+        else:
+            k = min(len(self.shades), max(self.candidates, n))
+            _, idx = self.tree.query(np.asarray(lab, dtype=np.float64), k=k)
+            # Catalog order among candidates, so ties resolve like the exhaustive scan
+            idx = np.sort(np.atleast_1d(idx))
+
+        distances = ciede2000_batch(lab, self.lab[idx])
+        if n == 1:
+            order = [int(np.argmin(distances))]
+        elif n < len(idx):
+            top = np.argpartition(distances, n - 1)[:n]
+            order = top[np.lexsort((top, distances[top]))]
+        else:
+            order = np.argsort(distances, kind="stable")
+        return [(self.shades[int(idx[i])], float(distances[i])) for i in order]
+
+
+# Singleton instance, rebuilt when the shade catalog is reloaded
+_index = None
+
+def get_shade_index():
+    global _index
+    catalog = get_shade_catalog()
+    index = _index
+    if index is None or index.shades is not catalog:
+        index = _index = ShadeIndex(catalog, lab=catalog.lab)
+    return index
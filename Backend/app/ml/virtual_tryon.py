@@ -2,15 +2,23 @@ import cv2
 import numpy as np
 import math
 
+from app.pipeline.landmarks import (
+    landmarks_to_points, gather, point,
+    LIPS_OUTER_IDX, LIPS_INNER_IDX, EYELID_LEFT_IDX, EYELID_RIGHT_IDX,
+    EYE_LEFT_IDX, EYE_RIGHT_IDX, BROW_LEFT_IDX, BROW_RIGHT_IDX,
+    FACE_OVAL_IDX, HAIRLINE_OVAL_IDX, NUM_MESH_POINTS
+)
+
+# Effects accept either the (N, 3) pixel landmark array from detect_faces()["points"]
+# or a raw MediaPipe landmark list (converted once per call).
+
 def apply_lipstick(image, landmarks, color_bgr, intensity=0.7, finish="Satin"):
     try:
         h, w, _ = image.shape
-        def get_pt(idx): return (int(landmarks[idx].x * w), int(landmarks[idx].y * h))
-        outer_lip_indices = [61, 146, 91, 181, 84, 17, 314, 405, 321, 375, 291, 409, 270, 269, 267, 0, 37, 39, 40, 185]
-        inner_lip_indices = [78, 95, 88, 178, 87, 14, 317, 402, 318, 324, 308, 415, 310, 311, 312, 13, 82, 81, 80, 191]
+        pts = landmarks_to_points(landmarks, w, h)
         mask = np.zeros_like(image)
-        outer_pts = np.array([get_pt(i) for i in outer_lip_indices], np.int32)
-        inner_pts = np.array([get_pt(i) for i in inner_lip_indices], np.int32)
+        outer_pts = gather(pts, LIPS_OUTER_IDX)
+        inner_pts = gather(pts, LIPS_INNER_IDX)
         cv2.fillPoly(mask, [outer_pts], color_bgr)
         cv2.fillPoly(mask, [inner_pts], (0, 0, 0))
         mask_gray = cv2.cvtColor(mask, cv2.COLOR_BGR2GRAY)
@@ -34,12 +42,10 @@ def apply_lipstick(image, landmarks, color_bgr, intensity=0.7, finish="Satin"):
 def apply_eyeshadow(image, landmarks, color_bgr, intensity=0.4):
     try:
         h, w, _ = image.shape
-        def get_pt(idx): return (int(landmarks[idx].x * w), int(landmarks[idx].y * h))
-        left_eye_top = [226, 247, 30, 29, 27, 28, 56, 190, 243]
-        right_eye_top = [463, 414, 286, 258, 257, 259, 260, 467, 446]
+        pts = landmarks_to_points(landmarks, w, h)
         mask = np.zeros_like(image)
-        l_pts = np.array([get_pt(i) for i in left_eye_top], np.int32)
-        r_pts = np.array([get_pt(i) for i in right_eye_top], np.int32)
+        l_pts = gather(pts, EYELID_LEFT_IDX)
+        r_pts = gather(pts, EYELID_RIGHT_IDX)
         cv2.fillPoly(mask, [l_pts], color_bgr)
         cv2.fillPoly(mask, [r_pts], color_bgr)
         mask_gray = cv2.cvtColor(mask, cv2.COLOR_BGR2GRAY)
@@ -54,13 +60,10 @@ def apply_eyeshadow(image, landmarks, color_bgr, intensity=0.4):
 def apply_blush(image, landmarks, color_bgr, intensity=0.3):
     try:
         h, w, _ = image.shape
-        left_cheek = landmarks[205]
-        right_cheek = landmarks[425]
+        pts = landmarks_to_points(landmarks, w, h)
         mask = np.zeros_like(image)
-        lx, ly = int(left_cheek.x * w), int(left_cheek.y * h)
-        cv2.circle(mask, (lx, ly), int(w * 0.05), color_bgr, -1)
-        rx, ry = int(right_cheek.x * w), int(right_cheek.y * h)
-        cv2.circle(mask, (rx, ry), int(w * 0.05), color_bgr, -1)
+        cv2.circle(mask, point(pts, 205), int(w * 0.05), color_bgr, -1)
+        cv2.circle(mask, point(pts, 425), int(w * 0.05), color_bgr, -1)
         mask_gray = cv2.cvtColor(mask, cv2.COLOR_BGR2GRAY)
         _, alpha_mask = cv2.threshold(mask_gray, 0, 255, cv2.THRESH_BINARY)
         blur_k = int(w * 0.1) | 1
@@ -80,17 +83,14 @@ def apply_skin_smoothing(image, intensity=0.5):
 def apply_hair_dye(image, landmarks, color_bgr, intensity=0.4):
     try:
         h, w, _ = image.shape
-        top_head = landmarks[10]
-        chin = landmarks[152]
-        head_height = abs(chin.y - top_head.y) * h
+        pts = landmarks_to_points(landmarks, w, h)
+        head_height = abs(float(pts[152, 1] - pts[10, 1]))
         mask = np.zeros_like(image)
-        top_y, mid_x = int(top_head.y * h), int(top_head.x * w)
+        mid_x, top_y = point(pts, 10)
         y1, y2 = max(0, int(top_y - head_height * 0.6)), int(top_y + head_height * 0.3)
         x1, x2 = max(0, int(mid_x - head_height * 0.8)), min(w, int(mid_x + head_height * 0.8))
         cv2.rectangle(mask, (x1, y1), (x2, y2), color_bgr, -1)
-        face_indices = [10, 109, 67, 103, 54, 21, 162, 127, 234, 93, 132, 58, 172, 150, 149, 148, 152, 377, 378, 379, 397, 288, 361, 323, 454, 389, 251, 284, 332, 297, 338]
-        face_pts = np.array([(int(landmarks[i].x * w), int(landmarks[i].y * h)) for i in face_indices], np.int32)
-        cv2.fillPoly(mask, [face_pts], (0, 0, 0))
+        cv2.fillPoly(mask, [gather(pts, HAIRLINE_OVAL_IDX)], (0, 0, 0))
         mask_gray = cv2.cvtColor(mask, cv2.COLOR_BGR2GRAY)
         _, alpha_mask = cv2.threshold(mask_gray, 0, 255, cv2.THRESH_BINARY)
         blur_k = int(head_height * 0.4) | 1
@@ -103,19 +103,12 @@ def apply_hair_dye(image, landmarks, color_bgr, intensity=0.4):
 def apply_foundation(image, landmarks, color_bgr, intensity=0.5):
     try:
         h, w, _ = image.shape
+        pts = landmarks_to_points(landmarks, w, h)
         mask = np.zeros((h, w), dtype=np.uint8)
-        face_indices = [10, 338, 297, 332, 284, 251, 389, 356, 454, 323, 361, 288, 397, 365, 379, 378, 400, 377, 152, 148, 176, 149, 150, 136, 172, 58, 132, 93, 234, 127, 162, 21, 54, 103, 67, 109, 10]
-        face_pts = np.array([(int(landmarks[i].x * w), int(landmarks[i].y * h)) for i in face_indices], np.int32)
-        cv2.fillPoly(mask, [face_pts], 255)
-        exclusions = [
-            [33, 7, 163, 144, 145, 153, 154, 155, 133, 173, 157, 158, 159, 160, 161, 246],
-            [362, 382, 381, 380, 374, 373, 390, 249, 263, 466, 388, 387, 386, 385, 384, 398],
-            [70, 63, 105, 66, 107, 55, 193], [300, 293, 334, 296, 336, 285, 417],
-            [61, 146, 91, 181, 84, 17, 314, 405, 321, 375, 291, 409, 270, 269, 267, 0, 37, 39, 40, 185]
-        ]
+        cv2.fillPoly(mask, [gather(pts, FACE_OVAL_IDX)], 255)
+        exclusions = [EYE_LEFT_IDX, EYE_RIGHT_IDX, BROW_LEFT_IDX, BROW_RIGHT_IDX, LIPS_OUTER_IDX]
         for poly in exclusions:
-            pts = np.array([(int(landmarks[i].x * w), int(landmarks[i].y * h)) for i in poly], np.int32)
-            cv2.fillPoly(mask, [pts], 0)
+            cv2.fillPoly(mask, [gather(pts, poly)], 0)
         mask = cv2.GaussianBlur(mask, (31, 31), 0)
         alpha = np.expand_dims(mask / 255.0, axis=-1) * intensity
         foundation = np.full_like(image, color_bgr, dtype=np.uint8)
@@ -126,10 +119,9 @@ def apply_foundation(image, landmarks, color_bgr, intensity=0.5):
 def detect_intelligent_skin_tone(image, landmarks):
     try:
         h, w, _ = image.shape
-        cheek_pts = [205, 425, 118, 347]
+        pts = landmarks_to_points(landmarks, w, h)
         colors = []
-        for idx in cheek_pts:
-            px, py = int(landmarks[idx].x * w), int(landmarks[idx].y * h)
+        for px, py in gather(pts, [205, 425, 118, 347]).tolist():
             patch = image[py-5:py+5, px-5:px+5]
             if patch.size > 0: colors.append(np.mean(patch, axis=(0, 1)))
         if not colors: return {"hex": "#F5D0B5", "undertone": "Neutral"}
@@ -162,12 +154,12 @@ def apply_virtual_background(image, landmarks, bg_type="Midnight"):
     if bg_type == "None" or not bg_type: return image
     try:
         h, w, _ = image.shape
+        pts = landmarks_to_points(landmarks, w, h)
         mask = np.zeros((h, w), dtype=np.uint8)
-        face_pts = np.array([(int(landmarks[i].x * w), int(landmarks[i].y * h)) for i in range(468)], np.int32)
-        top_head, chin = landmarks[10], landmarks[152]
-        face_h = abs(chin.y - top_head.y) * h
+        face_pts = pts[:NUM_MESH_POINTS, :2].astype(np.int32)
+        face_h = abs(float(pts[152, 1] - pts[10, 1]))
         cv2.fillConvexPoly(mask, cv2.convexHull(face_pts), 255)
-        cv2.ellipse(mask, (int(top_head.x * w), int(top_head.y * h)), (int(face_h * 0.5), int(face_h * 0.3)), 0, 0, 360, 255, -1)
+        cv2.ellipse(mask, point(pts, 10), (int(face_h * 0.5), int(face_h * 0.3)), 0, 0, 360, 255, -1)
         bottom_pts = face_pts[np.argsort(face_pts[:,1])[-20:]]
         cv2.rectangle(mask, (int(np.mean(bottom_pts[:,0]) - w*0.4), int(np.mean(bottom_pts[:,1]))), (int(np.mean(bottom_pts[:,0]) + w*0.4), h), 255, -1)
         mask = cv2.GaussianBlur(mask, (71, 71), 0)
@@ -0,0 +1,21 @@
+"""
+MongoDB collection for cached /analyze results (keyed by image hash + pipeline version)
+"""
+import os
+
+from app.core.logger import get_logger
+from app.mongodb.client import db
+
+logger = get_logger(__name__)
+
+# Cached results expire after this many seconds (default: 7 days)
+RESULT_CACHE_TTL = int(os.getenv("RESULT_CACHE_TTL", 7 * 24 * 3600))
+
+analysis_cache_collection = db["analysis_cache"]
+
+# TTL index: Mongo deletes entries RESULT_CACHE_TTL seconds after created_at
+try:
+    analysis_cache_collection.create_index("created_at", expireAfterSeconds=RESULT_CACHE_TTL)
+    analysis_cache_collection.create_index("version")
+except Exception as e:
+    logger.warning(f"⚠️ Analysis cache index error: {e}", error=str(e))
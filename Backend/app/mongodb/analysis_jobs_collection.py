@@ -0,0 +1,20 @@
+"""
+MongoDB collection for asynchronous /analyze jobs (state + streamed stage results)
+"""
+import os
+
+from app.core.logger import get_logger
+from app.mongodb.client import db
+
+logger = get_logger(__name__)
+
+# Jobs are deleted this many seconds after creation (default: 1 day)
+ANALYSIS_JOB_TTL = int(os.getenv("ANALYSIS_JOB_TTL", 24 * 3600))
+
+analysis_jobs_collection = db["analysis_jobs"]
+
+# TTL index: Mongo deletes finished and abandoned jobs ANALYSIS_JOB_TTL seconds after created_at
+try:
+    analysis_jobs_collection.create_index("created_at", expireAfterSeconds=ANALYSIS_JOB_TTL)
+except Exception as e:
+    logger.warning(f"⚠️ Analysis jobs index error: {e}", error=str(e))
@@ -0,0 +1,15 @@
+"""
+MongoDB collection for consultant chat history (one document per exchange)
+"""
+from app.core.logger import get_logger
+from app.mongodb.client import db
+
+logger = get_logger(__name__)
+
+chat_messages_collection = db["chat_messages"]
+
+# Index for a user's history, newest first
+try:
+    chat_messages_collection.create_index([("user_email", 1), ("created_at", -1)])
+except Exception as e:
+    logger.warning(f"⚠️ Chat collection index error: {e}", error=str(e))
@@ -0,0 +1,20 @@
+"""
+MongoDB collection for pooled LLM tip sets (keyed by quantized profile)
+"""
+import os
+
+from app.core.logger import get_logger
+from app.mongodb.client import db
+
+logger = get_logger(__name__)
+
+# A profile's pool is regenerated this many seconds after it was started (default: 3 days)
+TIPS_CACHE_TTL = int(os.getenv("TIPS_CACHE_TTL", 3 * 24 * 3600))
+
+tips_cache_collection = db["tips_cache"]
+
+# TTL index: Mongo deletes pools TIPS_CACHE_TTL seconds after created_at
+try:
+    tips_cache_collection.create_index("created_at", expireAfterSeconds=TIPS_CACHE_TTL)
+except Exception as e:
+    logger.warning(f"⚠️ Tips cache index error: {e}", error=str(e))
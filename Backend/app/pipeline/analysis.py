@@ -0,0 +1,307 @@
+"""
+Face Analysis Pipeline
+The full /analyze computation (detect -> analyzers -> consultation), as a
+plain synchronous function so it can run on a worker thread or process
+instead of the asyncio event loop.
+"""
+
+import os
+import threading
+from collections import Counter
+
+import cv2
+
+from app.core.logger import get_logger
+from app.pipeline.result_cache import pipeline_version
+
+logger = get_logger(__name__)
+
+# Which face-shape cascade path decided each analysis (geometric / cnn / hybrid / geometric_only).
+# Counted here in the API process, so it covers thread and process pool modes alike.
+_face_shape_paths = Counter()
+_face_shape_paths_lock = threading.Lock()
+
+
+def record_face_shape_path(result):
+    with _face_shape_paths_lock:
+        _face_shape_paths[result.get("face_shape_path", "unknown")] += 1
+
+
+def face_shape_path_counts():
+    with _face_shape_paths_lock:
+        return dict(_face_shape_paths)
+
+
+def preload_models():
+    """
+    Load every model the pipeline needs (FaceLandmarker, gender_net, the
+    EfficientNet face-shape predictor, the colour modules). Used as the worker-process
+    initializer so models are loaded once per worker, not per request.
+    """
+    # Importing these modules loads the FaceLandmarker and gender_net
+    import app.pipeline.face_detection
+    import app.ml.analysis_cv
+    import app.ml.color_analysis
+    import app.ml.consultant
+    from app.ml.face_shape_predictor import get_face_shape_predictor
+    get_face_shape_predictor()
+    logger.info(f"🧠 Analysis worker {os.getpid()}: models loaded")
+
+
+def analyze_image(img, progress=None):
+    """
+    Runs the whole analysis for one decoded BGR image.
+    `progress(event, payload)`, if given, is called with each client-facing
+    partial result as soon as its stage finishes (see _progress_event).
+
+    Returns a picklable dict with a "status" of:
+      - "no_face": no face was detected
+      - "ok": every analysis field plus "annotated_jpg" (encoded overlay bytes)
+    """
+    # Imported lazily so the API process only loads models if it runs analyses itself
+    from app.pipeline.face_detection import detect_faces
+    from app.pipeline.resolution import locate_face
+    from app.pipeline.dag import AnalysisDAG
+    from app.ml.analysis_cv import (
+        calculate_face_shape,
+        classify_gender_geometric,
+        analyze_skin_cv,
+        generate_annotated_image,
+        calculate_facial_symmetry,
+        analyze_eyebrows,
+        detect_undereye_concerns,
+        detect_hair_properties,
+    )
+    from app.ml.color_analysis import (
+        detect_skin_tone,
+        detect_eye_color,
+        detect_hair_color,
+        get_seasonal_color_palette
+    )
+    from app.ml.consultant import generate_consultation
+    from app.ml.personalized_tips import generate_quick_tips
+
+    # Detect on a small proxy, then give each analyzer a context at the resolution it declares
+    pyramid = locate_face(img, detect_faces)
+    if pyramid is None:
+        return {"status": "no_face"}
+
+    shape_ctx = pyramid.context_for(calculate_face_shape)
+    gender_ctx = pyramid.context_for(classify_gender_geometric)
+    skin_ctx = pyramid.context_for(analyze_skin_cv)
+    tone_ctx = pyramid.context_for(detect_skin_tone)
+    eye_ctx = pyramid.context_for(detect_eye_color)
+    hair_ctx = pyramid.context_for(detect_hair_color)
+    symmetry_ctx = pyramid.context_for(calculate_facial_symmetry)
+    brow_ctx = pyramid.context_for(analyze_eyebrows)
+    undereye_ctx = pyramid.context_for(detect_undereye_concerns)
+    hair_props_ctx = pyramid.context_for(detect_hair_properties)
+    consult_ctx = pyramid.context_for(generate_consultation)
+    annotate_ctx = pyramid.context_for(generate_annotated_image)
+    dag = AnalysisDAG()
+
+    # 1. Face Shape & Gender Analysis -> (Shape, Confidence, Fallback, Path) tuple
+    dag.add("shape", lambda: calculate_face_shape(
+                shape_ctx.points, shape_ctx.width, shape_ctx.height, shape_ctx.image, ctx=shape_ctx, return_path=True))
+    dag.add("gender", lambda shape: classify_gender_geometric(
+                gender_ctx.points, gender_ctx.width, gender_ctx.height, gender_ctx.image,
+                face_shape=shape[0], ctx=gender_ctx),
+            deps=["shape"])
+
+    # 2. Skin Analysis (OpenCV) on the tight face crop
+    dag.add("skin", lambda: analyze_skin_cv(skin_ctx.face_crop, skin_ctx.points, ctx=skin_ctx))
+
+    # 3. COLOR ANALYSIS - Skin Tone, Eye Color, Hair Color
+    dag.add("skin_tone", lambda: detect_skin_tone(tone_ctx.image, tone_ctx.points, ctx=tone_ctx))
+    dag.add("eye_color", lambda: detect_eye_color(eye_ctx.image, eye_ctx.points, ctx=eye_ctx))
+    dag.add("hair_color", lambda: detect_hair_color(hair_ctx.image, hair_ctx.points, ctx=hair_ctx))
+    dag.add("season", lambda skin_tone, eye_color, hair_color: get_seasonal_color_palette(
+                skin_tone[0], skin_tone[1], eye_color[0], hair_color[0]),
+            deps=["skin_tone", "eye_color", "hair_color"])
+
+    # 3.5 ADVANCED DIAGNOSTICS (MATHEMATICAL)
+    dag.add("symmetry", lambda: calculate_facial_symmetry(
+                symmetry_ctx.points, symmetry_ctx.width, symmetry_ctx.height, ctx=symmetry_ctx))
+    dag.add("eyebrows", lambda shape: analyze_eyebrows(
+                brow_ctx.points, brow_ctx.width, brow_ctx.height, shape[0], ctx=brow_ctx),
+            deps=["shape"])
+    dag.add("undereye", lambda: detect_undereye_concerns(undereye_ctx.image, undereye_ctx.points, ctx=undereye_ctx))
+    dag.add("hair_props", lambda: detect_hair_properties(hair_props_ctx.image, hair_props_ctx.points, ctx=hair_props_ctx))
+
+    color_deps = ["shape", "gender", "skin", "skin_tone", "eye_color", "hair_color", "season", "hair_props"]
+
+    def profile(shape, gender, skin, skin_tone, eye_color, hair_color, season, hair_props):
+        return dict(
+            face_shape=shape[0], gender=gender, skin_scores=skin,
+            skin_tone=skin_tone[0], undertone=skin_tone[1],
+            eye_color=eye_color[0], hair_color=hair_color[0],
+            season=season[0], hair_properties=hair_props
+        )
+
+    # 4. Generate Consultant Recommendations (Pass all color data)
+    def consultation(**deps):
+        p = profile(**deps)
+        return generate_consultation(
+            p["face_shape"], p["skin_scores"], p["gender"], consult_ctx.image, consult_ctx.points,
+            skin_tone=p["skin_tone"], undertone=p["undertone"],
+            eye_color=p["eye_color"], hair_color=p["hair_color"],
+            season=p["season"], hair_properties=p["hair_properties"], ctx=consult_ctx
+        )
+    dag.add("recommendations", consultation, deps=color_deps)
+
+    # 5. Rule-based Personalized Tips (the LLM tips are generated in the background, see tips_upgrade.py)
+    dag.add("tips", lambda **deps: generate_quick_tips(**profile(**deps)), deps=color_deps)
+
+    # --- GENERATE ANNOTATED IMAGE ---
+    def annotated(gender):
+        overlay = generate_annotated_image(annotate_ctx.image, annotate_ctx.points, gender, ctx=annotate_ctx)
+        return cv2.imencode(".jpg", overlay)[1].tobytes()
+    dag.add("annotated", annotated, deps=["gender"])
+
+    def on_stage(name, partial):
+        event = _progress_event(name, partial)
+        if event is not None:
+            progress(*event)
+
+    results = dag.run(on_stage=on_stage if progress is not None else None)
+    logger.info(f"⏱️ Stage timings (ms): {dag.timings}", stage_timings_ms=dag.timings)
+
+    shape_name, shape_conf, _, shape_path = results["shape"]
+    skin_tone, undertone, skin_hex = results["skin_tone"]
+    eye_color, eye_hex = results["eye_color"]
+    hair_color, hair_hex = results["hair_color"]
+    season, palette = results["season"]
+    logger.info(f"✨ Generated {len(results['tips'])} personalized tips for user")
+
+    return {
+        "status": "ok",
+        "face_shape": shape_name,
+        "face_shape_conf": float(shape_conf),
+        "face_shape_path": shape_path,
+        "gender": results["gender"],
+        "skin_scores": results["skin"],
+        "skin_tone": skin_tone,
+        "undertone": undertone,
+        "skin_hex": skin_hex,
+        "eye_color": eye_color,
+        "eye_hex": eye_hex,
+        "hair_color": hair_color,
+        "hair_hex": hair_hex,
+        "season": season,
+        "hair_properties": results["hair_props"],
+        "symmetry": results["symmetry"],
+        "eyebrows": results["eyebrows"],
+        "undereye": results["undereye"],
+        "recommendations": results["recommendations"],
+        "personalized_tips": results["tips"],
+        "stage_timings_ms": dag.timings,
+        "annotated_jpg": results["annotated"],
+    }
+
+
+def _progress_event(stage, results):
+    """(event, JSON-friendly payload) for a finished DAG stage, or None for internal stages."""
+    if stage == "shape":
+        shape, conf = results["shape"][:2]
+        return "face_shape", {"face_shape": shape, "confidence": float(conf)}
+    if stage == "gender":
+        return "gender", {"gender": results["gender"]}
+    if stage == "skin":
+        return "skin", {"skin_analysis": results["skin"]}
+    if stage == "season":
+        # Season is computed last of the colour stages, so all of them are available
+        skin_tone, undertone, skin_hex = results["skin_tone"]
+        eye_color, eye_hex = results["eye_color"]
+        hair_color, hair_hex = results["hair_color"]
+        return "color", {"color_analysis": {
+            "skin_tone": skin_tone, "undertone": undertone, "skin_hex": skin_hex,
+            "eye_color": eye_color, "eye_hex": eye_hex,
+            "hair_color": hair_color, "hair_hex": hair_hex,
+            "season": results["season"][0],
+        }}
+    if stage in ("symmetry", "eyebrows", "undereye"):
+        return stage, {stage: results[stage]}
+    if stage == "hair_props":
+        return "hair_properties", {"hair_properties": results["hair_props"]}
+    if stage == "recommendations":
+        return "recommendations", {"recommendations": results["recommendations"]}
+    if stage == "tips":
+        return "tips", {"personalized_tips": results["tips"]}
+    return None
+
+
+def build_analysis_document(result, user_email, image_url, annotated_image_url, created_at):
+    """Mongo document stored in analysis_collection for a finished analysis."""
+    return {
+        "user_email": user_email,
+        "image_url": image_url,
+        "annotated_image_url": annotated_image_url,
+        "face_shape": result["face_shape"],
+        "face_shape_conf": result["face_shape_conf"],
+        "gender": result["gender"],
+        "skin_scores": result["skin_scores"],
+        # Color Analysis Data
+        "skin_tone": result["skin_tone"],
+        "undertone": result["undertone"],
+        "skin_hex": result["skin_hex"],
+        "eye_color": result["eye_color"],
+        "eye_hex": result["eye_hex"],
+        "hair_color": result["hair_color"],
+        "hair_hex": result["hair_hex"],
+        "season": result["season"],
+        "hair_properties": result["hair_properties"],
+        # Perceptual hashes for near-duplicate reuse (see near_duplicate.py)
+        "phash": result.get("phash"),
+        "dhash": result.get("dhash"),
+        # Only analyses from the current pipeline/models are reused by near-duplicate lookups
+        "pipeline_version": pipeline_version(),
+        # New Metrics
+        "symmetry": result["symmetry"],
+        "eyebrows": result["eyebrows"],
+        "undereye": result["undereye"],
+        "recommendations": result["recommendations"],
+        "personalized_tips": result["personalized_tips"],
+        "tips_status": result.get("tips_status", "fallback"),
+        "stage_timings_ms": result["stage_timings_ms"],
+        "created_at": created_at
+    }
+
+
+def build_analysis_response(result, image_url, annotated_image_url):
+    """JSON payload returned by /analyze for a finished analysis."""
+    skin_scores = result["skin_scores"]
+    return {
+        "success": True,
+        "data": {
+            "analysis_id": result.get("analysis_id"),
+            "face_shape": result["face_shape"],
+            "confidence": float(result["face_shape_conf"]),
+            "gender": result["gender"],
+            "skin_analysis": {
+                "acne": float(skin_scores.get('acne', 0)),
+                "oiliness": float(skin_scores.get('oiliness', 0)),
+                "texture": float(skin_scores.get('texture', 0))
+            },
+            "color_analysis": {
+                "skin_tone": result["skin_tone"],
+                "undertone": result["undertone"],
+                "skin_hex": result["skin_hex"],
+                "eye_color": result["eye_color"],
+                "eye_hex": result["eye_hex"],
+                "hair_color": result["hair_color"],
+                "hair_hex": result["hair_hex"],
+                "hair_properties": result["hair_properties"],
+                "season": result["season"]
+            },
+            "recommendations": result["recommendations"],
+            "personalized_tips": result["personalized_tips"],
+            # "pending": LLM tips will replace these, see GET /analysis/{analysis_id}/tips
+            "tips_status": result.get("tips_status", "ready"),
+            "image_url": image_url,
+            "annotated_image_url": annotated_image_url,
+            "hair_properties": result["hair_properties"],
+            "symmetry": result["symmetry"],
+            "eyebrows": result["eyebrows"],
+            "undereye": result["undereye"],
+        }
+    }
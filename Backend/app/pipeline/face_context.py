@@ -0,0 +1,199 @@
+"""
+Per-request Face Context
+Holds everything the analyzers derive from one (image, landmarks) pair so that
+bounding boxes, colour-space conversions and region masks are computed once.
+"""
+
+import threading
+from functools import cached_property
+
+import cv2
+import numpy as np
+
+from app.pipeline.landmarks import (
+    CHEEK_LEFT_IDX, CHEEK_RIGHT_IDX, FOREHEAD_IDX, NOSE_IDX, FACE_OVAL_IDX,
+    CHEEK_PATCH_IDX, IRIS_IDX, landmarks_to_points, bbox_from_points
+)
+
+# Face width (px) the analyzers' pixel constants were tuned at (a face in a 1280x720
+# live-camera frame). Constants are applied as that fraction of the actual face width
+# (see FaceContext.face_scale), so results don't depend on the upload or analysis resolution.
+REFERENCE_FACE_WIDTH = 384.0
+
+
+class FaceContext:
+    """
+    Shared, lazily-populated view of a single detected face.
+
+    Every derived array (pixel coordinates, LAB/HSV/gray planes, region masks,
+    padded crops) is computed on first access and cached for the rest of the
+    request, so analyzers can ask for them freely. Safe to share between the
+    threads of one AnalysisDAG run.
+    """
+
+    def __init__(self, image, landmarks, width=None, height=None):
+        """
+        `landmarks` is either the (N, 3) pixel-space array returned by
+        detect_faces()["points"] or a legacy list of MediaPipe landmarks.
+        """
+        self.image = image
+        if image is not None:
+            self.height, self.width = image.shape[:2]
+        else:
+            self.width, self.height = width, height
+        self.points = landmarks_to_points(landmarks, self.width, self.height)
+        self._masks = {}
+        self._crops = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def ensure(cls, ctx, image, landmarks, width=None, height=None):
+        """Return ``ctx`` or build a throwaway context for legacy callers."""
+        if ctx is not None:
+            return ctx
+        return cls(image, landmarks, width, height)
+
+    def rescaled(self, image):
+        """Context sharing these (normalized) landmarks but bound to another image/crop."""
+        h, w = image.shape[:2]
+        return FaceContext(image, self.lm * np.array([w, h, w], dtype=np.float64))
+
+    # --- GEOMETRY ---
+
+    @cached_property
+    def lm(self):
+        """(N, 3) landmarks normalized to [0, 1] like MediaPipe's output (float64)."""
+        return self.points / np.array([self.width, self.height, self.width], dtype=np.float64)
+
+    @cached_property
+    def xy(self):
+        """(N, 2) landmark positions in pixel space (float64, so derived scores stay JSON-friendly)."""
+        return self.points[:, :2].astype(np.float64)
+
+    @cached_property
+    def ixy(self):
+        """(N, 2) landmark positions truncated to integer pixels."""
+        return self.xy.astype(np.int32)
+
+    def px(self, idx):
+        """Integer pixel coordinate of a single landmark, as an (x, y) tuple."""
+        x, y = self.ixy[idx]
+        return (int(x), int(y))
+
+    def polygon(self, indices):
+        return self.ixy[indices]
+
+    @cached_property
+    def face_width(self):
+        """Landmark extent width (px) of the face in this image."""
+        return max(1.0, float(self.xy[:, 0].max() - self.xy[:, 0].min()))
+
+    @cached_property
+    def face_scale(self):
+        """Face width relative to REFERENCE_FACE_WIDTH: multiply tuned pixel constants by it."""
+        return self.face_width / REFERENCE_FACE_WIDTH
+
+    def face_px(self, reference_px):
+        """Pixels in this image for a length of `reference_px` on a reference-width face."""
+        return int(round(reference_px * self.face_scale))
+
+    def at_reference_scale(self, patch):
+        """`patch` resampled to how it would look on a reference-width face (for texture measures)."""
+        h, w = patch.shape[:2]
+        size = (max(1, int(round(w / self.face_scale))), max(1, int(round(h / self.face_scale))))
+        if size == (w, h):
+            return patch
+        interpolation = cv2.INTER_AREA if self.face_scale > 1 else cv2.INTER_LINEAR
+        return cv2.resize(patch, size, interpolation=interpolation)
+
+    @cached_property
+    def bbox(self):
+        """Tight [x, y, w, h] box around all landmarks."""
+        return bbox_from_points(self.points)
+
+    @cached_property
+    def extent(self):
+        """Integer (x1, y1, x2, y2) landmark extent."""
+        x1, y1 = self.xy.min(axis=0).astype(int)
+        x2, y2 = self.xy.max(axis=0).astype(int)
+        return int(x1), int(y1), int(x2), int(y2)
+
+    @cached_property
+    def face_crop(self):
+        x, y, w, h = self.bbox
+        return self.image[y:y + h, x:x + w]
+
+    def padded_crop(self, pad):
+        """Face crop expanded by ``pad`` x box size on every side (clamped)."""
+        with self._lock:
+            if pad in self._crops:
+                return self._crops[pad]
+            x1, y1, x2, y2 = self.extent
+            pad_x = int((x2 - x1) * pad)
+            pad_y = int((y2 - y1) * pad)
+            x1 = max(0, x1 - pad_x)
+            y1 = max(0, y1 - pad_y)
+            x2 = min(self.width, x2 + pad_x)
+            y2 = min(self.height, y2 + pad_y)
+            self._crops[pad] = self.image[y1:y2, x1:x2]
+            return self._crops[pad]
+
+    # --- COLOUR PLANES ---
+
+    @cached_property
+    def lab(self):
+        return cv2.cvtColor(self.image, cv2.COLOR_BGR2LAB)
+
+    @cached_property
+    def hsv(self):
+        return cv2.cvtColor(self.image, cv2.COLOR_BGR2HSV)
+
+    @cached_property
+    def gray(self):
+        return cv2.cvtColor(self.image, cv2.COLOR_BGR2GRAY)
+
+    # --- REGION MASKS ---
+
+    def mask(self, region):
+        """
+        Cached uint8 mask (0/255) for a named region:
+        cheeks, tzone, forehead, face_oval, cheek_patches, iris.
+        """
+        with self._lock:
+            if region not in self._masks:
+                self._masks[region] = self._build_mask(region)
+            return self._masks[region]
+
+    def _build_mask(self, region):
+        mask = np.zeros((self.height, self.width), dtype=np.uint8)
+
+        if region == "cheeks":
+            cv2.fillPoly(mask, [self.polygon(CHEEK_LEFT_IDX)], 255)
+            cv2.fillPoly(mask, [self.polygon(CHEEK_RIGHT_IDX)], 255)
+        elif region == "tzone":
+            cv2.fillPoly(mask, [self.polygon(FOREHEAD_IDX)], 255)
+            cv2.fillPoly(mask, [self.polygon(NOSE_IDX)], 255)
+        elif region == "forehead":
+            cv2.fillPoly(mask, [self.polygon(FOREHEAD_IDX)], 255)
+        elif region == "face_oval":
+            cv2.fillPoly(mask, [self.polygon(FACE_OVAL_IDX)], 255)
+        elif region == "cheek_patches":
+            radius = int(self.width * 0.05)
+            for idx in CHEEK_PATCH_IDX:
+                cv2.circle(mask, self.px(idx), radius, 255, -1)
+        elif region == "iris":
+            radius = int(self.width * 0.015)
+            for idx in IRIS_IDX:
+                cv2.circle(mask, self.px(idx), radius, 255, -1)
+        else:
+            raise ValueError(f"Unknown face region: {region}")
+
+        return mask
+
+    @cached_property
+    def hair_band(self):
+        """Full-width strip just above the forehead, or None if out of frame."""
+        forehead_y = self.px(10)[1]
+        if forehead_y < self.face_px(30):
+            return None
+        return self.image[max(0, forehead_y - self.face_px(60)):forehead_y - self.face_px(10), :]
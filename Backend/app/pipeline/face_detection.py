@@ -3,6 +3,12 @@ import mediapipe as mp
 import numpy as np
 import os
 
+from app.pipeline.landmarks import landmarks_to_points, bbox_from_points
+from app.core.logger import get_logger
+from app.core.metrics import trace
+
+logger = get_logger(__name__)
+
 # MediaPipe Tasks API
 BaseOptions = mp.tasks.BaseOptions
 FaceLandmarker = mp.tasks.vision.FaceLandmarker
@@ -19,18 +25,22 @@ try:
         running_mode=VisionRunningMode.IMAGE
     )
     detector = FaceLandmarker.create_from_options(options)
-    print(f"✅ FaceLandmarker loaded from {MODEL_PATH}")
+    logger.info(f"✅ FaceLandmarker loaded from {MODEL_PATH}")
 except Exception as e:
-    print(f"❌ Failed to load FaceLandmarker: {e}")
+    logger.error(f"❌ Failed to load FaceLandmarker: {e}", error=str(e))
     detector = None
 
+@trace("detect_faces")
 def detect_faces(image):
     """
     Detects faces using MediaPipe FaceLandmarker.
-    Returns list of [x, y, w, h].
+    Returns a list of dicts with:
+      bbox      - [x, y, w, h]
+      landmarks - raw MediaPipe NormalizedLandmark list
+      points    - (N, 3) float32 landmark array in pixel coordinates
     """
     if detector is None:
-        print("Detector not initialized.")
+        logger.error("Detector not initialized.")
         return []
 
     try:
@@ -50,26 +60,18 @@ def detect_faces(image):
         h, w, _ = image.shape
 
         for landmarks in detection_result.face_landmarks:
-            # Get bounding box from landmarks
-            xs = [lm.x for lm in landmarks]
-            ys = [lm.y for lm in landmarks]
-            
-            xmin = min(xs) * w
-            ymin = min(ys) * h
-            xmax = max(xs) * w
-            ymax = max(ys) * h
-            
-            # Add padding/margin if needed, but for now we keep tight box
-            width = xmax - xmin
-            height = ymax - ymin
+            # Convert once; downstream code works on the array, not per-point objects
+            points = landmarks_to_points(landmarks, w, h)
             
+            # Tight bounding box from landmarks (no padding)
             faces.append({
-                "bbox": [int(xmin), int(ymin), int(width), int(height)],
-                "landmarks": landmarks
+                "bbox": bbox_from_points(points),
+                "landmarks": landmarks,
+                "points": points
             })
 
         return faces
 
     except Exception as e:
-        print(f"Error in detect_faces: {e}")
+        logger.error(f"Error in detect_faces: {e}")
         return []
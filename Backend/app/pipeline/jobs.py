@@ -0,0 +1,98 @@
+"""
+Asynchronous Analysis Jobs
+State for `POST /analyze?mode=async`. A job document records each stage
+result as the worker produces it, so clients can poll the job or follow it
+as a server-sent event stream. Workers write progress straight to Mongo,
+which works the same in thread and process pool mode.
+
+Job document:
+    _id         job id (hex)
+    user_email  owner
+    status      "queued" | "running" | "done" | "failed"
+    events      [{"event": "face_shape", "data": {...}, "elapsed_ms": 412.0}, ...]
+                (elapsed since the job was submitted)
+    result      final /analyze response once done
+    error       message once failed
+    created_at  TTL anchor (see analysis_jobs_collection.py)
+"""
+
+import os
+import time
+import uuid
+from datetime import datetime
+
+from app.core.logger import get_logger
+
+logger = get_logger(__name__)
+
+# How often the SSE stream re-reads the job, and how long it follows one job at most (seconds)
+ANALYSIS_JOB_POLL_INTERVAL = float(os.getenv("ANALYSIS_JOB_POLL_INTERVAL", 0.25))
+ANALYSIS_JOB_STREAM_TIMEOUT = float(os.getenv("ANALYSIS_JOB_STREAM_TIMEOUT", 300))
+
+
+def _collection():
+    # Imported lazily: worker processes only connect when they report progress
+    from app.mongodb.analysis_jobs_collection import analysis_jobs_collection
+    return analysis_jobs_collection
+
+
+def create_job(user_email, result=None):
+    """New job id; pass `result` to record an already finished job (e.g. a cache hit)."""
+    job_id = uuid.uuid4().hex
+    _collection().insert_one({
+        "_id": job_id,
+        "user_email": user_email,
+        "status": "done" if result is not None else "queued",
+        "events": [],
+        "result": result,
+        "error": None,
+        "created_at": datetime.utcnow(),
+    })
+    return job_id
+
+
+class JobProgress:
+    """
+    Picklable progress callback for analyze_image(progress=...): appends each
+    stage event to the job document. Failures are logged, never raised, so a
+    Mongo hiccup cannot fail the analysis itself.
+    """
+
+    def __init__(self, job_id):
+        self.job_id = job_id
+        # Wall clock, so the elapsed time is also right when called in a worker process
+        self.created = time.time()
+
+    def __call__(self, event, data):
+        elapsed_ms = round((time.time() - self.created) * 1000, 1)
+        try:
+            _collection().update_one(
+                {"_id": self.job_id},
+                {"$set": {"status": "running"},
+                 "$push": {"events": {"event": event, "data": data, "elapsed_ms": elapsed_ms}}},
+            )
+        except Exception as e:
+            logger.warning(f"⚠️ Job {self.job_id}: progress update failed: {e}")
+
+
+def finish_job(job_id, result):
+    _collection().update_one({"_id": job_id}, {"$set": {"status": "done", "result": result}})
+
+
+def fail_job(job_id, error):
+    _collection().update_one({"_id": job_id}, {"$set": {"status": "failed", "error": error}})
+
+
+def get_job(job_id, user_email):
+    """The job as returned to its owner (None if missing or owned by someone else)."""
+    job = _collection().find_one({"_id": job_id, "user_email": user_email})
+    if job is None:
+        return None
+    return {
+        "job_id": job["_id"],
+        "status": job["status"],
+        "events": job["events"],
+        "result": job["result"],
+        "error": job["error"],
+        "created_at": job["created_at"].isoformat(),
+    }
@@ -0,0 +1,62 @@
+"""
+Vectorized Landmark Helpers
+MediaPipe FaceMesh index groups and utilities for working with landmarks as a
+(N, 3) float32 array in pixel coordinates instead of per-point objects.
+"""
+
+import numpy as np
+
+
+# --- INDEX GROUPS (MediaPipe FaceMesh topology) ---
+
+CHEEK_LEFT_IDX = np.array([123, 50, 205, 117, 118, 101, 214, 212])
+CHEEK_RIGHT_IDX = np.array([352, 280, 425, 346, 347, 330, 434, 432])
+FOREHEAD_IDX = np.array([103, 104, 105, 9, 334, 333, 332, 297, 338, 10, 109, 67])
+NOSE_IDX = np.array([197, 195, 5, 4, 1, 2, 94, 168])
+FACE_OVAL_IDX = np.array([10, 338, 297, 332, 284, 251, 389, 356, 454, 323, 361, 288,
+                          397, 365, 379, 378, 400, 377, 152, 148, 176, 149, 150, 136,
+                          172, 58, 132, 93, 234, 127, 162, 21, 54, 103, 67, 109])
+CHEEK_PATCH_IDX = np.array([234, 454])
+IRIS_IDX = np.array([468, 473])
+
+LIPS_OUTER_IDX = np.array([61, 146, 91, 181, 84, 17, 314, 405, 321, 375, 291, 409, 270, 269, 267, 0, 37, 39, 40, 185])
+LIPS_INNER_IDX = np.array([78, 95, 88, 178, 87, 14, 317, 402, 318, 324, 308, 415, 310, 311, 312, 13, 82, 81, 80, 191])
+EYELID_LEFT_IDX = np.array([226, 247, 30, 29, 27, 28, 56, 190, 243])
+EYELID_RIGHT_IDX = np.array([463, 414, 286, 258, 257, 259, 260, 467, 446])
+EYE_LEFT_IDX = np.array([33, 7, 163, 144, 145, 153, 154, 155, 133, 173, 157, 158, 159, 160, 161, 246])
+EYE_RIGHT_IDX = np.array([362, 382, 381, 380, 374, 373, 390, 249, 263, 466, 388, 387, 386, 385, 384, 398])
+BROW_LEFT_IDX = np.array([70, 63, 105, 66, 107, 55, 193])
+BROW_RIGHT_IDX = np.array([300, 293, 334, 296, 336, 285, 417])
+HAIRLINE_OVAL_IDX = np.array([10, 109, 67, 103, 54, 21, 162, 127, 234, 93, 132, 58, 172, 150, 149, 148, 152,
+                              377, 378, 379, 397, 288, 361, 323, 454, 389, 251, 284, 332, 297, 338])
+
+NUM_MESH_POINTS = 468  # FaceMesh points without the 10 iris refinements
+
+
+def landmarks_to_points(landmarks, width, height):
+    """
+    Convert MediaPipe NormalizedLandmark objects to a (N, 3) float32 array in
+    pixel coordinates (z is scaled by width, like x). Arrays pass through.
+    """
+    if isinstance(landmarks, np.ndarray):
+        return landmarks
+    norm = np.array([(lm.x, lm.y, lm.z) for lm in landmarks], dtype=np.float32)
+    return norm * np.array([width, height, width], dtype=np.float32)
+
+
+def gather(points, indices):
+    """Batched index gather -> (K, 2) int32 pixel coordinates, ready for cv2 polygons."""
+    return points[indices, :2].astype(np.int32)
+
+
+def point(points, idx):
+    """Single landmark as an integer (x, y) tuple."""
+    x, y = points[idx, :2].astype(np.int32)
+    return (int(x), int(y))
+
+
+def bbox_from_points(points):
+    """Tight [x, y, w, h] box around all landmarks."""
+    xmin, ymin = points[:, :2].min(axis=0)
+    xmax, ymax = points[:, :2].max(axis=0)
+    return [int(xmin), int(ymin), int(xmax - xmin), int(ymax - ymin)]
@@ -0,0 +1,58 @@
+"""
+Near-Duplicate Scan Detection
+Consecutive webcam frames or a selfie re-encoded by the phone hash to (almost)
+the same pHash/dHash. Stored analyses in analysis_collection carry both hashes;
+a new upload within the Hamming thresholds of one of the user's recent scans
+reuses that analysis instead of rerunning the pipeline.
+Thresholds come from scripts/benchmark_near_duplicate.py.
+"""
+
+import os
+from datetime import datetime, timedelta
+
+from app.pipeline.result_cache import pipeline_version
+from app.utils.image_hash import hamming
+
+NEAR_DUP_ENABLED = os.getenv("NEAR_DUP_ENABLED", "1") != "0"
+# Both hashes must be within their threshold (out of 64 bits)
+NEAR_DUP_PHASH_THRESHOLD = int(os.getenv("NEAR_DUP_PHASH_THRESHOLD", 4))
+NEAR_DUP_DHASH_THRESHOLD = int(os.getenv("NEAR_DUP_DHASH_THRESHOLD", 6))
+# Only the user's most recent scans are candidates
+NEAR_DUP_LOOKBACK = int(os.getenv("NEAR_DUP_LOOKBACK", 20))
+NEAR_DUP_MAX_AGE_HOURS = float(os.getenv("NEAR_DUP_MAX_AGE_HOURS", 24))
+
+_index_ready = False
+
+
+def is_near_duplicate(hashes, candidate):
+    return (hamming(hashes["phash"], candidate["phash"]) <= NEAR_DUP_PHASH_THRESHOLD
+            and hamming(hashes["dhash"], candidate["dhash"]) <= NEAR_DUP_DHASH_THRESHOLD)
+
+
+def find_near_duplicate(collection, user_email, hashes):
+    """
+    Closest recent analysis of this user, made by the current pipeline, whose hashes match.
+    Returns: the stored analysis document or None
+    """
+    global _index_ready
+    if not _index_ready:
+        collection.create_index([("user_email", 1), ("created_at", -1)])
+        _index_ready = True
+
+    since = datetime.utcnow() - timedelta(hours=NEAR_DUP_MAX_AGE_HOURS)
+    # Analyses stored before hashing (or copied from such a cache entry) have no hashes or null ones;
+    # ones from an older pipeline or other models must not be served again
+    recent = collection.find(
+        {"user_email": user_email, "created_at": {"$gte": since},
+         "phash": {"$type": "string"}, "dhash": {"$type": "string"},
+         "pipeline_version": pipeline_version()}
+    ).sort("created_at", -1).limit(NEAR_DUP_LOOKBACK)
+
+    best, best_dist = None, None
+    for doc in recent:
+        if not is_near_duplicate(hashes, doc):
+            continue
+        dist = hamming(hashes["phash"], doc["phash"]) + hamming(hashes["dhash"], doc["dhash"])
+        if best is None or dist < best_dist:
+            best, best_dist = doc, dist
+    return best
@@ -0,0 +1,111 @@
+"""
+Resolution Normalization
+Keeps per-request CPU and memory independent of camera megapixels:
+  1. a cheap first pass detects the face on a small proxy of the upload;
+  2. its landmarks are mapped back to the decoded image's coordinates;
+  3. every analyzer gets a FaceContext downscaled so the face is about as
+     wide as the analyzer declares it needs (@face_resolution), never upscaled.
+"""
+
+import os
+import threading
+
+import cv2
+import numpy as np
+
+# Face width (px) most analyzers work at, and the finer one for texture/detail analyzers
+WORKING_FACE_WIDTH = int(os.getenv("ANALYSIS_FACE_WIDTH", 384))
+DETAIL_FACE_WIDTH = int(os.getenv("ANALYSIS_DETAIL_FACE_WIDTH", 768))
+# Long side (px) of the first-pass detection proxy
+DETECTION_MAX_SIDE = int(os.getenv("ANALYSIS_DETECTION_MAX_SIDE", 640))
+
+
+def face_resolution(face_width):
+    """Decorator: declares how wide (px) the face should be in the image an analyzer receives."""
+    def mark(fn):
+        fn.face_width = face_width
+        return fn
+    return mark
+
+
+def _resize(image, scale):
+    h, w = image.shape[:2]
+    size = (max(1, int(round(w * scale))), max(1, int(round(h * scale))))
+    return cv2.resize(image, size, interpolation=cv2.INTER_AREA)
+
+
+def _map_points(points, from_shape, to_shape):
+    """Pixel landmarks of an image of `from_shape` -> same landmarks on an image of `to_shape`."""
+    sx = to_shape[1] / from_shape[1]
+    sy = to_shape[0] / from_shape[0]
+    return (points * np.array([sx, sy, sx], dtype=np.float32)).astype(np.float32)
+
+
+class ResolutionPyramid:
+    """
+    The decoded image plus its landmarks, handing out FaceContexts at the
+    face width each analyzer asks for. Levels are built once and shared.
+    """
+
+    def __init__(self, image, points):
+        self.image = image
+        self.points = points
+        x1, x2 = points[:, 0].min(), points[:, 0].max()
+        self.face_width = max(1.0, float(x2 - x1))
+        self._levels = {}
+        self._lock = threading.Lock()
+
+    def scale_for(self, face_width):
+        scale = min(1.0, face_width / self.face_width)
+        # Not worth a resize for less than ~10%
+        return 1.0 if scale > 0.9 else round(scale, 3)
+
+    def level(self, face_width):
+        from app.pipeline.face_context import FaceContext
+
+        scale = self.scale_for(face_width)
+        with self._lock:
+            if scale not in self._levels:
+                if scale == 1.0:
+                    self._levels[scale] = FaceContext(self.image, self.points)
+                else:
+                    image = _resize(self.image, scale)
+                    points = _map_points(self.points, self.image.shape, image.shape)
+                    self._levels[scale] = FaceContext(image, points)
+            return self._levels[scale]
+
+    def context_for(self, analyzer):
+        """FaceContext at the resolution `analyzer` declares (WORKING_FACE_WIDTH if it declares none)."""
+        return self.level(getattr(analyzer, "face_width", WORKING_FACE_WIDTH))
+
+
+def locate_face(image, detect_faces):
+    """
+    First pass: detect on a small proxy, map landmarks back to `image`.
+    Re-detects at working resolution when the face is too small in the proxy
+    for precise landmarks, and on the full image if the proxy finds nothing.
+    Returns: ResolutionPyramid or None
+    """
+    h, w = image.shape[:2]
+    proxy_scale = min(1.0, DETECTION_MAX_SIDE / max(h, w))
+    proxy = _resize(image, proxy_scale) if proxy_scale < 1.0 else image
+
+    faces = detect_faces(proxy)
+    if not faces:
+        if proxy is image:
+            return None
+        # Small face in a large photo: fall back to the full-resolution pass
+        faces = detect_faces(image)
+        return ResolutionPyramid(image, faces[0]["points"]) if faces else None
+
+    pyramid = ResolutionPyramid(image, _map_points(faces[0]["points"], proxy.shape, image.shape))
+
+    # Face under half the working width in the proxy: refine landmarks on the working level
+    if pyramid.face_width * proxy_scale < WORKING_FACE_WIDTH / 2 and proxy is not image:
+        working = pyramid.level(WORKING_FACE_WIDTH).image
+        if working.shape[1] > proxy.shape[1]:
+            refined = detect_faces(working)
+            if refined:
+                pyramid = ResolutionPyramid(image, _map_points(refined[0]["points"], working.shape, image.shape))
+
+    return pyramid
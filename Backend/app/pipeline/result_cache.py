@@ -0,0 +1,140 @@
+"""
+Analysis Result Cache
+Content-addressed cache for /analyze: the key is a hash of the decoded image
+pixels plus the pipeline/model version, so re-uploads and client retries of
+the same photo reuse the stored result and image URLs instead of rerunning
+the pipeline. Two tiers: an in-process LRU in front of a Mongo collection
+with a TTL index (app/mongodb/analysis_cache_collection.py).
+"""
+
+import glob
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime
+
+from app.core.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Bump when analysis code changes in a way that alters results
+PIPELINE_VERSION = "8"
+
+RESULT_CACHE_ENABLED = os.getenv("RESULT_CACHE_ENABLED", "1") != "0"
+RESULT_CACHE_SIZE = int(os.getenv("RESULT_CACHE_SIZE", 256))
+
+# Model artifacts whose change invalidates every cached result
+_MODEL_DIRS = [
+    os.path.join(os.path.dirname(__file__), "../models"),
+    os.path.join(os.path.dirname(__file__), "../../models"),
+]
+
+
+def pipeline_version():
+    """PIPELINE_VERSION + face-shape backend + name/size/mtime of every model artifact."""
+    parts = [PIPELINE_VERSION, os.getenv("FACE_SHAPE_BACKEND", "auto").lower(),
+             os.getenv("FACE_SHAPE_MARGIN_THRESHOLD", "")]
+    for model_dir in _MODEL_DIRS:
+        for path in sorted(glob.glob(os.path.join(model_dir, "*"))):
+            if os.path.isfile(path):
+                stat = os.stat(path)
+                parts.append(f"{os.path.basename(path)}:{stat.st_size}:{int(stat.st_mtime)}")
+    return hashlib.sha1("|".join(parts).encode()).hexdigest()[:12]
+
+
+class ResultCache:
+    def __init__(self, collection=None, max_entries=RESULT_CACHE_SIZE, version=None):
+        self.collection = collection
+        self.max_entries = max_entries
+        self.version = version or pipeline_version()
+        self._lru = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = 0
+
+    def key_for(self, img):
+        """Hash of the decoded pixels (shape included) plus the pipeline version."""
+        digest = hashlib.blake2b(digest_size=20)
+        digest.update(str(img.shape).encode())
+        digest.update(img.tobytes())
+        return f"{self.version}:{digest.hexdigest()}"
+
+    def get(self, key):
+        """Cached entry {result, image_url, annotated_image_url, user_email} or None."""
+        with self._lock:
+            entry = self._lru.get(key)
+            if entry is not None:
+                self._lru.move_to_end(key)
+                self.hits += 1
+                return entry
+
+        entry = None
+        if self.collection is not None:
+            try:
+                doc = self.collection.find_one({"_id": key, "version": self.version})
+                if doc is not None:
+                    entry = {k: doc[k] for k in ("result", "image_url", "annotated_image_url", "user_email")}
+            except Exception as e:
+                logger.warning(f"⚠️ Result cache lookup failed: {e}")
+
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._remember(key, entry)
+        return entry
+
+    def put(self, key, result, image_url, annotated_image_url, user_email):
+        # The annotated JPEG is already on disk; only keep the JSON-able result
+        result = {k: v for k, v in result.items() if k != "annotated_jpg"}
+        entry = {"result": result, "image_url": image_url,
+                 "annotated_image_url": annotated_image_url, "user_email": user_email}
+        with self._lock:
+            self._remember(key, entry)
+
+        if self.collection is not None:
+            try:
+                self.collection.replace_one(
+                    {"_id": key},
+                    {**entry, "version": self.version, "created_at": datetime.utcnow()},
+                    upsert=True,
+                )
+            except Exception as e:
+                logger.warning(f"⚠️ Result cache write failed: {e}")
+
+    def _remember(self, key, entry):
+        self._lru[key] = entry
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.max_entries:
+            self._lru.popitem(last=False)
+
+    def purge_stale(self):
+        """Drop Mongo entries written by another pipeline/model version."""
+        if self.collection is None:
+            return 0
+        try:
+            removed = self.collection.delete_many({"version": {"$ne": self.version}}).deleted_count
+            if removed:
+                logger.info(f"🧹 Result cache: removed {removed} entries from older model versions")
+            return removed
+        except Exception as e:
+            logger.warning(f"⚠️ Result cache purge failed: {e}")
+            return 0
+
+    def stats(self):
+        with self._lock:
+            return {"version": self.version, "entries": len(self._lru),
+                    "hits": self.hits, "misses": self.misses}
+
+
+# Singleton instance
+_cache = None
+
+def get_result_cache():
+    global _cache
+    if _cache is None:
+        from app.mongodb.analysis_cache_collection import analysis_cache_collection
+        _cache = ResultCache(analysis_cache_collection)
+        logger.info(f"🗃️ Result cache ready (version {_cache.version}, {_cache.max_entries} in memory)")
+    return _cache
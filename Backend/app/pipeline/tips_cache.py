@@ -0,0 +1,123 @@
+"""
+LLM Tips Cache
+The tips prompt depends only on the quantized profile (face shape, gender,
+bucketed skin scores, colouring, season, hair; see quantize_profile), and
+many users share one. Each profile key keeps a pool of up to
+TIPS_CACHE_POOL_SIZE LLM tip sets: until the pool is full every request asks
+OpenRouter and adds its answer, afterwards requests sample from the pool.
+Two tiers like the result cache: an in-process LRU in front of a Mongo
+collection with a TTL index (app/mongodb/tips_cache_collection.py).
+"""
+
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+from app.core.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Bump when the tips prompt changes
+TIPS_PROMPT_VERSION = "1"
+
+TIPS_CACHE_ENABLED = os.getenv("TIPS_CACHE_ENABLED", "1") != "0"
+TIPS_CACHE_POOL_SIZE = int(os.getenv("TIPS_CACHE_POOL_SIZE", 3))
+# Profiles kept in memory
+TIPS_CACHE_SIZE = int(os.getenv("TIPS_CACHE_SIZE", 1024))
+
+
+class TipsCache:
+    def __init__(self, collection=None, max_entries=TIPS_CACHE_SIZE, pool_size=TIPS_CACHE_POOL_SIZE, ttl=None):
+        if ttl is None:
+            from app.mongodb.tips_cache_collection import TIPS_CACHE_TTL as ttl
+        self.collection = collection
+        self.max_entries = max_entries
+        self.pool_size = pool_size
+        self.ttl = ttl
+        # key -> {"pool": [tips, ...], "created": epoch seconds}
+        self._lru = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = 0
+
+    def key_for(self, profile):
+        """Hash of the quantized profile plus the prompt version."""
+        from app.ml.personalized_tips import quantize_profile
+        quantized = json.dumps(quantize_profile(**profile), sort_keys=True, default=str)
+        return hashlib.sha1(f"{TIPS_PROMPT_VERSION}|{quantized}".encode()).hexdigest()
+
+    def sample(self, key):
+        """A random tip set from the profile's pool once it is full, else None (ask the LLM)."""
+        with self._lock:
+            entry = self._fresh(key)
+
+        if entry is None and self.collection is not None:
+            try:
+                doc = self.collection.find_one({"_id": key})
+                if doc is not None:
+                    created = doc["created_at"].replace(tzinfo=timezone.utc).timestamp()
+                    entry = {"pool": doc["pool"], "created": created}
+            except Exception as e:
+                logger.warning(f"⚠️ Tips cache lookup failed: {e}")
+
+        with self._lock:
+            if entry is not None and time.time() - entry["created"] < self.ttl:
+                self._remember(key, entry)
+                if len(entry["pool"]) >= self.pool_size:
+                    self.hits += 1
+                    return list(random.choice(entry["pool"]))
+            self.misses += 1
+            return None
+
+    def add(self, key, tips):
+        """Add a freshly generated tip set to the profile's pool (oldest dropped when full)."""
+        with self._lock:
+            entry = self._fresh(key) or {"pool": [], "created": time.time()}
+            entry["pool"] = (entry["pool"] + [list(tips)])[-self.pool_size:]
+            self._remember(key, entry)
+
+        if self.collection is not None:
+            try:
+                self.collection.update_one(
+                    {"_id": key},
+                    {"$push": {"pool": {"$each": [list(tips)], "$slice": -self.pool_size}},
+                     "$setOnInsert": {"created_at": datetime.utcnow()}},
+                    upsert=True,
+                )
+            except Exception as e:
+                logger.warning(f"⚠️ Tips cache write failed: {e}")
+
+    def _fresh(self, key):
+        entry = self._lru.get(key)
+        if entry is not None and time.time() - entry["created"] >= self.ttl:
+            del self._lru[key]
+            return None
+        return entry
+
+    def _remember(self, key, entry):
+        self._lru[key] = entry
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.max_entries:
+            self._lru.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            full = sum(len(e["pool"]) >= self.pool_size for e in self._lru.values())
+            return {"profiles": len(self._lru), "full_pools": full,
+                    "hits": self.hits, "misses": self.misses}
+
+
+# Singleton instance
+_cache = None
+
+def get_tips_cache():
+    global _cache
+    if _cache is None:
+        from app.mongodb.tips_cache_collection import tips_cache_collection
+        _cache = TipsCache(tips_cache_collection)
+        logger.info(f"🗃️ Tips cache ready ({_cache.pool_size} tip sets per profile, {_cache.max_entries} profiles in memory)")
+    return _cache
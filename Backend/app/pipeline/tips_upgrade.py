@@ -0,0 +1,136 @@
+"""
+Background LLM Tips
+/analyze answers with the rule-based tips (generate_quick_tips) and never
+waits on the LLM. Once the analysis is stored, the LLM tips are generated by
+a background task on the event loop (shared LLM client, see llm_client.py)
+and patched into the analysis_collection document; clients pick them up
+from GET /analysis/{id}/tips. Profiles whose tips pool is already full
+(tips_cache.py) get pooled LLM tips straight away instead.
+
+tips_status on the stored document / response:
+    "pending"   LLM tips are being generated
+    "ready"     personalized_tips holds the LLM tips
+    "fallback"  final: the rule-based tips are kept (no API key, LLM failed)
+Analyses stored before this existed have no tips_status and count as "ready".
+"""
+
+import asyncio
+import os
+
+from bson import ObjectId
+from bson.errors import InvalidId
+
+from app.core.logger import get_logger
+from app.core.metrics import trace
+
+logger = get_logger(__name__)
+
+# Concurrent LLM calls for tip upgrades
+TIPS_UPGRADE_WORKERS = int(os.getenv("TIPS_UPGRADE_WORKERS", 4))
+
+# Analysis fields that make up the tips profile (arguments of generate_llm_tips)
+TIP_PROFILE_FIELDS = ("face_shape", "gender", "skin_scores", "skin_tone", "undertone",
+                      "eye_color", "hair_color", "season", "hair_properties")
+
+_slots = None
+# Keep references to running upgrades so they are not garbage collected
+_tasks = set()
+_index_ready = False
+
+
+def _collection():
+    from app.mongodb.collections import analysis_collection
+    return analysis_collection
+
+
+def _object_id(analysis_id):
+    try:
+        return ObjectId(analysis_id)
+    except (InvalidId, TypeError):
+        return None
+
+
+def llm_tips_enabled():
+    from app.ml.personalized_tips import load_api_key
+    return bool(load_api_key())
+
+
+def tip_profile(result):
+    return {field: result.get(field) for field in TIP_PROFILE_FIELDS}
+
+
+def pooled_tips(profile):
+    """LLM tips for this profile from the tips cache, or None (blocking: may query Mongo)."""
+    from app.pipeline.tips_cache import get_tips_cache, TIPS_CACHE_ENABLED
+    if not TIPS_CACHE_ENABLED:
+        return None
+    cache = get_tips_cache()
+    return cache.sample(cache.key_for(profile))
+
+
+def schedule_tips_upgrade(analysis_id, profile):
+    """Generate LLM tips for a stored analysis in the background (call from the event loop)."""
+    task = asyncio.create_task(_upgrade(analysis_id, profile))
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+
+
+async def _upgrade(analysis_id, profile):
+    from app.ml.personalized_tips import generate_llm_tips
+    from app.pipeline.tips_cache import get_tips_cache, TIPS_CACHE_ENABLED
+
+    global _slots
+    if _slots is None:
+        _slots = asyncio.Semaphore(TIPS_UPGRADE_WORKERS)
+    try:
+        async with _slots:
+            # The pool may have filled up while this upgrade was queued
+            tips = await asyncio.to_thread(pooled_tips, profile)
+            if tips is None:
+                with trace("tips_llm"):
+                    tips = await generate_llm_tips(**profile)
+                if tips and TIPS_CACHE_ENABLED:
+                    cache = get_tips_cache()
+                    await asyncio.to_thread(cache.add, cache.key_for(profile), tips)
+    except Exception as e:
+        logger.warning(f"⚠️ Tips upgrade for {analysis_id} failed: {e}", analysis_id=analysis_id)
+        tips = None
+    await asyncio.to_thread(_store_tips, analysis_id, tips)
+
+
+def _store_tips(analysis_id, tips):
+    global _index_ready
+    update = {"tips_status": "ready", "personalized_tips": tips} if tips else {"tips_status": "fallback"}
+    oid = _object_id(analysis_id)
+    try:
+        collection = _collection()
+        if not _index_ready:
+            collection.create_index("tips_from", sparse=True)
+            _index_ready = True
+        # Also patch history copies made from this analysis by result-cache hits
+        collection.update_many({"$or": [{"_id": oid}, {"tips_from": oid}]}, {"$set": update})
+        logger.info(f"✨ Tips for analysis {analysis_id}: {update['tips_status']}",
+                    analysis_id=analysis_id, tips_status=update["tips_status"])
+    except Exception as e:
+        logger.warning(f"⚠️ Could not store tips for analysis {analysis_id}: {e}")
+
+
+def get_tips(analysis_id, user_email=None):
+    """
+    Current tips of a stored analysis, restricted to its owner when user_email is given.
+    Returns: {"analysis_id", "tips_status", "personalized_tips"} or None
+    """
+    oid = _object_id(analysis_id)
+    if oid is None:
+        return None
+    query = {"_id": oid}
+    if user_email is not None:
+        query["user_email"] = user_email
+    doc = _collection().find_one(query, {"personalized_tips": 1, "tips_status": 1})
+    if doc is None:
+        return None
+    return {
+        "analysis_id": str(doc["_id"]),
+        "tips_status": doc.get("tips_status", "ready"),
+        "personalized_tips": doc.get("personalized_tips", []),
+    }
@@ -0,0 +1,315 @@
+"""
+Analysis Worker Pool
+Runs CPU-bound work (face analysis, virtual try-on) off the asyncio event loop
+so cheap endpoints stay responsive while heavy scans are in flight.
+
+In "process" mode N long-lived worker processes load the models once at
+startup, decoded images are handed over through shared memory instead of
+being pickled, and workers are recycled after a crash or after a fixed
+number of tasks.
+
+Configuration (environment):
+    ANALYSIS_POOL_MODE         "thread" (default) or "process"
+    ANALYSIS_POOL_WORKERS      concurrent jobs (default: 2)
+    ANALYSIS_POOL_QUEUE        jobs allowed to wait for a worker (default: 8)
+    ANALYSIS_RETRY_AFTER       seconds suggested to rejected clients (default: 5)
+    ANALYSIS_WORKER_MAX_TASKS  tasks per worker before the process pool is recycled (default: 200)
+    ANALYSIS_HEALTH_INTERVAL   seconds between health checks (default: 30)
+    ANALYSIS_HEALTH_TIMEOUT    seconds a worker has to answer a ping (default: 10)
+"""
+
+import asyncio
+import multiprocessing
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from app.core.logger import get_logger
+from app.core.metrics import collect_spans, observe, record_spans
+
+logger = get_logger(__name__)
+
+ANALYSIS_POOL_MODE = os.getenv("ANALYSIS_POOL_MODE", "thread").lower()
+ANALYSIS_POOL_WORKERS = int(os.getenv("ANALYSIS_POOL_WORKERS", 2))
+ANALYSIS_POOL_QUEUE = int(os.getenv("ANALYSIS_POOL_QUEUE", 8))
+ANALYSIS_RETRY_AFTER = int(os.getenv("ANALYSIS_RETRY_AFTER", 5))
+ANALYSIS_WORKER_MAX_TASKS = int(os.getenv("ANALYSIS_WORKER_MAX_TASKS", 200))
+ANALYSIS_HEALTH_INTERVAL = float(os.getenv("ANALYSIS_HEALTH_INTERVAL", 30))
+ANALYSIS_HEALTH_TIMEOUT = float(os.getenv("ANALYSIS_HEALTH_TIMEOUT", 10))
+
+
+class PoolSaturatedError(Exception):
+    """Raised when every worker is busy and the wait queue is full."""
+
+    def __init__(self, retry_after):
+        super().__init__(f"Analysis pool is at capacity, retry in {retry_after}s")
+        self.retry_after = retry_after
+
+
+# --- WORKER-SIDE HELPERS (must be module-level so they pickle) ---
+
+def _timed_call(fn, args, kwargs):
+    """
+    Run a task and report when it actually started/finished on the worker,
+    with the stage spans it traced (observed by the API process, see metrics.py).
+    """
+    started = time.time()
+    with collect_spans() as spans:
+        result = fn(*args, **kwargs)
+    return result, started, time.time(), spans
+
+
+def _call_with_shared_image(fn, shm_name, shape, dtype, args, kwargs):
+    """Rebuild the image from shared memory, then run ``fn(image, ...)``."""
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        # One memcpy out of the segment so the parent can release it independently
+        image = np.ndarray(shape, dtype=dtype, buffer=shm.buf).copy()
+    finally:
+        shm.close()
+    return fn(image, *args, **kwargs)
+
+
+def _ping():
+    return os.getpid()
+
+
+class PoolMetrics:
+    """Running counters for queue wait vs. compute time (milliseconds)."""
+
+    def __init__(self):
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.restarts = 0
+        self.queue_wait_ms_total = 0.0
+        self.queue_wait_ms_max = 0.0
+        self.compute_ms_total = 0.0
+        self.compute_ms_max = 0.0
+
+    def record(self, queue_wait_ms, compute_ms):
+        observe("pool_queue_wait", queue_wait_ms / 1000)
+        observe("pool_compute", compute_ms / 1000)
+        self.completed += 1
+        self.queue_wait_ms_total += queue_wait_ms
+        self.queue_wait_ms_max = max(self.queue_wait_ms_max, queue_wait_ms)
+        self.compute_ms_total += compute_ms
+        self.compute_ms_max = max(self.compute_ms_max, compute_ms)
+
+    def snapshot(self):
+        n = max(self.completed, 1)
+        return {
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "restarts": self.restarts,
+            "queue_wait_ms_avg": round(self.queue_wait_ms_total / n, 1),
+            "queue_wait_ms_max": round(self.queue_wait_ms_max, 1),
+            "compute_ms_avg": round(self.compute_ms_total / n, 1),
+            "compute_ms_max": round(self.compute_ms_max, 1),
+        }
+
+
+class AnalysisWorkerPool:
+    """
+    Awaitable front-end over a thread or process executor with a bounded
+    queue. Admission is decided on the event loop thread, so the in-flight
+    counter needs no lock.
+
+    Usage:
+        pool = get_analysis_pool()
+        result = await pool.run_image(analyze_image, img)        # image via shared memory
+        buffer = await pool.run(render_tryon, image_b64, ...)    # plain picklable args
+        # both may raise PoolSaturatedError
+
+    In "process" mode `fn` and its arguments must be picklable (module-level
+    functions, bytes, dicts).
+    """
+
+    def __init__(self, mode=ANALYSIS_POOL_MODE, workers=ANALYSIS_POOL_WORKERS,
+                 queue_depth=ANALYSIS_POOL_QUEUE, retry_after=ANALYSIS_RETRY_AFTER,
+                 initializer=None, max_tasks_per_worker=ANALYSIS_WORKER_MAX_TASKS):
+        if mode not in ("thread", "process"):
+            raise ValueError(f"Unknown ANALYSIS_POOL_MODE: {mode}")
+        self.mode = mode
+        self.workers = workers
+        self.queue_depth = queue_depth
+        self.retry_after = retry_after
+        self.initializer = initializer
+        self.max_tasks_per_worker = max_tasks_per_worker
+        self.in_flight = 0
+        self.metrics = PoolMetrics()
+        self.healthy = True
+        self._executor = None
+        self._executor_tasks = 0
+        self._monitor = None
+
+    @property
+    def capacity(self):
+        return self.workers + self.queue_depth
+
+    def _get_executor(self):
+        if self._executor is None:
+            if self.mode == "process":
+                # spawn, not fork: forking after torch/MediaPipe threads have started deadlocks the child
+                self._executor = ProcessPoolExecutor(max_workers=self.workers,
+                                                     mp_context=multiprocessing.get_context("spawn"),
+                                                     initializer=self.initializer)
+                # Workers spawn on demand; one ping each brings them all up (and loads models) now
+                for _ in range(self.workers):
+                    self._executor.submit(_ping)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="analysis-worker")
+            self._executor_tasks = 0
+            logger.info(f"🧵 Analysis pool started: {self.workers} {self.mode} worker(s), queue depth {self.queue_depth}")
+        return self._executor
+
+    def _restart(self, executor, reason, graceful=False):
+        """
+        Replace an executor (once, even if several jobs noticed). The next job
+        starts a fresh pool; a graceful restart lets queued jobs finish first.
+        """
+        if self._executor is not executor:
+            return
+        logger.info(f"♻️ Restarting analysis pool: {reason}", reason=reason)
+        self._executor = None
+        self.metrics.restarts += 1
+        executor.shutdown(wait=False, cancel_futures=not graceful)
+
+    def check_capacity(self):
+        """Raise PoolSaturatedError if a new job would not be admitted right now."""
+        if self.in_flight >= self.capacity:
+            self.metrics.rejected += 1
+            raise PoolSaturatedError(self.retry_after)
+
+    async def run(self, fn, *args, **kwargs):
+        """Run ``fn(*args, **kwargs)`` on a worker and await its result."""
+        self.check_capacity()
+
+        self.in_flight += 1
+        executor = self._get_executor()
+        submitted = time.time()
+        try:
+            loop = asyncio.get_running_loop()
+            result, started, finished, spans = await loop.run_in_executor(
+                executor, _timed_call, fn, args, kwargs
+            )
+        except BrokenProcessPool:
+            self.metrics.failed += 1
+            self._restart(executor, "worker process died")
+            raise
+        except Exception:
+            self.metrics.failed += 1
+            raise
+        finally:
+            self.in_flight -= 1
+
+        self.metrics.record((started - submitted) * 1000, (finished - started) * 1000)
+        record_spans(spans)
+
+        # Recycle worker processes periodically so leaks in native libraries can't accumulate.
+        # (Done per pool rather than with max_tasks_per_child, which can hang on Python 3.11.)
+        if self.mode == "process" and executor is self._executor:
+            self._executor_tasks += 1
+            if self._executor_tasks >= self.workers * self.max_tasks_per_worker:
+                self._restart(executor, f"recycling after {self._executor_tasks} tasks", graceful=True)
+        return result
+
+    async def run_image(self, fn, image, *args, **kwargs):
+        """
+        Run ``fn(image, *args, **kwargs)`` on a worker. In process mode the
+        decoded image travels through a shared-memory segment, not a pickle.
+        """
+        if self.mode != "process":
+            return await self.run(fn, image, *args, **kwargs)
+
+        self.check_capacity()
+
+        shm = shared_memory.SharedMemory(create=True, size=image.nbytes)
+        try:
+            np.ndarray(image.shape, dtype=image.dtype, buffer=shm.buf)[:] = image
+            return await self.run(_call_with_shared_image, fn, shm.name, image.shape, image.dtype.str, args, kwargs)
+        finally:
+            shm.close()
+            shm.unlink()
+
+    # --- HEALTH ---
+
+    async def health_check(self):
+        """
+        Restart the pool if it is broken, or if an idle worker does not
+        answer a ping in time. Busy pools are not pinged: a ping would queue
+        behind real work and look like a hang.
+        """
+        executor = self._executor
+        if executor is None:
+            self.healthy = True
+            return self.healthy
+
+        if getattr(executor, "_broken", False):
+            self._restart(executor, "pool reported broken")
+            self.healthy = False
+        elif self.in_flight == 0:
+            try:
+                loop = asyncio.get_running_loop()
+                await asyncio.wait_for(loop.run_in_executor(executor, _ping), ANALYSIS_HEALTH_TIMEOUT)
+                self.healthy = True
+            except (BrokenProcessPool, asyncio.TimeoutError):
+                self._restart(executor, "worker did not answer health check")
+                self.healthy = False
+        return self.healthy
+
+    async def _monitor_loop(self):
+        while True:
+            await asyncio.sleep(ANALYSIS_HEALTH_INTERVAL)
+            try:
+                await self.health_check()
+            except Exception as e:
+                logger.warning(f"⚠️ Analysis pool health check failed: {e}", error=str(e))
+
+    def start(self):
+        """Start the workers (process mode loads models now) and the health monitor."""
+        self._get_executor()
+        if self._monitor is None:
+            self._monitor = asyncio.get_running_loop().create_task(self._monitor_loop())
+
+    def stats(self):
+        return {
+            "mode": self.mode,
+            "workers": self.workers,
+            "queue_depth": self.queue_depth,
+            "in_flight": self.in_flight,
+            "healthy": self.healthy,
+            **self.metrics.snapshot(),
+        }
+
+    def shutdown(self, wait=True):
+        if self._monitor is not None:
+            self._monitor.cancel()
+            self._monitor = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait, cancel_futures=True)
+            self._executor = None
+
+
+_pool = None
+
+
+def get_analysis_pool():
+    """Process-wide pool shared by every heavy endpoint."""
+    global _pool
+    if _pool is None:
+        from app.pipeline.analysis import preload_models
+        _pool = AnalysisWorkerPool(initializer=preload_models if ANALYSIS_POOL_MODE == "process" else None)
+    return _pool
+
+
+def shutdown_analysis_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown()
+        _pool = None
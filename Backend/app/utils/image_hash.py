@@ -0,0 +1,38 @@
+"""
+Perceptual image hashes (64-bit pHash / dHash) for near-duplicate detection.
+Robust to re-encoding, resizing and small brightness changes; compared with
+Hamming distance.
+"""
+
+import cv2
+import numpy as np
+
+
+def _bits_to_hex(bits):
+    return "%016x" % int("".join("1" if b else "0" for b in bits.flatten()), 2)
+
+
+def _gray(img):
+    return cv2.cvtColor(img, cv2.COLOR_BGR2GRAY) if img.ndim == 3 else img
+
+
+def phash(img):
+    """DCT hash: 8x8 lowest frequencies of a 32x32 grayscale thumbnail vs. their median."""
+    small = cv2.resize(_gray(img), (32, 32), interpolation=cv2.INTER_AREA).astype(np.float32)
+    low = cv2.dct(small)[:8, :8]
+    return _bits_to_hex(low > np.median(low.flatten()[1:]))
+
+
+def dhash(img):
+    """Gradient hash: sign of horizontal differences on a 9x8 grayscale thumbnail."""
+    small = cv2.resize(_gray(img), (9, 8), interpolation=cv2.INTER_AREA).astype(np.int16)
+    return _bits_to_hex(small[:, 1:] > small[:, :-1])
+
+
+def image_hashes(img):
+    return {"phash": phash(img), "dhash": dhash(img)}
+
+
+def hamming(a, b):
+    """Number of differing bits between two hex hashes."""
+    return bin(int(a, 16) ^ int(b, 16)).count("1")
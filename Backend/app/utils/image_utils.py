@@ -12,9 +12,89 @@
 
 
 
+import os
+
 import cv2
 import numpy as np
 
-def read_image(bytes_data):
+from app.core.metrics import trace
+
+# Uploads are decoded no larger than this on their long side (0 = full resolution).
+# JPEGs are decoded straight at 1/2, 1/4 or 1/8 scale, so a 12 MP photo never
+# materialises at full size.
+ANALYSIS_MAX_DECODE_SIDE = int(os.getenv("ANALYSIS_MAX_DECODE_SIDE", 2048))
+
+_REDUCED_FLAGS = [
+    (8, cv2.IMREAD_REDUCED_COLOR_8),
+    (4, cv2.IMREAD_REDUCED_COLOR_4),
+    (2, cv2.IMREAD_REDUCED_COLOR_2),
+]
+
+# JPEG start-of-frame markers (carry the image size); C4/C8/CC are not frames
+_JPEG_SOF = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+def sniff_image_size(data):
+    """
+    Image format and size from the first bytes of a JPEG/PNG, without decoding.
+    Returns: ("jpeg"|"png", width, height), ("unknown", None, None) for other
+    formats or a header without a size, or None if more bytes are needed.
+    """
+    if data[:8] == b"\x89PNG\r\n\x1a\n":
+        if len(data) < 24:
+            return None
+        return "png", int.from_bytes(data[16:20], "big"), int.from_bytes(data[20:24], "big")
+
+    if data[:2] != b"\xff\xd8":
+        return ("unknown", None, None) if len(data) >= 8 else None
+
+    # Walk the JPEG segments up to the start-of-frame header
+    i = 2
+    while True:
+        if i + 4 > len(data):
+            return None
+        if data[i] != 0xFF:
+            return "unknown", None, None
+        marker = data[i + 1]
+        if marker == 0xFF:  # fill byte
+            i += 1
+            continue
+        if marker == 0x01 or 0xD0 <= marker <= 0xD7:  # standalone markers
+            i += 2
+            continue
+        if marker in (0xD9, 0xDA):  # end of image / start of scan before any frame
+            return "unknown", None, None
+        if marker in _JPEG_SOF:
+            if i + 9 > len(data):
+                return None
+            height = int.from_bytes(data[i + 5:i + 7], "big")
+            width = int.from_bytes(data[i + 7:i + 9], "big")
+            return "jpeg", width, height
+        i += 2 + int.from_bytes(data[i + 2:i + 4], "big")
+
+def _image_size(bytes_data):
+    """(width, height) from the image header only, or None if it can't be read."""
+    sniffed = sniff_image_size(bytes_data)
+    if sniffed is None or sniffed[1] is None:
+        return None
+    return sniffed[1], sniffed[2]
+
+@trace("decode")
+def read_image(bytes_data, max_side=ANALYSIS_MAX_DECODE_SIDE):
     img_arr = np.frombuffer(bytes_data, np.uint8)
-    return cv2.imdecode(img_arr, cv2.IMREAD_COLOR)
+    if not max_side:
+        return cv2.imdecode(img_arr, cv2.IMREAD_COLOR)
+
+    # Largest reduction that still leaves at least max_side pixels
+    flag = cv2.IMREAD_COLOR
+    size = _image_size(bytes_data)
+    if size is not None:
+        for factor, reduced in _REDUCED_FLAGS:
+            if max(size) / factor >= max_side:
+                flag = reduced
+                break
+
+    img = cv2.imdecode(img_arr, flag)
+    if img is not None and max(img.shape[:2]) > max_side:
+        scale = max_side / max(img.shape[:2])
+        img = cv2.resize(img, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    return img
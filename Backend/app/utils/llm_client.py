@@ -0,0 +1,418 @@
+"""
+Shared OpenRouter Client
+One pooled httpx.AsyncClient (keep-alive, HTTP/2 when `h2` is installed) for
+every LLM call in the API (chat, personalized tips), instead of a fresh
+connection per model attempt.
+
+`complete(models, messages, api_key)` walks a model list with:
+  - per-model circuit breakers: a model that failed LLM_BREAKER_FAILURES
+    times in a row is skipped for LLM_BREAKER_COOLDOWN seconds, then gets a
+    single trial call (half-open);
+  - hedging: if the current model has not answered after LLM_HEDGE_DELAY
+    seconds the next one is started too (at most LLM_MAX_PARALLEL in
+    flight), a failure starts the next one at once, first valid answer wins;
+  - a global deadline for the whole call (LLM_DEADLINE).
+`stream(...)` does the same on time to first token using OpenRouter's
+streaming mode, then forwards the winning model's tokens.
+Per-model metrics are available from llm_stats().
+"""
+
+import asyncio
+import importlib.util
+import json
+import os
+import threading
+import time
+import weakref
+
+import httpx
+
+from app.core.logger import get_logger
+
+logger = get_logger(__name__)
+
+OPENROUTER_URL = os.getenv("OPENROUTER_URL", "https://openrouter.ai/api/v1/chat/completions")
+
+# Whole call, and a single model attempt (seconds)
+LLM_DEADLINE = float(os.getenv("LLM_DEADLINE", 20))
+LLM_ATTEMPT_TIMEOUT = float(os.getenv("LLM_ATTEMPT_TIMEOUT", 15))
+# Start the next model if the current one has not answered after this long (seconds)
+LLM_HEDGE_DELAY = float(os.getenv("LLM_HEDGE_DELAY", 2.5))
+LLM_MAX_PARALLEL = int(os.getenv("LLM_MAX_PARALLEL", 2))
+# Consecutive failures that open a model's breaker, and how long it stays open (seconds)
+LLM_BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", 3))
+LLM_BREAKER_COOLDOWN = float(os.getenv("LLM_BREAKER_COOLDOWN", 60))
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", 20))
+LLM_HTTP2 = os.getenv("LLM_HTTP2", "1") != "0" and importlib.util.find_spec("h2") is not None
+
+# Marks the end of one attempt in stream()'s chunk queue
+_STREAM_END = None
+
+
+class LLMReply:
+    def __init__(self, model, content, value, latency_ms):
+        self.model = model
+        self.content = content
+        # parse(content) if a parser was given, else the content
+        self.value = value
+        self.latency_ms = latency_ms
+
+
+class CircuitBreaker:
+    """closed -> open after `failures` consecutive failures -> half-open (one trial) after `cooldown`."""
+
+    def __init__(self, failures=LLM_BREAKER_FAILURES, cooldown=LLM_BREAKER_COOLDOWN):
+        self.failures = failures
+        self.cooldown = cooldown
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.trial_running = False
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.cooldown:
+            return "half_open"
+        return "open"
+
+    def allow(self):
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self.trial_running:
+            self.trial_running = True
+            return True
+        return False
+
+    def record_success(self):
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.trial_running = False
+
+    def record_failure(self):
+        self.consecutive_failures += 1
+        if self.trial_running or self.consecutive_failures >= self.failures:
+            self.opened_at = time.monotonic()
+        self.trial_running = False
+
+    def release(self):
+        """An attempt ended without a verdict (cancelled): let the next call try again."""
+        self.trial_running = False
+
+
+# Breakers and metrics are per model and shared by every client/event loop in the process
+_lock = threading.Lock()
+_breakers = {}
+_stats = {}
+
+
+def _breaker(model):
+    if model not in _breakers:
+        _breakers[model] = CircuitBreaker()
+    return _breakers[model]
+
+
+def _record(model, outcome, latency_ms=None):
+    """outcome: success | failure | timeout | invalid | cancelled | skipped | hedge"""
+    with _lock:
+        stats = _stats.setdefault(model, {
+            "attempts": 0, "success": 0, "failure": 0, "timeout": 0, "invalid": 0,
+            "cancelled": 0, "skipped": 0, "hedge": 0, "latency_ms_total": 0.0, "latency_ms_max": 0.0,
+        })
+        stats[outcome] += 1
+        if outcome not in ("skipped", "hedge"):
+            stats["attempts"] += 1
+        if outcome == "success":
+            stats["latency_ms_total"] += latency_ms
+            stats["latency_ms_max"] = max(stats["latency_ms_max"], latency_ms)
+        breaker = _breaker(model)
+        if outcome == "success":
+            breaker.record_success()
+        elif outcome in ("failure", "timeout", "invalid"):
+            breaker.record_failure()
+        elif outcome == "cancelled":
+            breaker.release()
+
+
+def _allow(model):
+    with _lock:
+        return _breaker(model).allow()
+
+
+def llm_stats():
+    """Per-model call metrics and breaker state."""
+    with _lock:
+        out = {}
+        for model, stats in _stats.items():
+            stats = dict(stats)
+            total = stats.pop("latency_ms_total")
+            stats["latency_ms_avg"] = round(total / stats["success"], 1) if stats["success"] else None
+            stats["latency_ms_max"] = round(stats["latency_ms_max"], 1)
+            stats["breaker"] = _breaker(model).state
+            out[model] = stats
+        return out
+
+
+def reset_llm_stats():
+    with _lock:
+        _breakers.clear()
+        _stats.clear()
+
+
+class LLMClient:
+    def __init__(self, url=OPENROUTER_URL, http2=LLM_HTTP2):
+        self.url = url
+        self.http = httpx.AsyncClient(
+            http2=http2,
+            limits=httpx.Limits(max_connections=LLM_MAX_CONNECTIONS, max_keepalive_connections=LLM_MAX_CONNECTIONS),
+            timeout=httpx.Timeout(LLM_ATTEMPT_TIMEOUT, connect=5.0),
+        )
+
+    async def aclose(self):
+        await self.http.aclose()
+
+    async def complete(self, models, messages, api_key, parse=None, deadline=LLM_DEADLINE,
+                       hedge_delay=LLM_HEDGE_DELAY, max_parallel=LLM_MAX_PARALLEL, **params):
+        """
+        First valid answer from `models` (in preference order).
+        `parse(content)` may turn the reply into a value; returning None marks it invalid.
+        Extra keyword arguments (temperature, max_tokens, ...) go into the request body.
+        Returns: LLMReply, or None if no model answered before the deadline
+        """
+        loop = asyncio.get_running_loop()
+        deadline_at = loop.time() + deadline
+        queue = list(models)
+        running = {}
+
+        def launch(hedge=False):
+            while queue:
+                model = queue.pop(0)
+                if not _allow(model):
+                    _record(model, "skipped")
+                    continue
+                if hedge:
+                    _record(model, "hedge")
+                task = asyncio.create_task(self._attempt(model, messages, api_key, parse, params))
+                running[task] = model
+                return True
+            return False
+
+        launch()
+        try:
+            while running:
+                remaining = deadline_at - loop.time()
+                if remaining <= 0:
+                    break
+                can_hedge = queue and len(running) < max_parallel
+                done, _ = await asyncio.wait(
+                    running, timeout=min(remaining, hedge_delay) if can_hedge else remaining,
+                    return_when=asyncio.FIRST_COMPLETED)
+
+                if not done:
+                    if can_hedge and remaining > hedge_delay:
+                        logger.info(f"⏳ {', '.join(running.values())} slow, hedging with the next model")
+                        launch(hedge=True)
+                    continue
+
+                for task in done:
+                    running.pop(task)
+                    reply = task.result()
+                    if reply is not None:
+                        return reply
+                    # Replace a failed attempt straight away
+                    if len(running) < max_parallel:
+                        launch()
+        finally:
+            for task in running:
+                task.cancel()
+            if running:
+                await asyncio.gather(*running, return_exceptions=True)
+
+        logger.warning(f"⚠️ No LLM answer from {len(models)} models within {deadline:.0f}s")
+        return None
+
+    async def _attempt(self, model, messages, api_key, parse, params):
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        try:
+            response = await self.http.post(
+                self.url,
+                headers={
+                    "Authorization": f"Bearer {api_key}",
+                    "HTTP-Referer": "http://localhost:3000",
+                },
+                json={"model": model, "messages": messages, **params},
+            )
+            latency_ms = (loop.time() - start) * 1000
+            if response.status_code != 200:
+                logger.warning(f"⚠️ Model {model} failed ({response.status_code})")
+                _record(model, "failure")
+                return None
+
+            data = response.json()
+            content = data["choices"][0]["message"]["content"] if data.get("choices") else None
+            value = content if parse is None or content is None else parse(content)
+            if value is None:
+                logger.warning(f"⚠️ Model {model} returned an unusable answer")
+                _record(model, "invalid")
+                return None
+
+            _record(model, "success", latency_ms)
+            logger.info(f"✅ {model} answered in {latency_ms:.0f} ms", model=model, latency_ms=round(latency_ms))
+            return LLMReply(model, content, value, round(latency_ms, 1))
+        except asyncio.CancelledError:
+            _record(model, "cancelled")
+            raise
+        except httpx.TimeoutException:
+            logger.warning(f"⚠️ Model {model} timed out")
+            _record(model, "timeout")
+        except Exception as e:
+            logger.warning(f"⚠️ Error with {model}: {e}")
+            _record(model, "failure")
+        return None
+
+    async def stream(self, models, messages, api_key, deadline=LLM_DEADLINE,
+                     hedge_delay=LLM_HEDGE_DELAY, max_parallel=LLM_MAX_PARALLEL, **params):
+        """
+        Async generator of (model, text) chunks from the first model to start answering.
+        Breakers and hedging work as in complete(), on time to first token; the
+        deadline only bounds the wait for that first token. Yields nothing if no
+        model starts answering in time. A model failing mid-answer ends the stream.
+        """
+        loop = asyncio.get_running_loop()
+        deadline_at = loop.time() + deadline
+        queue = list(models)
+        running = {}
+        chunks = asyncio.Queue()
+
+        def launch(hedge=False):
+            while queue:
+                model = queue.pop(0)
+                if not _allow(model):
+                    _record(model, "skipped")
+                    continue
+                if hedge:
+                    _record(model, "hedge")
+                running[model] = asyncio.create_task(self._stream_attempt(model, messages, api_key, params, chunks))
+                return True
+            return False
+
+        launch()
+        try:
+            # 1. Wait for the first token from any attempt, hedging slow ones
+            winner = None
+            while winner is None and running:
+                remaining = deadline_at - loop.time()
+                if remaining <= 0:
+                    break
+                can_hedge = queue and len(running) < max_parallel
+                try:
+                    model, text = await asyncio.wait_for(
+                        chunks.get(), min(remaining, hedge_delay) if can_hedge else remaining)
+                except asyncio.TimeoutError:
+                    if can_hedge and remaining > hedge_delay:
+                        logger.info(f"⏳ {', '.join(running)} slow, hedging with the next model")
+                        launch(hedge=True)
+                    continue
+
+                if text is _STREAM_END:
+                    # Ended without a token: replace it straight away
+                    if running.pop(model, None) is not None and len(running) < max_parallel:
+                        launch()
+                    continue
+                winner = model
+                for other, task in list(running.items()):
+                    if other != winner:
+                        task.cancel()
+                        running.pop(other)
+                yield model, text
+
+            if winner is None:
+                logger.warning(f"⚠️ No LLM started answering from {len(models)} models within {deadline:.0f}s")
+                return
+
+            # 2. Forward the winner's tokens (losers' end markers are ignored)
+            while True:
+                model, text = await chunks.get()
+                if model != winner:
+                    continue
+                if text is _STREAM_END:
+                    break
+                yield model, text
+        finally:
+            for task in running.values():
+                task.cancel()
+            if running:
+                await asyncio.gather(*running.values(), return_exceptions=True)
+
+    async def _stream_attempt(self, model, messages, api_key, params, chunks):
+        """Push (model, text) for each token of a streamed completion, then (model, _STREAM_END)."""
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        first_token_ms = None
+        try:
+            async with self.http.stream(
+                "POST", self.url,
+                headers={
+                    "Authorization": f"Bearer {api_key}",
+                    "HTTP-Referer": "http://localhost:3000",
+                },
+                json={"model": model, "messages": messages, "stream": True, **params},
+            ) as response:
+                if response.status_code != 200:
+                    logger.warning(f"⚠️ Model {model} failed ({response.status_code})")
+                    _record(model, "failure")
+                    return
+
+                # Server-sent events; lines starting with ':' are keep-alive comments
+                async for line in response.aiter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    data = line[5:].strip()
+                    if data == "[DONE]":
+                        break
+                    choices = json.loads(data).get("choices") or [{}]
+                    text = (choices[0].get("delta") or {}).get("content")
+                    if text:
+                        if first_token_ms is None:
+                            first_token_ms = (loop.time() - start) * 1000
+                        chunks.put_nowait((model, text))
+
+            if first_token_ms is None:
+                logger.warning(f"⚠️ Model {model} streamed an empty answer")
+                _record(model, "invalid")
+            else:
+                # Latency of a streamed answer is its time to first token
+                _record(model, "success", first_token_ms)
+                logger.info(f"✅ {model} streamed, first token after {first_token_ms:.0f} ms",
+                            model=model, first_token_ms=round(first_token_ms))
+        except asyncio.CancelledError:
+            _record(model, "cancelled")
+            raise
+        except httpx.TimeoutException:
+            logger.warning(f"⚠️ Model {model} timed out")
+            _record(model, "timeout")
+        except Exception as e:
+            logger.warning(f"⚠️ Error with {model}: {e}")
+            _record(model, "failure")
+        finally:
+            chunks.put_nowait((model, _STREAM_END))
+
+
+# One client per event loop (an httpx.AsyncClient is bound to the loop it first ran on)
+_clients = weakref.WeakKeyDictionary()
+
+
+def get_llm_client():
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None:
+        client = _clients[loop] = LLMClient()
+    return client
+
+
+async def close_llm_client():
+    client = _clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
@@ -0,0 +1,111 @@
+"""
+Streaming Upload Ingestion
+Reads image uploads chunk by chunk (multipart files or base64 strings) and
+rejects them as soon as they break a limit: byte size while reading, pixel
+dimensions from the JPEG/PNG header before anything is decoded.
+"""
+
+import base64
+import binascii
+import os
+
+from app.utils.image_utils import sniff_image_size
+
+UPLOAD_MAX_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", 15 * 1024 * 1024))
+UPLOAD_MAX_PIXELS = int(os.getenv("UPLOAD_MAX_PIXELS", 40_000_000))
+UPLOAD_MAX_SIDE = int(os.getenv("UPLOAD_MAX_SIDE", 12000))
+# Whole-request cap checked from Content-Length (base64 JSON is 4/3 of the image, plus form fields)
+UPLOAD_MAX_REQUEST_BYTES = UPLOAD_MAX_BYTES * 4 // 3 + 64 * 1024
+
+CHUNK_SIZE = 64 * 1024
+# Give up looking for a size once this much header has been read (huge EXIF blocks)
+_MAX_HEADER_BYTES = 256 * 1024
+
+
+class UploadRejected(Exception):
+    def __init__(self, status_code, message):
+        super().__init__(message)
+        self.status_code = status_code
+        self.message = message
+
+
+def _too_large(size):
+    return UploadRejected(413, f"Image is too large (max {UPLOAD_MAX_BYTES // (1024 * 1024)} MB, got {size / (1024 * 1024):.1f} MB)")
+
+
+def check_header(data, final=False):
+    """
+    Validate the image dimensions as soon as the header is available.
+    Returns the sniffed (format, width, height), or None while more bytes are needed.
+    Formats without a sniffable size (WebP, ...) pass and are only byte-capped.
+    """
+    sniffed = sniff_image_size(data)
+    if sniffed is None:
+        if not final and len(data) < _MAX_HEADER_BYTES:
+            return None
+        sniffed = ("unknown", None, None)
+
+    _, width, height = sniffed
+    if width is not None:
+        if width == 0 or height == 0:
+            raise UploadRejected(400, "Invalid image header")
+        if max(width, height) > UPLOAD_MAX_SIDE or width * height > UPLOAD_MAX_PIXELS:
+            raise UploadRejected(
+                413, f"Image dimensions {width}x{height} exceed the limit "
+                     f"({UPLOAD_MAX_PIXELS / 1e6:.0f} MP, {UPLOAD_MAX_SIDE}px per side)")
+    return sniffed
+
+
+async def read_upload(upload, max_bytes=UPLOAD_MAX_BYTES):
+    """Read a FastAPI UploadFile in chunks, rejecting it as soon as it breaks a limit. Returns the bytes."""
+    if getattr(upload, "size", None) is not None and upload.size > max_bytes:
+        raise _too_large(upload.size)
+
+    data = bytearray()
+    sniffed = None
+    while True:
+        chunk = await upload.read(CHUNK_SIZE)
+        if not chunk:
+            break
+        if len(data) + len(chunk) > max_bytes:
+            raise _too_large(len(data) + len(chunk))
+        data += chunk
+        if sniffed is None:
+            sniffed = check_header(data)
+
+    if not data:
+        raise UploadRejected(400, "Empty image upload")
+    if sniffed is None:
+        check_header(data, final=True)
+    return bytes(data)
+
+
+async def read_request_body(request, max_bytes=UPLOAD_MAX_REQUEST_BYTES):
+    """Read a raw request body chunk by chunk, rejecting it once it exceeds max_bytes (also without Content-Length)."""
+    data = bytearray()
+    async for chunk in request.stream():
+        if len(data) + len(chunk) > max_bytes:
+            raise UploadRejected(413, "Request body too large")
+        data += chunk
+    return bytes(data)
+
+
+def decode_base64_image(image_b64, max_bytes=UPLOAD_MAX_BYTES):
+    """Base64 string or data URL -> image bytes, checking size and header before the full decode."""
+    if not image_b64:
+        raise UploadRejected(400, "Missing image")
+    encoded = image_b64.split(",", 1)[1] if "," in image_b64 else image_b64
+    # MIME-style base64 wraps lines; drop the whitespace so the header slice stays 4-char aligned
+    encoded = "".join(encoded.split())
+
+    approx_size = len(encoded) * 3 // 4
+    if approx_size > max_bytes:
+        raise _too_large(approx_size)
+
+    try:
+        # Header first (a multiple of 4 base64 chars), then the rest
+        head = base64.b64decode(encoded[:_MAX_HEADER_BYTES // 3 * 4])
+        check_header(head, final=len(encoded) <= _MAX_HEADER_BYTES // 3 * 4)
+        return base64.b64decode(encoded)
+    except (binascii.Error, ValueError):
+        raise UploadRejected(400, "Invalid base64 image data")
@@ -11,6 +11,8 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 try:
     import mediapipe as mp
     from app.ml.analysis_cv import calculate_face_shape
+    from app.pipeline.face_context import FaceContext
+    from app.pipeline.landmarks import landmarks_to_points
 except ImportError as e:
     print(f"❌ Initialization Error: {e}")
     print("Ensure you are running this script from the Backend folder with the virtual environment active.")
@@ -23,25 +25,11 @@ OUTPUT_DIR = "datasets/face_shape_cropped"
 LIMIT_IMAGES = 2000 # Let's start with 2000 for a quick balance
 
 def crop_face(img, landmarks, width, height, target_size=224):
-    """Crops face with padding from landmarks"""
-    xs = [lm.x for lm in landmarks]
-    ys = [lm.y for lm in landmarks]
+    """Crops face with padding from landmarks (pixel-space array or MediaPipe list)"""
+    points = landmarks_to_points(landmarks, width, height)
     
-    x1 = int(min(xs) * width)
-    y1 = int(min(ys) * height)
-    x2 = int(max(xs) * width)
-    y2 = int(max(ys) * height)
-    
-    # Add padding for context
-    pad_x = int((x2 - x1) * 0.2)
-    pad_y = int((y2 - y1) * 0.2)
-    
-    x1 = max(0, x1 - pad_x)
-    y1 = max(0, y1 - pad_y)
-    x2 = min(width, x2 + pad_x)
-    y2 = min(height, y2 + pad_y)
-    
-    face_crop = img[y1:y2, x1:x2]
+    # Add 20% padding for context
+    face_crop = FaceContext(img, points).padded_crop(0.2)
     if face_crop.size == 0:
         return None
     
@@ -93,14 +81,14 @@ def run_auto_label():
         results = face_mesh.process(rgb_img)
         
         if results.multi_face_landmarks:
-            landmarks = results.multi_face_landmarks[0].landmark
+            points = landmarks_to_points(results.multi_face_landmarks[0].landmark, w, h)
             
             # Predict shape using project's geometric engine
             # It will also print debug info to console
-            shape, conf = calculate_face_shape(landmarks, w, h)
+            shape, conf, _ = calculate_face_shape(points, w, h)
             
             # Crop the face
-            face_img = crop_face(img, landmarks, w, h)
+            face_img = crop_face(img, points, w, h)
             
             if face_img is not None:
                 # Save to specific folder
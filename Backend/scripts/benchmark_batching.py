@@ -0,0 +1,91 @@
+"""
+Micro-Batching Benchmark
+Measures face-shape CNN throughput vs. p50/p99 latency at several concurrency
+levels, with and without the MicroBatcher.
+
+Usage (from the Backend folder):
+    python scripts/benchmark_batching.py
+    python scripts/benchmark_batching.py --requests 128 --concurrency 1 4 16 --max-batch 16 --max-delay-ms 5
+
+If the trained .pth is missing, a randomly initialised EfficientNetV2-S is used
+(timings do not depend on the weights).
+"""
+
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+# Add the project root to sys.path so we can import 'app'
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.ml.batching import MicroBatcher
+from app.ml.face_shape_predictor import FaceShapePredictor
+
+
+def load_predictor():
+    predictor = FaceShapePredictor()
+    if predictor.model is None:
+        import torch.nn as nn
+        from torchvision import models
+        print("ℹ️ Using random EfficientNetV2-S weights for timing")
+        model = models.efficientnet_v2_s(weights=None)
+        model.classifier[1] = nn.Linear(model.classifier[1].in_features, len(predictor.classes))
+        predictor.model = model.to(predictor.device).eval()
+        predictor.backend = "eager"
+    return predictor
+
+
+def run_level(call, crops, concurrency):
+    """Fire len(crops) calls with `concurrency` callers; return (req/s, p50 ms, p99 ms)."""
+    latencies = []
+
+    def one(crop):
+        start = time.perf_counter()
+        call(crop)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, crops))
+    elapsed = time.perf_counter() - start
+
+    return len(crops) / elapsed, np.percentile(latencies, 50), np.percentile(latencies, 99)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=64)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    parser.add_argument("--max-batch", type=int, default=8)
+    parser.add_argument("--max-delay-ms", type=float, default=5.0)
+    args = parser.parse_args()
+
+    predictor = load_predictor()
+    rng = np.random.default_rng(0)
+    crops = [rng.integers(0, 255, (260, 220, 3), dtype=np.uint8) for _ in range(args.requests)]
+
+    # Warm-up
+    predictor.predict_batch(crops[:2])
+
+    unbatched = lambda crop: predictor.predict_batch([crop])[0]
+    batcher = MicroBatcher(predictor.predict_batch, max_batch_size=args.max_batch,
+                           max_delay_ms=args.max_delay_ms, name="bench-batcher")
+
+    print(f"\n📊 {args.requests} requests/level | max batch {args.max_batch} | max delay {args.max_delay_ms} ms")
+    print(f"{'conc':>5} | {'mode':>9} | {'req/s':>8} | {'p50 ms':>8} | {'p99 ms':>8} | {'avg batch':>9}")
+    print("-" * 62)
+    for concurrency in args.concurrency:
+        rps, p50, p99 = run_level(unbatched, crops, concurrency)
+        print(f"{concurrency:>5} | {'unbatched':>9} | {rps:>8.1f} | {p50:>8.1f} | {p99:>8.1f} | {1.0:>9.1f}")
+
+        batcher.batches = batcher.items = 0
+        rps, p50, p99 = run_level(batcher, crops, concurrency)
+        print(f"{concurrency:>5} | {'batched':>9} | {rps:>8.1f} | {p50:>8.1f} | {p99:>8.1f} | {batcher.mean_batch_size:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""
+Local Chatbot Benchmark
+Messages per second of the rule-based consultant (get_bot_response) over
+the golden-test prompts and user contexts, plus long messages where the
+keyword scan dominates.
+
+Usage (from the Backend folder):
+    python scripts/benchmark_chatbot.py
+    python scripts/benchmark_chatbot.py --seconds 5
+"""
+
+import argparse
+import os
+import sys
+import time
+
+# Add the project root to sys.path so we can import 'app'
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.ml.chatbot import get_bot_response
+from test_chatbot_intents import PROMPTS, CONTEXTS
+
+
+def rate(messages, seconds):
+    """Messages/sec of get_bot_response over `messages` [(text, context)], for about `seconds`."""
+    done = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        for text, context in messages:
+            get_bot_response(text, context)
+        done += len(messages)
+    return done / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=2.0, help="Time per workload")
+    args = parser.parse_args()
+
+    short = [(p, c) for p in PROMPTS for c in CONTEXTS]
+    # Paragraph-long messages: most end in the late intents or match nothing
+    filler = "quick question about my skin and what you would do, could you tell me more about that please "
+    long = [(filler * 4 + p, c) for p, c in short]
+
+    print(f"\n📊 get_bot_response, {len(short)} prompt/context pairs")
+    for name, messages in (("short messages", short), ("long messages", long)):
+        print(f"   {name:>15}: {rate(messages, args.seconds):>10,.0f} msg/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Dominant Color Benchmark
+Time per call of the dominant-colour engine (app/ml/dominant_color.py)
+against the former sklearn KMeans(n_clusters=3, n_init=10) fit, on pixel
+regions of growing size, and how far apart their colours are.
+
+Usage (from the Backend folder):
+    python scripts/benchmark_dominant_color.py
+    python scripts/benchmark_dominant_color.py --image photo.jpg --sklearn-max 2000000
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+from sklearn.cluster import KMeans
+
+# Add the project root to sys.path so we can import 'app'
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.ml.dominant_color import dominant_color, DOMINANT_COLOR_PIXEL_BUDGET
+
+
+def synthetic_region(rng, n):
+    """Skin-like pixels: a main tone, a shadow tone and some hair/background."""
+    parts = [
+        rng.normal([95, 130, 190], 12, (int(n * 0.6), 3)),
+        rng.normal([60, 85, 135], 10, (int(n * 0.3), 3)),
+        rng.normal([30, 25, 30], 8, (n - int(n * 0.6) - int(n * 0.3), 3)),
+    ]
+    pixels = np.concatenate(parts)
+    return np.clip(pixels[rng.permutation(n)], 0, 255).astype(np.uint8)
+
+
+def sklearn_dominant(pixels):
+    kmeans = KMeans(n_clusters=3, random_state=42, n_init=10).fit(pixels.astype(np.float32))
+    return kmeans.cluster_centers_[np.argmax(np.bincount(kmeans.labels_))]
+
+
+def timed(fn, pixels, repeat):
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(pixels)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--image", help="Take the regions from this photo instead of synthetic pixels")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 30000, 300000, 3000000])
+    parser.add_argument("--sklearn-max", type=int, default=300000, help="Skip KMeans above this many pixels")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    image = cv2.imread(args.image) if args.image else None
+
+    print(f"\n📊 dominant colour of k=3 clusters, pixel budget {DOMINANT_COLOR_PIXEL_BUDGET}")
+    print(f"   {'pixels':>9} {'KMeans ms':>10} {'engine ms':>10} {'max |diff|':>11} {'repeatable':>11}")
+    for size in args.sizes:
+        if image is not None:
+            pixels = image.reshape(-1, 3)
+            pixels = pixels[np.linspace(0, len(pixels) - 1, size).astype(np.int64)] if size < len(pixels) \
+                else np.tile(pixels, (size // len(pixels) + 1, 1))[:size]
+        else:
+            pixels = synthetic_region(rng, size)
+
+        engine_ms, color = timed(dominant_color, pixels, 5)
+        repeatable = all(np.array_equal(color, dominant_color(pixels)) for _ in range(3))
+        if size <= args.sklearn_max:
+            kmeans_ms, reference = timed(sklearn_dominant, pixels, 1)
+            diff = f"{np.abs(color - reference).max():.1f}"
+            kmeans_ms = f"{kmeans_ms:.1f}"
+        else:
+            kmeans_ms, diff = "-", "-"
+        print(f"   {size:>9,} {kmeans_ms:>10} {engine_ms:>10.1f} {diff:>11} {str(repeatable):>11}")
+
+
+if __name__ == "__main__":
+    main()
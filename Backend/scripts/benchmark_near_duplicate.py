@@ -0,0 +1,137 @@
+"""
+Near-Duplicate Detection Benchmark
+Builds a synthetic set of re-encoded / resized / re-lit / shifted / noisy
+variants of base photos and measures, for several Hamming thresholds:
+    hit rate          - variants matched to their own base
+    false-match rate  - variants matched to a different base (per pair, and
+                        per lookup over NEAR_DUP_LOOKBACK recent scans)
+Use it to pick NEAR_DUP_PHASH_THRESHOLD / NEAR_DUP_DHASH_THRESHOLD.
+
+Usage (from the Backend folder):
+    python scripts/benchmark_near_duplicate.py
+    python scripts/benchmark_near_duplicate.py --data datasets/face_shape_cropped --bases 100
+
+Without --data, synthetic portrait-like images are generated.
+"""
+
+import argparse
+import glob
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+# Add the project root to sys.path so we can import 'app'
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.utils.image_hash import phash, dhash, hamming
+from app.pipeline.near_duplicate import NEAR_DUP_PHASH_THRESHOLD, NEAR_DUP_DHASH_THRESHOLD, NEAR_DUP_LOOKBACK
+
+
+def synthetic_portrait(rng, size=(480, 640)):
+    """Gradient background + skin-toned face ellipse with eyes/mouth + texture."""
+    h, w = size
+    top, bottom = rng.integers(0, 255, 3), rng.integers(0, 255, 3)
+    # Diagonal gradient (perfectly flat rows would make dHash bits ties)
+    ramp = (np.linspace(0, 0.7, h)[:, None] + np.linspace(0, 0.3, w)[None, :])[:, :, None]
+    img = (top * (1 - ramp) + bottom * ramp).astype(np.uint8)
+
+    cx, cy = int(w * rng.uniform(0.35, 0.65)), int(h * rng.uniform(0.4, 0.6))
+    ax, ay = int(w * rng.uniform(0.15, 0.25)), int(h * rng.uniform(0.22, 0.32))
+    skin = tuple(int(c) for c in rng.integers([60, 90, 130], [160, 190, 240]))
+    cv2.ellipse(img, (cx, cy), (ax, ay), 0, 0, 360, skin, -1)
+    for dx in (-0.4, 0.4):
+        cv2.circle(img, (int(cx + dx * ax), int(cy - 0.2 * ay)), max(3, ax // 8), (40, 40, 40), -1)
+    cv2.ellipse(img, (cx, int(cy + 0.45 * ay)), (ax // 3, ay // 10), 0, 0, 180, (60, 60, 150), -1)
+
+    texture = cv2.GaussianBlur(rng.normal(0, 25, (h, w)).astype(np.float32), (0, 0), 4)[:, :, None]
+    return np.clip(img + texture, 0, 255).astype(np.uint8)
+
+
+def variants(img, rng):
+    """Near-duplicates a user could upload for the same scan."""
+    h, w = img.shape[:2]
+    out = {}
+
+    quality = int(rng.integers(40, 90))
+    out["jpeg"] = cv2.imdecode(cv2.imencode(".jpg", img, [cv2.IMWRITE_JPEG_QUALITY, quality])[1], cv2.IMREAD_COLOR)
+
+    scale = rng.uniform(0.4, 0.9)
+    out["resize"] = cv2.resize(img, (int(w * scale), int(h * scale)), interpolation=cv2.INTER_AREA)
+
+    out["brightness"] = cv2.convertScaleAbs(img, alpha=rng.uniform(0.9, 1.1), beta=rng.uniform(-12, 12))
+
+    dx, dy = int(w * rng.uniform(0.01, 0.03)), int(h * rng.uniform(0.01, 0.03))
+    out["shift"] = img[dy:, dx:]
+
+    noise = rng.normal(0, 4, img.shape)
+    out["webcam_frame"] = np.clip(img + noise, 0, 255).astype(np.uint8)
+    return out
+
+
+def load_bases(data_dir, count, rng):
+    if data_dir:
+        paths = sorted(glob.glob(os.path.join(data_dir, "**", "*.jpg"), recursive=True))
+        rng.shuffle(paths)
+        images = [img for img in (cv2.imread(p) for p in paths[:count]) if img is not None]
+        if images:
+            return images
+        print(f"⚠️ No images in {data_dir}, using synthetic portraits.")
+    return [synthetic_portrait(rng) for _ in range(count)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data", default=None, help="Folder of real photos to use as bases")
+    parser.add_argument("--bases", type=int, default=60)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    bases = load_bases(args.data, args.bases, rng)
+
+    start = time.perf_counter()
+    base_hashes = [(phash(img), dhash(img)) for img in bases]
+    hash_ms = (time.perf_counter() - start) * 1000 / len(bases)
+
+    # (variant kind, base index, phash distances to all bases, dhash distances to all bases)
+    samples = []
+    for i, img in enumerate(bases):
+        for kind, variant in variants(img, rng).items():
+            p, d = phash(variant), dhash(variant)
+            samples.append((kind, i,
+                            np.array([hamming(p, bp) for bp, _ in base_hashes]),
+                            np.array([hamming(d, bd) for _, bd in base_hashes])))
+
+    print(f"\n📊 {len(bases)} bases | {len(samples)} variants | {hash_ms:.2f} ms to hash one image")
+    # False matches: per pair of different photos, and per lookup against
+    # NEAR_DUP_LOOKBACK other recent scans (what /analyze actually searches)
+    lookback = min(NEAR_DUP_LOOKBACK, len(bases) - 1)
+    pools = [rng.choice(np.delete(np.arange(len(bases)), i), lookback, replace=False) for _, i, _, _ in samples]
+
+    print(f"{'pHash<=':>7} | {'dHash<=':>7} | {'hit rate':>8} | {'false/pair':>10} | {f'false/lookup({lookback})':>18}")
+    print("-" * 64)
+    grid = sorted({(2, 4), (4, 6), (6, 8), (8, 10), (10, 12),
+                   (NEAR_DUP_PHASH_THRESHOLD, NEAR_DUP_DHASH_THRESHOLD)})
+    for p_max, d_max in grid:
+        hits = pair_false = lookup_false = 0
+        for (_, i, p_dist, d_dist), pool in zip(samples, pools):
+            match = (p_dist <= p_max) & (d_dist <= d_max)
+            hits += bool(match[i])
+            pair_false += np.delete(match, i).mean()
+            lookup_false += bool(match[pool].any())
+        marker = "  <- current" if (p_max, d_max) == (NEAR_DUP_PHASH_THRESHOLD, NEAR_DUP_DHASH_THRESHOLD) else ""
+        print(f"{p_max:>7} | {d_max:>7} | {hits / len(samples) * 100:>7.1f}% | "
+              f"{pair_false / len(samples) * 100:>9.3f}% | {lookup_false / len(samples) * 100:>17.2f}%{marker}")
+
+    print("\nHit rate per variant at current thresholds:")
+    for kind in variants(bases[0], np.random.default_rng(0)):
+        rows = [(i, p, d) for k, i, p, d in samples if k == kind]
+        rate = np.mean([p[i] <= NEAR_DUP_PHASH_THRESHOLD and d[i] <= NEAR_DUP_DHASH_THRESHOLD for i, p, d in rows])
+        print(f"   {kind:>12}: {rate * 100:.1f}%")
+
+
+if __name__ == "__main__":
+    main()
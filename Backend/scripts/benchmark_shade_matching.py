@@ -0,0 +1,88 @@
+"""
+Foundation Shade Matching Benchmark
+Lookups/sec of the nearest-shade search on synthetic catalogs of several
+sizes, for:
+    scalar   - ciede2000() per shade (the former loop in consultant.py)
+    batch    - ciede2000_batch() over the whole LAB matrix
+    index    - ShadeIndex (exhaustive batch on small catalogs, KD-tree
+               candidates + CIEDE2000 re-rank on large ones)
+plus how often the index returns the same best shade as the exhaustive scan.
+Use it to pick SHADE_INDEX_BRUTE_FORCE / SHADE_INDEX_CANDIDATES.
+
+Usage (from the Backend folder):
+    python scripts/benchmark_shade_matching.py
+    python scripts/benchmark_shade_matching.py --sizes 20 2000 200000 --queries 500
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+# Add the project root to sys.path so we can import 'app'
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.ml.color_matching import ciede2000, ciede2000_batch
+from app.ml.shade_index import ShadeIndex, SHADE_INDEX_BRUTE_FORCE, SHADE_INDEX_CANDIDATES
+
+
+def skin_labs(rng, n):
+    """LAB colours spread over the range of real foundation shades."""
+    return np.column_stack([rng.uniform(25, 95, n), rng.uniform(0, 28, n), rng.uniform(6, 36, n)])
+
+
+def rate(fn, queries, seconds):
+    """Lookups/sec of fn(lab) cycling through `queries`, for about `seconds`."""
+    done = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        fn(queries[done % len(queries)])
+        done += 1
+    return done / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[20, 2000, 200000])
+    parser.add_argument("--queries", type=int, default=300, help="Skin colours looked up per catalog")
+    parser.add_argument("--seconds", type=float, default=1.0, help="Time per method and size")
+    parser.add_argument("--candidates", type=int, default=SHADE_INDEX_CANDIDATES)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    queries = skin_labs(rng, args.queries)
+
+    # The vectorized formula must agree with the scalar one
+    catalog = skin_labs(rng, 1000)
+    scalar = np.array([ciede2000(queries[0], lab) for lab in catalog])
+    error = np.abs(ciede2000_batch(queries[0], catalog) - scalar).max()
+    print(f"\n🔬 ciede2000_batch vs ciede2000: max abs difference {error:.2e}")
+
+    print(f"📊 lookups/sec (brute force up to {SHADE_INDEX_BRUTE_FORCE} shades, {args.candidates} KD-tree candidates)")
+    print(f"   {'shades':>8} {'scalar':>10} {'batch':>10} {'index':>10} {'same best':>10}")
+    for size in args.sizes:
+        catalog = skin_labs(rng, size)
+        shades = [{"name": f"shade {i}", "lab": lab} for i, lab in enumerate(catalog)]
+        index = ShadeIndex(shades, candidates=args.candidates)
+
+        def by_scalar(lab):
+            return min(range(size), key=lambda i: ciede2000(lab, catalog[i]))
+
+        def by_batch(lab):
+            return int(np.argmin(ciede2000_batch(lab, catalog)))
+
+        def by_index(lab):
+            return index.nearest(lab, n=1)[0][0]["name"]
+
+        # The scalar loop takes seconds per lookup on big catalogs: time a few only
+        scalar_rate = rate(by_scalar, queries[:3], args.seconds) if size <= 20000 else float("nan")
+        batch_rate = rate(by_batch, queries, args.seconds)
+        index_rate = rate(by_index, queries, args.seconds)
+        same = np.mean([by_index(lab) == f"shade {by_batch(lab)}" for lab in queries])
+        print(f"   {size:>8} {scalar_rate:>10,.0f} {batch_rate:>10,.0f} {index_rate:>10,.0f} {same:>10.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Face Shape Cascade Calibration
+Fits the margin threshold of the geometric fast path in calculate_face_shape.
+For every labelled image the geometric classifier's top-2 centroid margin is
+measured; the smallest threshold whose decisive calls reach the target
+precision (with enough support) is written to app/models/face_shape_cascade.json.
+Faces above the threshold skip the CNN; the rest still go through it.
+
+Usage (from the Backend folder):
+    python scripts/calibrate_face_shape_cascade.py
+    python scripts/calibrate_face_shape_cascade.py --data datasets/face_shape_cropped --target-precision 0.9
+
+Override at runtime with FACE_SHAPE_MARGIN_THRESHOLD (unset + no JSON = CNN always runs).
+"""
+
+import argparse
+import glob
+import json
+import os
+import sys
+
+import cv2
+import numpy as np
+
+# Add the project root to sys.path so we can import 'app'
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.pipeline.face_detection import detect_faces
+from app.pipeline.face_context import FaceContext
+from app.ml.analysis_cv import face_shape_features, classify_face_shape_geometric, FACE_SHAPE_CASCADE_PATH
+
+DATA_DIR = "datasets/face_shape_augmented"
+if not os.path.exists(DATA_DIR):
+    DATA_DIR = "datasets/face_shape_cropped"
+
+
+def collect_margins(data_dir, per_class):
+    """(margin, geometric call is correct) for every image with a detectable face."""
+    margins, correct = [], []
+    for class_dir in sorted(glob.glob(os.path.join(data_dir, "*"))):
+        label = os.path.basename(class_dir)
+        for path in sorted(glob.glob(os.path.join(class_dir, "*")))[:per_class]:
+            img = cv2.imread(path)
+            if img is None:
+                continue
+            faces = detect_faces(img)
+            if not faces:
+                continue
+            shape, _, margin = classify_face_shape_geometric(face_shape_features(FaceContext(img, faces[0]["points"])))
+            margins.append(margin)
+            correct.append(shape == label)
+    return np.array(margins), np.array(correct)
+
+
+def fit_threshold(margins, correct, target_precision, min_support):
+    """
+    Smallest margin threshold whose decisive calls (margin >= t) reach the target precision.
+    Returns: (threshold, precision, coverage) or None
+    """
+    order = np.argsort(-margins)
+    hits = np.cumsum(correct[order])
+    support = np.arange(1, len(margins) + 1)
+    precision = hits / support
+
+    best = None
+    for k in range(min_support - 1, len(margins)):
+        # Only cut between distinct margins so every face at the threshold is included
+        if k + 1 < len(margins) and margins[order[k + 1]] == margins[order[k]]:
+            continue
+        if precision[k] >= target_precision:
+            best = (float(margins[order[k]]), float(precision[k]), float(support[k] / len(margins)))
+    return best
+
+
+def calibrate(data_dir, per_class, target_precision, min_support, output):
+    margins, correct = collect_margins(data_dir, per_class)
+    if len(margins) < min_support:
+        print(f"❌ Only {len(margins)} usable faces in {data_dir} (need {min_support}+).")
+        return False
+
+    print(f"📊 {len(margins)} faces | geometric top-1 accuracy {correct.mean()*100:.1f}%")
+    print(f"\n{'margin >=':>10} | {'precision':>9} | {'coverage':>8}")
+    for t in np.quantile(margins, [0.0, 0.25, 0.5, 0.75, 0.9]):
+        decisive = margins >= t
+        print(f"{t:>10.3f} | {correct[decisive].mean()*100:>8.1f}% | {decisive.mean()*100:>7.1f}%")
+
+    best = fit_threshold(margins, correct, target_precision, min_support)
+    if best is None:
+        print(f"\n❌ No threshold reaches {target_precision*100:.0f}% precision. Fast path stays disabled.")
+        return False
+
+    threshold, precision, coverage = best
+    with open(output, "w") as f:
+        json.dump({
+            "margin_threshold": round(threshold, 4),
+            "precision": round(precision, 4),
+            "coverage": round(coverage, 4),
+            "target_precision": target_precision,
+            "samples": int(len(margins)),
+        }, f, indent=2)
+
+    print(f"\n✅ margin >= {threshold:.3f}: {precision*100:.1f}% precision, CNN skipped for {coverage*100:.1f}% of faces")
+    print(f"   Saved to {output}")
+    return True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data", default=DATA_DIR, help="Dataset root (class_name/image.jpg)")
+    parser.add_argument("--per-class", type=int, default=200)
+    parser.add_argument("--target-precision", type=float, default=0.9,
+                        help="Required top-1 precision of fast-path decisions")
+    parser.add_argument("--min-support", type=int, default=20, help="Minimum number of fast-path faces")
+    parser.add_argument("--output", default=os.path.abspath(FACE_SHAPE_CASCADE_PATH))
+    args = parser.parse_args()
+
+    ok = calibrate(args.data, args.per_class, args.target_precision, args.min_support, args.output)
+    sys.exit(0 if ok else 1)
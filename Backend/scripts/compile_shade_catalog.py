@@ -0,0 +1,47 @@
+"""
+Compile a Foundation Shade Catalog
+Turns a brand catalog CSV/JSON into the binary .shades file that API
+workers memory-map (see app/ml/shade_catalog.py for the formats). Running
+workers pick up the new file within SHADE_CATALOG_CHECK_INTERVAL seconds.
+
+Usage (from the Backend folder):
+    python scripts/compile_shade_catalog.py data/shades.csv
+    python scripts/compile_shade_catalog.py data/shades.json --output /srv/catalog/shades.shades
+    python scripts/compile_shade_catalog.py --builtin --output data/builtin.shades
+"""
+
+import argparse
+import os
+import sys
+
+# Add the project root to sys.path so we can import 'app'
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.ml.shade_catalog import ShadeCatalog, build_catalog, builtin_shades, compile_catalog, write_catalog
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("source", nargs="?", help="Catalog CSV or JSON")
+    parser.add_argument("--output", help="Compiled file (default: next to the source, .shades)")
+    parser.add_argument("--builtin", action="store_true", help="Compile the built-in FOUNDATION_SHADES")
+    args = parser.parse_args()
+
+    if args.builtin:
+        if not args.output:
+            parser.error("--builtin needs --output")
+        # Renamed over the target like compile_catalog: rewriting a mapped file in place crashes its readers
+        output = write_catalog(build_catalog(builtin_shades()), args.output)
+    elif args.source:
+        output = compile_catalog(args.source, args.output)
+    else:
+        parser.error("give a source file or --builtin")
+
+    catalog = ShadeCatalog.open(output)
+    print(f"📦 {output}: {len(catalog)} shades, {os.path.getsize(output):,} bytes")
+    for i in range(min(3, len(catalog))):
+        print(f"   {catalog[i]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Face Shape Model Export
+Turns the trained EfficientNetV2-S checkpoint into TorchScript and ONNX
+artifacts next to it, so FaceShapePredictor can run the faster backends
+(FACE_SHAPE_BACKEND=auto|eager|torchscript|onnxruntime).
+
+Usage (from the Backend folder):
+    python scripts/export_face_shape_model.py
+    python scripts/export_face_shape_model.py --model models/face_shape_efficientnetv2s.pth --opset 18
+
+Outputs:
+    models/face_shape_efficientnetv2s_torchscript.pt
+    models/face_shape_efficientnetv2s.onnx
+"""
+
+import argparse
+import os
+import sys
+
+import numpy as np
+import torch
+
+# Add the project root to sys.path so we can import 'app'
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.ml.face_shape_predictor import FaceShapePredictor, artifact_paths, IMG_SIZE
+
+
+def export(model_path, opset):
+    predictor = FaceShapePredictor(model_path=model_path, backend="eager")
+    if predictor.model is None:
+        print(f"❌ Could not load {model_path}. Train the model first (scripts/train_efficientnet_pytorch.py).")
+        sys.exit(1)
+
+    model = predictor.model.cpu().eval()
+    example = torch.randn(1, 3, IMG_SIZE, IMG_SIZE)
+    paths = artifact_paths(model_path)
+
+    # 1. TorchScript (traced; the network has no data-dependent control flow)
+    with torch.no_grad():
+        scripted = torch.jit.freeze(torch.jit.trace(model, example))
+    scripted.save(paths["torchscript"])
+    print(f"✅ TorchScript saved to {paths['torchscript']}")
+
+    # 2. ONNX with a dynamic batch dimension (needed for micro-batching)
+    torch.onnx.export(
+        model, example, paths["onnxruntime"],
+        input_names=["input"], output_names=["logits"],
+        dynamic_axes={"input": {0: "batch"}, "logits": {0: "batch"}},
+        opset_version=opset,
+    )
+    print(f"✅ ONNX saved to {paths['onnxruntime']}")
+
+    # 3. Sanity check: every backend must agree with eager PyTorch
+    batch = torch.randn(4, 3, IMG_SIZE, IMG_SIZE)
+    with torch.no_grad():
+        reference = model(batch).numpy()
+        ts_out = scripted(batch).numpy()
+    print(f"🔍 TorchScript max |diff| vs eager: {np.abs(ts_out - reference).max():.2e}")
+
+    try:
+        import onnxruntime as ort
+        session = ort.InferenceSession(paths["onnxruntime"], providers=["CPUExecutionProvider"])
+        onnx_out = session.run(None, {"input": batch.numpy()})[0]
+        print(f"🔍 ONNX Runtime max |diff| vs eager: {np.abs(onnx_out - reference).max():.2e}")
+    except ImportError:
+        print("⚠️ onnxruntime not installed, skipped ONNX check (pip install onnxruntime)")
+
+
+if __name__ == "__main__":
+    default_model = os.path.join(os.path.dirname(__file__), "../models/face_shape_efficientnetv2s.pth")
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default=default_model, help="Trained .pth checkpoint")
+    parser.add_argument("--opset", type=int, default=18)
+    args = parser.parse_args()
+    export(os.path.abspath(args.model), args.opset)
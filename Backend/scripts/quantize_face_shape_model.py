@@ -0,0 +1,166 @@
+"""
+INT8 Post-Training Static Quantization (Face Shape Model)
+Quantizes the exported FP32 ONNX face-shape model to INT8 (QDQ, per-channel
+weights) with ONNX Runtime, calibrating activations on images from the
+augmented dataset. Reports top-1 accuracy delta and CPU speedup vs. FP32 and
+only writes the INT8 artifact if the accuracy drop is within tolerance.
+
+Usage (from the Backend folder):
+    python scripts/quantize_face_shape_model.py
+    python scripts/quantize_face_shape_model.py --tolerance 0.01 --calib-per-class 32 --eval-per-class 50
+
+Serve it with:
+    FACE_SHAPE_BACKEND=int8
+
+Pre-requisites:
+    - pip install onnx onnxruntime
+    - Dataset in 'datasets/face_shape_augmented' (or 'cropped'), structure root/class_name/image.jpg
+    - FP32 ONNX export (created automatically via export_face_shape_model.py if missing)
+"""
+
+import argparse
+import glob
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+# Add the project root to sys.path so we can import 'app'
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.ml.face_shape_predictor import artifact_paths, preprocess_face
+
+# Configuration (mirrors train_efficientnet_pytorch.py)
+DATA_DIR = "datasets/face_shape_augmented"
+if not os.path.exists(DATA_DIR):
+    DATA_DIR = "datasets/face_shape_cropped"
+CLASSES = ["Diamond", "Heart", "Long", "Oval", "Pear", "Round", "Square", "Triangle"]
+
+
+def split_dataset(data_dir, calib_per_class, eval_per_class):
+    """Disjoint calibration / evaluation lists of (path, class_index), taken per class."""
+    calib, evaluation = [], []
+    for idx, name in enumerate(CLASSES):
+        paths = sorted(glob.glob(os.path.join(data_dir, name, "*")))
+        calib += [(p, idx) for p in paths[:calib_per_class]]
+        evaluation += [(p, idx) for p in paths[calib_per_class:calib_per_class + eval_per_class]]
+    return calib, evaluation
+
+
+def load_batch(samples):
+    images, labels = [], []
+    for path, label in samples:
+        img = cv2.imread(path)
+        if img is None:
+            continue
+        images.append(preprocess_face(img))
+        labels.append(label)
+    return np.stack(images), np.array(labels)
+
+
+class FaceCalibrationReader:
+    """Feeds preprocessed calibration crops to ONNX Runtime one at a time."""
+
+    def __init__(self, images, input_name):
+        self.input_name = input_name
+        self._iter = iter(images)
+
+    def get_next(self):
+        img = next(self._iter, None)
+        return None if img is None else {self.input_name: img[None]}
+
+
+def evaluate(session, images, labels, timing_runs=20):
+    """Top-1 accuracy over the eval set and mean single-image latency (ms)."""
+    input_name = session.get_inputs()[0].name
+    preds = []
+    for start in range(0, len(images), 16):
+        logits = session.run(None, {input_name: images[start:start + 16]})[0]
+        preds.append(logits.argmax(axis=1))
+    accuracy = float((np.concatenate(preds) == labels).mean())
+
+    single = images[:1]
+    session.run(None, {input_name: single})  # warm-up
+    start = time.perf_counter()
+    for _ in range(timing_runs):
+        session.run(None, {input_name: single})
+    latency = (time.perf_counter() - start) * 1000 / timing_runs
+    return accuracy, latency
+
+
+def quantize(model_path, data_dir, calib_per_class, eval_per_class, tolerance):
+    import onnxruntime as ort
+    from onnxruntime.quantization import quantize_static, QuantFormat, QuantType, CalibrationMethod
+    from onnxruntime.quantization.shape_inference import quant_pre_process
+
+    paths = artifact_paths(model_path)
+    if not os.path.exists(paths["onnxruntime"]):
+        print("ℹ️ FP32 ONNX not found, exporting first...")
+        from export_face_shape_model import export
+        export(model_path, opset=18)
+
+    calib, evaluation = split_dataset(data_dir, calib_per_class, eval_per_class)
+    if not calib or not evaluation:
+        print(f"❌ Not enough images in {data_dir} (need {calib_per_class}+ per class).")
+        sys.exit(1)
+
+    calib_images, _ = load_batch(calib)
+    eval_images, eval_labels = load_batch(evaluation)
+    print(f"📊 Calibration: {len(calib_images)} images | Evaluation: {len(eval_images)} images")
+
+    fp32 = ort.InferenceSession(paths["onnxruntime"], providers=["CPUExecutionProvider"])
+    input_name = fp32.get_inputs()[0].name
+
+    with tempfile.TemporaryDirectory() as tmp:
+        prepared = os.path.join(tmp, "prepared.onnx")
+        candidate = os.path.join(tmp, "int8.onnx")
+
+        print("🔧 Quantizing (static, QDQ, per-channel INT8 weights)...")
+        quant_pre_process(paths["onnxruntime"], prepared)
+        quantize_static(
+            prepared, candidate,
+            FaceCalibrationReader(calib_images, input_name),
+            quant_format=QuantFormat.QDQ,
+            per_channel=True,
+            activation_type=QuantType.QUInt8,
+            weight_type=QuantType.QInt8,
+            calibrate_method=CalibrationMethod.MinMax,
+        )
+
+        int8 = ort.InferenceSession(candidate, providers=["CPUExecutionProvider"])
+        fp32_acc, fp32_ms = evaluate(fp32, eval_images, eval_labels)
+        int8_acc, int8_ms = evaluate(int8, eval_images, eval_labels)
+        drop = fp32_acc - int8_acc
+
+        print(f"\n{'':>6} | {'top-1':>7} | {'ms/image':>8}")
+        print(f"{'FP32':>6} | {fp32_acc*100:>6.2f}% | {fp32_ms:>8.1f}")
+        print(f"{'INT8':>6} | {int8_acc*100:>6.2f}% | {int8_ms:>8.1f}")
+        print(f"Accuracy delta: {(int8_acc - fp32_acc)*100:+.2f} pts | Speedup: {fp32_ms / int8_ms:.2f}x")
+
+        if drop > tolerance:
+            print(f"\n❌ REJECTED: top-1 drop {drop*100:.2f} pts exceeds tolerance {tolerance*100:.2f} pts. Nothing saved.")
+            return False
+
+        shutil.move(candidate, paths["int8"])
+
+    print(f"\n✅ ACCEPTED: INT8 model saved to {paths['int8']}")
+    print("   Serve it with FACE_SHAPE_BACKEND=int8")
+    return True
+
+
+if __name__ == "__main__":
+    default_model = os.path.join(os.path.dirname(__file__), "../models/face_shape_efficientnetv2s.pth")
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default=default_model, help="Trained .pth checkpoint")
+    parser.add_argument("--data", default=DATA_DIR, help="Dataset root (class_name/image.jpg)")
+    parser.add_argument("--calib-per-class", type=int, default=32)
+    parser.add_argument("--eval-per-class", type=int, default=50)
+    parser.add_argument("--tolerance", type=float, default=0.01, help="Max allowed top-1 drop (0.01 = 1 point)")
+    args = parser.parse_args()
+
+    ok = quantize(os.path.abspath(args.model), args.data, args.calib_per_class, args.eval_per_class, args.tolerance)
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,98 @@
+"""
+Golden test for the local consultant chatbot (app/ml/chatbot.py): every
+prompt x user context must give exactly the reply recorded in
+test_chatbot_golden.json. Prompts are the test_chat_logic.py prompt plus
+at least one per intent, keyword overlaps and messages matching no intent.
+
+Usage (from the Backend folder):
+    python test_chatbot_intents.py            # compare
+    python test_chatbot_intents.py --update   # re-record after an intended change
+"""
+import json
+import os
+import sys
+
+sys.path.append(os.path.abspath("."))
+
+from app.ml.chatbot import get_bot_response
+
+GOLDEN_PATH = "test_chatbot_golden.json"
+
+PROMPTS = [
+    # test_chat_logic.py
+    "Hello! Who are you?",
+    # One or more per intent
+    "hey there", "good evening!", "thanks a lot", "I really appreciate it",
+    "what sunscreen should I use?", "Is SPF 30 enough?", "how do I repair sun damage",
+    "what food is good for skin", "should I take a vitamin supplement?", "what should I eat",
+    "how do I get rid of acne", "I have a pimple on my chin", "blemish help",
+    "my skin is so dry and flaky", "I feel dehydrated", "best moisture cream?",
+    "my face gets oily by noon", "too much sebum", "how to reduce shine",
+    "anti-aging advice", "I see fine lines", "should I use retinol?",
+    "how to fade dark spot", "I have uneven tone", "hyperpigmentation treatment",
+    "what is a good routine", "what order should products go in", "my morning regimen",
+    "recommend a cleanser", "suggest a serum", "any brand you like?",
+    "what hairstyle suits me", "what is my face shape", "should I cut my hair short",
+    "makeup tips", "which lipstick color", "find my foundation shade",
+    "can I book an appointment", "I want to schedule a visit",
+    "what services do you offer", "do you do a chemical peel", "massage options",
+    "how much is a facial", "what does it cost", "is it expensive",
+    "my skin is sensitive", "redness after products", "irritation from toner",
+    "dark circle under eye", "puffy eyes", "eye cream?",
+    "hair fall problem", "dandruff shampoo", "itchy scalp",
+    "nail care", "manicure tips", "cuticle oil?",
+    "wedding prep", "bride skincare", "party tonight",
+    "how to shave", "beard care", "best aftershave",
+    # Keyword overlaps / substring matches (earlier intents win)
+    "this is great",  # 'hi' in 'this' -> greeting
+    "acne and dry skin", "oily skin with dark spot", "recommend something for my eyes",
+    "sunscreen for my wedding", "thanks, what about serum?",
+    # No intent
+    "", "   ", "ok", "what is the weather like", "12345",
+]
+
+CONTEXTS = [
+    None,
+    {"gender": "Female", "face_shape": "Round", "skin_scores": {"acne": 0.45, "oiliness": 0.72, "texture": 0.3},
+     "skin_tone": "Medium", "undertone": "Warm", "eye_color": "Brown", "hair_color": "Black", "season": "Autumn"},
+    {"gender": "Male", "face_shape": "Square", "skin_scores": {"acne": 0.1, "oiliness": 0.2, "texture": 0.6},
+     "skin_tone": "Fair", "undertone": "Cool", "eye_color": "Blue", "hair_color": "Blonde", "season": "Summer"},
+    {"gender": "Female", "face_shape": "Unknown", "skin_scores": {}, "skin_tone": "Unknown",
+     "eye_color": "Unknown", "hair_color": "Unknown"},
+    {"gender": "Female", "face_shape": "Triangle", "skin_scores": {"acne": 0.31, "oiliness": 0.61},
+     "skin_tone": None, "eye_color": "Green"},
+]
+
+
+def replies():
+    return [[get_bot_response(prompt, context) for context in CONTEXTS] for prompt in PROMPTS]
+
+
+def main():
+    current = replies()
+    if "--update" in sys.argv:
+        with open(GOLDEN_PATH, "w", encoding="utf-8") as f:
+            json.dump({"prompts": PROMPTS, "replies": current}, f, ensure_ascii=False, indent=1)
+        print(f"📝 Recorded {len(PROMPTS) * len(CONTEXTS)} golden replies to {GOLDEN_PATH}")
+        return
+
+    with open(GOLDEN_PATH, encoding="utf-8") as f:
+        golden = json.load(f)
+    assert golden["prompts"] == PROMPTS, "Prompt list changed: re-record with --update"
+
+    mismatches = 0
+    for prompt, got_row, want_row in zip(PROMPTS, current, golden["replies"]):
+        for i, (got, want) in enumerate(zip(got_row, want_row)):
+            if got != want:
+                mismatches += 1
+                print(f"❌ {prompt!r} (context {i}):\n   got:  {got[:80]!r}\n   want: {want[:80]!r}")
+
+    total = len(PROMPTS) * len(CONTEXTS)
+    if mismatches:
+        print(f"\n❌ {mismatches}/{total} replies differ from the golden file")
+        sys.exit(1)
+    print(f"✅ All {total} replies match the golden file")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Tolerance test for the dominant-colour engine (app/ml/dominant_color.py):
+its colour must stay close to the former sklearn KMeans(n_init=10) result
+and to the known main tone of synthetic regions, be identical run to run,
+and take bounded time on huge regions.
+
+Usage (from the Backend folder):
+    python test_dominant_color.py
+"""
+import os
+import sys
+import time
+
+import numpy as np
+from sklearn.cluster import KMeans
+
+sys.path.append(os.path.abspath("."))
+
+from app.ml.dominant_color import dominant_color, subsample, DOMINANT_COLOR_PIXEL_BUDGET
+
+# Max per-channel difference (0-255 scale) from the KMeans colour
+TOLERANCE = 4.0
+
+
+def region(rng, n, tones, weights, spread=10):
+    """Pixels drawn around `tones` with the given proportions, shuffled."""
+    counts = (np.array(weights) * n).astype(int)
+    counts[0] += n - counts.sum()
+    pixels = np.concatenate([rng.normal(tone, spread, (count, 3)) for tone, count in zip(tones, counts)])
+    return np.clip(pixels[rng.permutation(n)], 0, 255).astype(np.uint8)
+
+
+def kmeans_dominant(pixels):
+    kmeans = KMeans(n_clusters=3, random_state=42, n_init=10).fit(pixels.astype(np.float32))
+    return kmeans.cluster_centers_[np.argmax(np.bincount(kmeans.labels_))]
+
+
+def main():
+    rng = np.random.default_rng(7)
+    cases = {
+        "fair skin + shadow + hair": ([[170, 190, 230], [120, 140, 180], [40, 35, 40]], [0.55, 0.3, 0.15]),
+        "deep skin + highlight": ([[50, 70, 105], [90, 110, 150], [20, 20, 25]], [0.6, 0.25, 0.15]),
+        "black hair + background": ([[25, 20, 22], [200, 200, 200], [90, 80, 70]], [0.5, 0.3, 0.2]),
+        "blonde hair": ([[120, 180, 215], [70, 110, 150], [230, 230, 230]], [0.5, 0.35, 0.15]),
+    }
+
+    # 1. Close to KMeans and to the true main tone
+    for name, (tones, weights) in cases.items():
+        for n in (500, 20000, 200000):
+            pixels = region(rng, n, tones, weights)
+            color = dominant_color(pixels)
+            reference = kmeans_dominant(pixels)
+            diff = np.abs(color - reference).max()
+            assert diff <= TOLERANCE, (name, n, color, reference)
+            assert np.abs(color - np.array(tones[0])).max() <= TOLERANCE + 2, (name, n, color)
+        print(f"✅ {name}: within {TOLERANCE} of KMeans (last diff {diff:.2f})")
+
+    # 2. Deterministic: same pixels, same colour
+    pixels = region(rng, 100000, *cases["fair skin + shadow + hair"])
+    first = dominant_color(pixels)
+    assert all(np.array_equal(first, dominant_color(pixels.copy())) for _ in range(5))
+    print("✅ identical results run to run")
+
+    # 3. Fewer distinct colours than clusters
+    flat = np.tile(np.array([[10, 200, 30]], dtype=np.uint8), (1000, 1))
+    assert np.array_equal(dominant_color(flat), [10, 200, 30])
+    two = np.concatenate([flat, np.tile(np.array([[90, 90, 90]], dtype=np.uint8), (400, 1))])
+    assert np.array_equal(dominant_color(two), [10, 200, 30])
+    print("✅ single- and two-colour regions")
+
+    # 4. Bounded: the pixel budget caps the work however big the region is
+    assert len(subsample(np.zeros((5_000_000, 3), np.uint8))) == DOMINANT_COLOR_PIXEL_BUDGET
+    huge = region(rng, 4_000_000, *cases["deep skin + highlight"])
+    start = time.perf_counter()
+    dominant_color(huge)
+    took = time.perf_counter() - start
+    assert took < 0.5, took
+    print(f"✅ 4M pixels in {took * 1000:.1f} ms")
+
+    print("\n✅ Test Complete!")
+
+
+if __name__ == "__main__":
+    main()
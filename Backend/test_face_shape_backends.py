@@ -0,0 +1,76 @@
+import glob
+import os
+import sys
+
+import cv2
+import numpy as np
+
+# Fixture set: a few images per class from the training data (override with argv[2])
+FIXTURE_DIR = "datasets/face_shape_augmented"
+PER_CLASS = 5
+
+def load_fixtures(fixture_dir):
+    paths = []
+    for class_dir in sorted(glob.glob(os.path.join(fixture_dir, "*"))):
+        paths += sorted(glob.glob(os.path.join(class_dir, "*.jpg")))[:PER_CLASS]
+    images = [img for img in (cv2.imread(p) for p in paths) if img is not None]
+    if not images:
+        # Fallback to deterministic synthetic crops if the dataset is missing
+        print(f"⚠️ No fixtures in {fixture_dir}, using synthetic crops.")
+        rng = np.random.default_rng(0)
+        images = [cv2.GaussianBlur(rng.integers(0, 255, (300, 260, 3), dtype=np.uint8), (0, 0), 6) for _ in range(16)]
+    return images
+
+def reference_top1(model, classes, images):
+    """Original eager path: BGR -> RGB -> PIL -> torchvision transforms."""
+    import torch
+    from PIL import Image
+    from torchvision import transforms
+    transform = transforms.Compose([
+        transforms.Resize((224, 224)),
+        transforms.ToTensor(),
+        transforms.Normalize([0.485, 0.456, 0.406], [0.229, 0.224, 0.225])
+    ])
+    labels = []
+    for img in images:
+        tensor = transform(Image.fromarray(cv2.cvtColor(img, cv2.COLOR_BGR2RGB))).unsqueeze(0)
+        with torch.no_grad():
+            labels.append(classes[model(tensor).argmax(1).item()])
+    return labels
+
+def test_face_shape_backends(model_path=None, fixture_dir=FIXTURE_DIR):
+    from app.ml.face_shape_predictor import FaceShapePredictor
+
+    eager = FaceShapePredictor(model_path=model_path, backend="eager")
+    if eager.model is None:
+        print("❌ Trained face-shape model not found, nothing to compare.")
+        return False
+
+    images = load_fixtures(fixture_dir)
+    print(f"🔄 Parity Test: {len(images)} fixture images")
+
+    expected = reference_top1(eager.model, eager.classes, images)
+    ok = True
+
+    for backend in ("eager", "torchscript", "onnxruntime"):
+        predictor = eager if backend == "eager" else FaceShapePredictor(model_path=model_path, backend=backend)
+        if predictor.model is None:
+            print(f"   ⏭️ {backend}: artifact not available (run scripts/export_face_shape_model.py)")
+            continue
+
+        got = [label for label, _ in predictor.predict_batch(images)]
+        mismatches = sum(a != b for a, b in zip(expected, got))
+        if mismatches:
+            ok = False
+            print(f"   ❌ {backend}: {mismatches}/{len(images)} top-1 mismatches vs reference")
+        else:
+            print(f"   ✅ {backend}: identical top-1 on all {len(images)} images")
+
+    print("\n✅ SUCCESS: All backends match." if ok else "\n❌ FAILURE: Backend parity broken.")
+    return ok
+
+if __name__ == "__main__":
+    sys.path.append(os.getcwd())
+    model_path = sys.argv[1] if len(sys.argv) > 1 else None
+    fixture_dir = sys.argv[2] if len(sys.argv) > 2 else FIXTURE_DIR
+    sys.exit(0 if test_face_shape_backends(model_path, fixture_dir) else 1)
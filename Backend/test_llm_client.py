@@ -0,0 +1,181 @@
+"""
+Test the shared LLM client (app/utils/llm_client.py) against a local stub
+OpenRouter server. The model name tells the stub how to behave:
+    ok/<name>           answers at once
+    fail/<name>         HTTP 500
+    slow/<secs>/<name>  answers after <secs> seconds
+    junk/<name>         answers with text that is not a JSON array
+Requests with "stream": true get the answer as server-sent events, word by word.
+
+Usage (from the Backend folder):
+    python test_llm_client.py
+"""
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.append(os.path.abspath("."))
+
+from app.utils import llm_client
+from app.utils.llm_client import LLMClient, llm_stats, reset_llm_stats
+
+hits = Counter()
+
+
+class StubOpenRouter(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        model = body["model"]
+        hits[model] += 1
+        kind = model.split("/")[0]
+
+        if kind == "fail":
+            return self._send(500, {"error": "model down"})
+        if kind == "slow":
+            time.sleep(float(model.split("/")[1]))
+        content = "no tips today" if kind == "junk" else json.dumps([f"✨ tip from {model}"])
+        if body.get("stream"):
+            return self._stream(content)
+        self._send(200, {"choices": [{"message": {"content": content}}]})
+
+    def _stream(self, content):
+        try:
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.end_headers()
+            self.wfile.write(b": OPENROUTER PROCESSING\n\n")
+            for word in content.split(" "):
+                event = {"choices": [{"delta": {"content": word + " "}}]}
+                self.wfile.write(f"data: {json.dumps(event)}\n\n".encode())
+                self.wfile.flush()
+                time.sleep(0.02)
+            self.wfile.write(b"data: [DONE]\n\n")
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        self.close_connection = True
+
+    def _send(self, code, payload):
+        data = json.dumps(payload).encode()
+        try:
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # client cancelled a hedged request
+
+    def log_message(self, *args):
+        pass
+
+
+def parse_list(content):
+    try:
+        value = json.loads(content)
+    except json.JSONDecodeError:
+        return None
+    return value if isinstance(value, list) else None
+
+
+async def timed(client, models, **kwargs):
+    start = time.perf_counter()
+    reply = await client.complete(models, [{"role": "user", "content": "hi"}], "test-key", **kwargs)
+    return reply, time.perf_counter() - start
+
+
+async def streamed(client, models, **kwargs):
+    start = time.perf_counter()
+    first, parts, winner = None, [], None
+    async for model, text in client.stream(models, [{"role": "user", "content": "hi"}], "test-key", **kwargs):
+        first = first or time.perf_counter() - start
+        winner = model
+        parts.append(text)
+    return winner, "".join(parts).strip(), first
+
+
+async def run_tests(url):
+    client = LLMClient(url=url, http2=False)
+    try:
+        # 1. A failing model falls through to the next one at once
+        reply, took = await timed(client, ["fail/a", "ok/b"])
+        assert reply.model == "ok/b" and took < 1.0, (reply and reply.model, took)
+        print(f"✅ failing model skipped over in {took * 1000:.0f} ms")
+
+        # 2. A slow model is hedged: the next one answers first
+        reply, took = await timed(client, ["slow/3/c", "ok/d"], hedge_delay=0.3)
+        assert reply.model == "ok/d" and 0.3 <= took < 1.5, (reply and reply.model, took)
+        assert llm_stats()["ok/d"]["hedge"] == 1
+        print(f"✅ slow model hedged, answer in {took * 1000:.0f} ms")
+
+        # 3. Unparseable answers count as failures and the next model is used
+        reply, took = await timed(client, ["junk/e", "ok/f"], parse=parse_list)
+        assert reply.model == "ok/f" and reply.value == ["✨ tip from ok/f"], reply and reply.model
+        print("✅ unusable answer rejected")
+
+        # 4. The breaker opens after repeated failures and the model is no longer called
+        for _ in range(llm_client.LLM_BREAKER_FAILURES + 2):
+            await timed(client, ["fail/g", "ok/h"])
+        assert hits["fail/g"] == llm_client.LLM_BREAKER_FAILURES, hits["fail/g"]
+        assert llm_stats()["fail/g"]["breaker"] == "open"
+        assert llm_stats()["fail/g"]["skipped"] == 2
+        print(f"✅ breaker opened after {hits['fail/g']} failures")
+
+        # 5. Half-open after the cooldown: a single trial call, whose failure re-opens the breaker
+        llm_client._breakers["fail/g"].opened_at -= llm_client.LLM_BREAKER_COOLDOWN
+        await timed(client, ["fail/g", "ok/h"])
+        assert hits["fail/g"] == llm_client.LLM_BREAKER_FAILURES + 1
+        assert llm_stats()["fail/g"]["breaker"] == "open"
+        print("✅ half-open trial failed, breaker re-opened")
+
+        # 6. Global deadline: nobody answers in time -> None, well before the slow models finish
+        reply, took = await timed(client, ["slow/3/i", "slow/3/j", "slow/3/k"], deadline=1.0, hedge_delay=0.2)
+        assert reply is None and took < 1.5, took
+        assert llm_stats()["slow/3/i"]["cancelled"] == 1
+        print(f"✅ deadline respected ({took * 1000:.0f} ms)")
+
+        # 7. Keep-alive: sequential calls reuse the pooled connection
+        reply, took = await timed(client, ["ok/l"])
+        assert reply.latency_ms < 200, reply.latency_ms
+        print(f"✅ pooled call answered in {reply.latency_ms:.0f} ms")
+
+        # 8. Streaming: failing and slow models are replaced/hedged on time to first token
+        winner, text, first = await streamed(client, ["fail/m", "slow/3/n", "ok/o"], hedge_delay=0.3)
+        assert winner == "ok/o" and text == json.dumps(["✨ tip from ok/o"]) and first < 1.0, (winner, text, first)
+        print(f"✅ streamed answer from {winner}, first token after {first * 1000:.0f} ms")
+
+        # 9. Streaming: nobody answers before the deadline -> empty stream
+        winner, text, first = await streamed(client, ["slow/3/p", "fail/q"], deadline=0.5)
+        assert winner is None and text == "", (winner, text)
+        print("✅ streaming deadline respected")
+    finally:
+        await client.aclose()
+
+
+def main():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubOpenRouter)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/api/v1/chat/completions"
+    print(f"🧪 Stub OpenRouter at {url}\n")
+
+    reset_llm_stats()
+    try:
+        asyncio.run(run_tests(url))
+    finally:
+        server.shutdown()
+
+    print("\n📊 Per-model metrics:")
+    for model, stats in llm_stats().items():
+        print(f"   {model:>10}: {stats}")
+    print("\n✅ Test Complete!")
+
+
+if __name__ == "__main__":
+    main()
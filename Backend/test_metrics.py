@@ -0,0 +1,102 @@
+"""
+Test the stage latency metrics (app/core/metrics.py) and the structured
+logger (app/core/logger.py): histogram buckets, trace() as decorator and
+context manager, spans collected across AnalysisDAG threads, the
+Prometheus text output and the JSON log lines.
+
+Usage (from the Backend folder):
+    python test_metrics.py
+"""
+import io
+import json
+import logging
+import os
+import sys
+import time
+
+sys.path.append(os.path.abspath("."))
+
+from app.core import metrics
+from app.core.logger import JsonFormatter, StructuredLogger, _QueueHandler
+from app.core.metrics import Histogram, MetricsRegistry, collect_spans, record_spans, trace
+from app.pipeline.dag import AnalysisDAG
+
+
+def main():
+    # 1. Buckets are cumulative and inclusive of their upper bound
+    histogram = Histogram((0.01, 0.1, 1))
+    for seconds in (0.005, 0.01, 0.05, 0.5, 3):
+        histogram.observe(seconds)
+    assert histogram.cumulative() == [(0.01, 2), (0.1, 3), (1, 4), (float("inf"), 5)], histogram.cumulative()
+    assert histogram.count == 5 and abs(histogram.sum - 3.565) < 1e-9
+    print("✅ histogram buckets")
+
+    # 2. trace() as decorator and as context manager lands in the registry
+    registry = MetricsRegistry((0.01, 0.1, 1))
+    metrics._registry = registry
+
+    @trace("decorated")
+    def work():
+        time.sleep(0.02)
+        return "done"
+
+    assert work() == "done" and work.__name__ == "work"
+    with trace("block"):
+        pass
+    stats = registry.stats()
+    assert stats["decorated"]["count"] == 1 and stats["decorated"]["avg_ms"] >= 20, stats
+    assert stats["block"]["count"] == 1
+    print("✅ trace decorator and context manager")
+
+    # 3. A pool task collects the spans of every DAG stage thread, not the registry
+    dag = AnalysisDAG()
+    dag.add("a", lambda: work())
+    dag.add("b", lambda a: a, deps=["a"])
+    with collect_spans() as spans:
+        dag.run()
+    names = sorted(name for name, _ in spans)
+    assert names == ["a", "analysis_total", "b", "decorated"], names
+    assert registry.stats()["decorated"]["count"] == 1, "collected spans must not reach the registry directly"
+    record_spans(spans)
+    assert registry.stats()["decorated"]["count"] == 2 and registry.stats()["a"]["count"] == 1
+    print(f"✅ {len(spans)} spans collected across DAG threads")
+
+    # 4. Prometheus text format
+    text = registry.render()
+    assert "# TYPE ai_beauty_stage_duration_seconds histogram" in text
+    assert 'ai_beauty_stage_duration_seconds_bucket{stage="decorated",le="0.01"} 0' in text
+    assert 'ai_beauty_stage_duration_seconds_bucket{stage="decorated",le="+Inf"} 2' in text
+    assert 'ai_beauty_stage_duration_seconds_count{stage="decorated"} 2' in text
+    print("✅ Prometheus exposition")
+
+    # 5. Structured log lines: fields become JSON keys, tracebacks stay a separate field
+    out = io.StringIO()
+    stream = logging.StreamHandler(out)
+    stream.setFormatter(JsonFormatter())
+    prepare = _QueueHandler(None).prepare
+
+    class Capture(logging.Handler):
+        def emit(self, record):
+            stream.handle(prepare(record))
+
+    base = logging.getLogger("test-metrics")
+    base.propagate = False
+    base.addHandler(Capture())
+    log = StructuredLogger(base, {})
+    log.warning("⚠️ stage %s slow", "skin", stage="skin", ms=812.5)
+    try:
+        1 / 0
+    except ZeroDivisionError:
+        log.error("❌ failed", exc_info=True, user="u@x.com")
+    first, second = (json.loads(line) for line in out.getvalue().splitlines())
+    assert first["msg"] == "⚠️ stage skin slow" and first["level"] == "WARNING"
+    assert first["stage"] == "skin" and first["ms"] == 812.5
+    assert second["user"] == "u@x.com" and "ZeroDivisionError" in second["exc"] and "Traceback" not in second["msg"]
+    print("✅ JSON log lines with fields")
+
+    metrics._registry = MetricsRegistry()
+    print("\n✅ Test Complete!")
+
+
+if __name__ == "__main__":
+    main()
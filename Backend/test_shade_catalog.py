@@ -0,0 +1,101 @@
+"""
+Test the on-disk foundation shade catalog (app/ml/shade_catalog.py):
+compile a CSV, memory-map it, match against it, and hot-reload it.
+
+Usage (from the Backend folder):
+    python test_shade_catalog.py
+"""
+import csv
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.append(os.path.abspath("."))
+
+from app.ml import shade_catalog, shade_index
+from app.ml.foundation_db import get_shade_category
+from app.ml.shade_catalog import CatalogLoader, builtin_catalog, builtin_shades
+
+FIELDS = ["name", "brand", "L", "a", "b", "undertone", "hex", "price"]
+
+
+def write_csv(path, rows):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=FIELDS)
+        writer.writeheader()
+        writer.writerows(rows)
+    # Make the change visible to a size/mtime check even within the same tick
+    os.utime(path, ns=(time.time_ns(), time.time_ns()))
+
+
+def main():
+    # 1. The built-in catalog round-trips through the binary format
+    catalog = builtin_catalog()
+    shades = builtin_shades()
+    assert len(catalog) == len(shades)
+    for i, shade in enumerate(shades):
+        got = catalog[i]
+        assert got["name"] == shade["name"] and got["category"] == shade["category"], got
+        assert got["lab"] == [float(v) for v in shade["lab"]] and got["price"] is None
+    print(f"✅ built-in catalog: {len(catalog)} shades round-trip")
+
+    # 2. Categories keep the former get_shade_category thresholds
+    for lightness, category in [(92, "Fair"), (85, "Fair"), (80, "Light"), (62, "Medium"),
+                                (55, "Tan"), (35, "Deep"), (20, "Very Deep")]:
+        assert get_shade_category(lightness) == category, (lightness, get_shade_category(lightness))
+    print("✅ get_shade_category unchanged for the built-in catalog")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        source = os.path.join(tmp, "brand.csv")
+        rows = [
+            {"name": "Porcelain 01", "brand": "Brand A", "L": 91, "a": 2, "b": 9, "undertone": "Cool", "hex": "#F5E8DD", "price": 32},
+            {"name": "Café 30", "brand": "Brand B", "L": 66, "a": 13, "b": 27, "undertone": "Warm", "hex": "#D0B088", "price": ""},
+            {"name": "Ebène 60", "brand": "Brand B", "L": 33, "a": 17, "b": 17, "undertone": "Neutral", "hex": "#654D38", "price": 41.5},
+        ]
+        write_csv(source, rows)
+
+        # 3. A CSV source is compiled next to itself and memory-mapped
+        loader = CatalogLoader(source, check_interval=0)
+        catalog = loader.get()
+        assert isinstance(catalog._buffer, np.memmap) and catalog.path.endswith(".shades")
+        assert catalog[1] == {"name": "Café 30", "brand": "Brand B", "undertone": "Warm", "hex": "#D0B088",
+                              "category": "Medium", "lab": [66.0, 13.0, 27.0], "price": None}
+        assert catalog[2]["price"] == 41.5 and catalog[2]["category"] == "Very Deep"
+        assert loader.get() is catalog, "unchanged file must not be reopened"
+        print(f"✅ compiled and mapped {len(catalog)} shades")
+
+        # 4. The matcher reads the mapped catalog
+        shade_catalog._loader = loader
+        best, distance = shade_index.get_shade_index().nearest([65, 14, 26], n=1)[0]
+        assert best["name"] == "Café 30", best
+        print(f"✅ best match {best['name']} (ΔE00 {distance:.2f})")
+
+        # 5. Hot reload: editing the source recompiles it and rebuilds the index
+        rows.append({"name": "Sable 40", "brand": "Brand C", "L": 65, "a": 14, "b": 26, "undertone": "Warm",
+                     "hex": "#C8A882", "price": 28})
+        write_csv(source, rows)
+        reloaded = loader.get()
+        assert reloaded is not catalog and len(reloaded) == 4
+        best, distance = shade_index.get_shade_index().nearest([65, 14, 26], n=1)[0]
+        assert best["name"] == "Sable 40" and distance < 1e-6, best
+        print("✅ catalog hot-reloaded after the source changed")
+
+        # 6. A broken file keeps the current catalog
+        with open(reloaded.path + ".new", "wb") as f:
+            f.write(b"garbage")
+        os.replace(reloaded.path + ".new", reloaded.path)
+        os.utime(source, ns=(0, 0))  # source older than the compiled file: no recompile
+        assert loader.get() is reloaded
+        print("✅ unreadable catalog ignored, previous one kept")
+
+        shade_catalog._loader = None
+        del catalog, reloaded, loader
+
+    print("\n✅ Test Complete!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Tolerance test for the fused skin preprocessing (preprocess_skin in
+app/ml/analysis_cv.py): its planes must stay close to the former
+apply_bilateral_filter + apply_retinex + full-frame LAB/HSV/gray
+conversions, and analyze_skin_cv must give the same scores either way.
+
+Usage (from the Backend folder):
+    python test_skin_preprocessing.py
+    python test_skin_preprocessing.py --image photo.jpg
+"""
+import argparse
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+sys.path.append(os.path.abspath("."))
+
+from app.ml import analysis_cv
+from app.ml.analysis_cv import apply_bilateral_filter, apply_retinex, preprocess_skin
+
+# Max mean difference (gray levels) between fused and reference planes in the cheeks
+TOLERANCE = 2.0
+
+
+def reference_preprocess(image, mask_cheeks):
+    """The former pipeline: full-resolution filters, full-frame colour conversions."""
+    retinex = apply_retinex(apply_bilateral_filter(image))
+    return {
+        "image": retinex,
+        "v": cv2.cvtColor(retinex, cv2.COLOR_BGR2HSV)[:, :, 2],
+        "cheek_lab": cv2.cvtColor(retinex, cv2.COLOR_BGR2LAB)[mask_cheeks > 0],
+        "cheek_gray": cv2.cvtColor(retinex, cv2.COLOR_BGR2GRAY)[mask_cheeks > 0],
+    }
+
+
+def synthetic_face(rng, size, light):
+    """Skin-toned oval with blemishes and pores under a lighting gradient, plus its cheek mask."""
+    h, w = size
+    image = np.full((h, w, 3), (60, 70, 80), np.float32)
+    cv2.ellipse(image, (w // 2, h // 2), (w // 3, int(h * 0.42)), 0, 0, 360, (120, 150, 200), -1)
+    for _ in range(40):
+        center = (int(rng.integers(w // 4, 3 * w // 4)), int(rng.integers(h // 4, 3 * h // 4)))
+        cv2.circle(image, center, int(rng.integers(2, 6)), (90, 100, 190), -1)
+    image += rng.normal(0, 6, image.shape)
+    image *= np.linspace(light[0], light[1], w, dtype=np.float32)[None, :, None]
+    image = np.clip(image, 0, 255).astype(np.uint8)
+
+    mask = np.zeros((h, w), np.uint8)
+    for cx in (w // 3, 2 * w // 3):
+        cv2.ellipse(mask, (cx, int(h * 0.58)), (w // 10, h // 10), 0, 0, 360, 255, -1)
+    return image, mask
+
+
+def compare_planes(name, image, mask):
+    start = time.perf_counter()
+    reference = reference_preprocess(image, mask)
+    reference_ms = (time.perf_counter() - start) * 1000
+    start = time.perf_counter()
+    fused = preprocess_skin(image, mask)
+    fused_ms = (time.perf_counter() - start) * 1000
+
+    assert fused["image"].shape == image.shape and fused["v"].shape == image.shape[:2]
+    assert fused["cheek_lab"].shape == reference["cheek_lab"].shape
+    diffs = {
+        key: np.abs(fused[key].astype(np.float32) - reference[key].astype(np.float32))
+        for key in ("cheek_lab", "cheek_gray")
+    }
+    diffs["v"] = np.abs(fused["v"].astype(np.float32) - reference["v"])[mask > 0]
+    for key, diff in diffs.items():
+        assert diff.mean() <= TOLERANCE, (name, key, diff.mean())
+    worst = max(diff.mean() for diff in diffs.values())
+    print(f"✅ {name}: mean diff {worst:.2f} ({reference_ms:.0f} ms -> {fused_ms:.0f} ms)")
+
+
+def compare_scores(path):
+    from app.pipeline.face_detection import detect_faces
+
+    image = cv2.imread(path)
+    faces = detect_faces(image) if image is not None else []
+    if not faces:
+        print(f"⚠️ No face found in {path}, score check skipped.")
+        return
+    landmarks = faces[0]["landmarks"]
+
+    fused = analysis_cv.analyze_skin_cv(image, landmarks)
+    analysis_cv.preprocess_skin = reference_preprocess
+    try:
+        reference = analysis_cv.analyze_skin_cv(image, landmarks)
+    finally:
+        analysis_cv.preprocess_skin = preprocess_skin
+    assert fused == reference, (fused, reference)
+    print(f"✅ {os.path.basename(path)}: same scores {fused}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--image", help="Also compare analyze_skin_cv scores on this face photo")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(3)
+
+    # 1. Planes close to the reference pipeline across sizes and lighting
+    for size in [(240, 200), (600, 512), (900, 768)]:
+        for light in [(1.0, 1.0), (0.4, 1.2), (1.3, 0.7)]:
+            image, mask = synthetic_face(rng, size, light)
+            compare_planes(f"{size[1]}x{size[0]} light {light}", image, mask)
+
+    # 2. Empty cheek mask
+    image, mask = synthetic_face(rng, (240, 200), (1.0, 1.0))
+    planes = preprocess_skin(image, np.zeros_like(mask))
+    assert planes["cheek_lab"].shape == (0, 3) and planes["cheek_gray"].size == 0
+    print("✅ empty cheek mask")
+
+    # 3. Same scores end to end on a real photo
+    if args.image:
+        compare_scores(args.image)
+
+    print("\n✅ Test Complete!")
+
+
+if __name__ == "__main__":
+    main()